@@ -1,11 +1,26 @@
-from flask import Flask, render_template, request, jsonify
+from flask import Flask, render_template, request, jsonify, Response, g
 import pandas as pd
+import base64
+import json
 import os
+import time
+import metrics
+import profiling
 from recommendation import MusicRecommender
 from spotify_recommender import SpotifyMusicRecommender
 from indian_languages_recommender import IndianLanguagesRecommender
 from indian_languages_weather import IndianLanguagesWeatherRecommender
 from weather_recommendation import WeatherMusicRecommender
+from model_store import artifact_path, load_model, save_model
+from lyrics_templates import render_lyrics
+from near_duplicates import NEAR_DUPLICATE_THRESHOLD
+from prompt_analysis import analyze_prompt
+from related_songs import catalog_fingerprint, load_related_table
+from reranking import validate_options
+from serialization import frame_records, json_response
+from structured_log import get_logger, start_request
+
+logger = get_logger(__name__)
 
 app = Flask(__name__)
 app.config['SECRET_KEY'] = 'your-secret-key-here'
@@ -15,6 +30,93 @@ music_recommender = None
 weather_recommender = None
 use_spotify_dataset = False
 
+def _env_int(name):
+    """Read an optional integer setting from the environment"""
+    value = os.environ.get(name)
+    return int(value) if value else None
+
+def _env_float(name, default):
+    """Read a float setting from the environment"""
+    value = os.environ.get(name)
+    return float(value) if value else default
+
+# Directory for persisted model artifacts (unset = always rebuild at startup)
+MODEL_DIR = os.environ.get('MODEL_DIR')
+
+# Per-dataset recommender options
+# e.g. SPOTIFY_LATENT_DIMS=128 scores the Spotify dataset with dense LSA embeddings,
+# SPOTIFY_NEAR_DUPLICATE_THRESHOLD=0 keeps near-duplicate songs and
+# SPOTIFY_HASHED_LYRICS=1 bounds the memory of the lyrics vectorization
+RECOMMENDER_OPTIONS = {
+    'indian_languages': {
+        'latent_dims': _env_int('INDIAN_LATENT_DIMS'),
+        'text_weight': _env_float('INDIAN_TEXT_WEIGHT', 0.7),
+        'audio_weight': _env_float('INDIAN_AUDIO_WEIGHT', 0.3),
+        'near_duplicate_threshold': _env_float('INDIAN_NEAR_DUPLICATE_THRESHOLD',
+                                               NEAR_DUPLICATE_THRESHOLD)
+    },
+    'spotify': {
+        'latent_dims': _env_int('SPOTIFY_LATENT_DIMS'),
+        'near_duplicate_threshold': _env_float('SPOTIFY_NEAR_DUPLICATE_THRESHOLD',
+                                               NEAR_DUPLICATE_THRESHOLD),
+        'hashed_lyrics': os.environ.get('SPOTIFY_HASHED_LYRICS', '').lower() in ('1', 'true', 'yes')
+    }
+}
+
+# Catalogs with a dedicated recommender: dataset name -> (class, source CSV)
+DATASETS = {
+    'indian_languages': (IndianLanguagesRecommender, 'data/spotify_indian_languages.csv'),
+    'spotify': (SpotifyMusicRecommender, 'data/spotify_million_songs.csv')
+}
+
+# Directory of precomputed related songs tables (built by related_songs.py)
+RELATED_SONGS_DIR = os.environ.get('RELATED_SONGS_DIR', 'models')
+
+def related_table_path(dataset_name):
+    """Path of the related songs table for a dataset"""
+    return os.path.join(RELATED_SONGS_DIR, f"{dataset_name}_related.npz")
+
+def load_recommender(dataset_name, recommender_class, csv_path, df=None):
+    """
+    Load a recommender from its model artifact, or build (and save) it,
+    and attach its related songs table when one exists
+
+    Args:
+        dataset_name: Key into RECOMMENDER_OPTIONS and the artifact name
+        recommender_class: Recommender class to build
+        csv_path: Source CSV of the catalog
+        df: Already loaded catalog (read from csv_path if None)
+    """
+    options = RECOMMENDER_OPTIONS.get(dataset_name, {})
+    path = artifact_path(MODEL_DIR, dataset_name) if MODEL_DIR else None
+    
+    recommender = load_model(path, recommender_class, options, csv_path) if path else None
+    if path:
+        metrics.cache_lookup('model_artifact', recommender is not None)
+    
+    if recommender is not None:
+        print(f"✓ Loaded {dataset_name} model from {path}")
+    else:
+        if df is None:
+            df = pd.read_csv(csv_path)
+        with metrics.build_timer(dataset_name):
+            recommender = recommender_class(df, **options)
+        
+        if path:
+            try:
+                save_model(recommender, path, options, csv_path)
+                print(f"✓ Saved {dataset_name} model to {path}")
+            except OSError as e:
+                print(f"⚠ Could not save model artifact: {e}")
+    
+    recommender.related_table = load_related_table(
+        recommender, related_table_path(dataset_name), options
+    )
+    if recommender.related_table is not None:
+        print(f"✓ Serving {len(recommender.related_table):,} popular seeds from related songs table")
+    
+    return recommender
+
 def load_data():
     """Load music dataset and initialize recommenders"""
     global music_recommender, weather_recommender, use_spotify_dataset
@@ -25,8 +127,11 @@ def load_data():
             df = pd.read_csv('data/spotify_indian_languages.csv')
             
             # Use Indian Languages recommender for this dataset
-            music_recommender = IndianLanguagesRecommender(df)
-            weather_recommender = IndianLanguagesWeatherRecommender(df)
+            music_recommender = load_recommender(
+                'indian_languages', *DATASETS['indian_languages'], df=df
+            )
+            with metrics.build_timer('indian_languages_weather'):
+                weather_recommender = IndianLanguagesWeatherRecommender(df)
             use_spotify_dataset = True
             print("✓ Indian Languages dataset loaded successfully!")
             print("✓ Indian Languages weather recommender initialized!")
@@ -36,10 +141,9 @@ def load_data():
         # Priority 2: Try to load Spotify Million Song Dataset
         elif os.path.exists('data/spotify_million_songs.csv'):
             print("📊 Loading Spotify Million Song Dataset...")
-            df = pd.read_csv('data/spotify_million_songs.csv')
             
             # Use Spotify recommender for the large dataset
-            music_recommender = SpotifyMusicRecommender(df)
+            music_recommender = load_recommender('spotify', *DATASETS['spotify'])
             use_spotify_dataset = True
             print("✓ Spotify dataset loaded successfully!")
             
@@ -48,7 +152,8 @@ def load_data():
             if os.path.exists('data/music_data.csv'):
                 print("📊 Loading original dataset for weather recommendations...")
                 weather_df = pd.read_csv('data/music_data.csv')
-                weather_recommender = WeatherMusicRecommender(weather_df)
+                with metrics.build_timer('weather'):
+                    weather_recommender = WeatherMusicRecommender(weather_df)
                 print("✓ Weather recommender initialized with original dataset!")
             else:
                 print("ℹ️  Weather-based recommendations disabled (original dataset not found)")
@@ -60,8 +165,10 @@ def load_data():
         elif os.path.exists('data/music_data.csv'):
             print("📊 Loading original music dataset...")
             df = pd.read_csv('data/music_data.csv')
-            music_recommender = MusicRecommender(df)
-            weather_recommender = WeatherMusicRecommender(df)
+            with metrics.build_timer('original'):
+                music_recommender = MusicRecommender(df)
+            with metrics.build_timer('weather'):
+                weather_recommender = WeatherMusicRecommender(df)
             use_spotify_dataset = False
             print("✓ Original dataset loaded successfully!")
             return True
@@ -70,10 +177,8 @@ def load_data():
             print("⚠ Warning: No dataset found. Please add dataset.")
             return False
             
-    except Exception as e:
-        print(f"Error loading data: {e}")
-        import traceback
-        traceback.print_exc()
+    except Exception:
+        logger.exception("Error loading data")
         return False
 
 @app.route('/')
@@ -97,6 +202,44 @@ def song_generator():
     return render_template('song_generator.html')
 
 
+def _as_list(value):
+    """A request value that may be a single string or a list of strings"""
+    if value is None or value == '':
+        return None
+    if isinstance(value, str):
+        return [value]
+    return [str(item) for item in value]
+
+def recommendation_filters(data):
+    """
+    Filter options of a /recommend request (Indian Languages dataset)
+    
+    Returns:
+        Dict of keyword arguments for get_recommendations (empty if none are set)
+    """
+    filters = {}
+    languages = _as_list(data.get('languages'))
+    if languages:
+        filters['languages'] = languages
+    if data.get('min_popularity') is not None:
+        filters['min_popularity'] = float(data['min_popularity'])
+    exclude_artists = _as_list(data.get('exclude_artists'))
+    if exclude_artists:
+        filters['exclude_artists'] = exclude_artists
+    return filters
+
+# Closest title matches returned with /recommend, to disambiguate the song
+TITLE_SUGGESTIONS = 5
+
+def song_reference(recommender, row):
+    """Id, title and artist of a catalog song"""
+    song = recommender.df.iloc[int(row)]
+    return {
+        'song_id': int(row),
+        'title': song[recommender.TITLE_COLUMN],
+        'artist': song[recommender.ARTIST_COLUMN]
+    }
+
 @app.route('/recommend', methods=['POST'])
 def recommend():
     """Get music recommendations based on selected song"""
@@ -104,21 +247,83 @@ def recommend():
         data = request.get_json()
         song_name = data.get('song_name', '')
         
+        # Optional song id, picked from the suggestions of an earlier request
+        try:
+            song_id = data.get('song_id')
+            if song_id is not None:
+                song_id = int(song_id)
+        except (TypeError, ValueError):
+            return jsonify({'error': 'Invalid song_id'}), 400
+        
+        # Optional diversity re-ranking
+        try:
+            diversity = float(data.get('diversity') or 0)
+            max_per_artist = data.get('max_per_artist')
+            if max_per_artist is not None:
+                max_per_artist = int(max_per_artist)
+            validate_options(diversity, max_per_artist)
+        except (TypeError, ValueError) as e:
+            return jsonify({'error': f'Invalid re-ranking option: {e}'}), 400
+        
+        # Optional filters, applied before top-k selection
+        try:
+            filters = recommendation_filters(data)
+        except (TypeError, ValueError) as e:
+            return jsonify({'error': f'Invalid filter: {e}'}), 400
+        
         if not music_recommender:
             return jsonify({'error': 'System not initialized. Please check dataset.'}), 500
         
-        recommendations = music_recommender.get_recommendations(song_name, n_recommendations=10)
+        if filters and getattr(music_recommender, 'song_filter', None) is None:
+            return jsonify({'error': 'Filters are not supported for this dataset'}), 400
+        
+        # Best title matches (exact, then partial or misspelled)
+        title_lookup = music_recommender.title_lookup
+        matches = title_lookup.search(song_name, limit=TITLE_SUGGESTIONS) if song_name else []
+        suggestions = [song_reference(music_recommender, row) for row in matches]
+        
+        seed = title_lookup.resolve(row=song_id) if song_id is not None else next(iter(matches), None)
+        recommendations = None
+        if seed is not None:
+            recommendations = music_recommender.get_recommendations(
+                song_name, n_recommendations=10,
+                diversity=diversity, max_per_artist=max_per_artist, song_id=seed, **filters
+            )
         
         if recommendations is None or len(recommendations) == 0:
-            return jsonify({'error': 'Song not found or no recommendations available'}), 404
+            return jsonify({
+                'error': 'Song not found or no recommendations available',
+                'suggestions': suggestions
+            }), 404
         
-        return jsonify({
+        return json_response({
             'success': True,
-            'recommendations': recommendations.to_dict('records')
+            'song': song_reference(music_recommender, seed),
+            'suggestions': suggestions,
+            'recommendations': frame_records(recommendations)
         })
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
+WEATHER_RECOMMENDATIONS = 15
+WEATHER_UNAVAILABLE_ERROR = 'Weather-based recommendations are currently unavailable. Please ensure the original music dataset (music_data.csv) is present.'
+WEATHER_FETCH_ERROR = 'Unable to fetch weather data. Please check your internet connection or try again later.'
+
+def weather_result_payload(result):
+    """
+    Response payload and status code for a weather recommendation result
+    (shared by the Flask route and the ASGI handler in asgi.py)
+    """
+    if result is None:
+        return {'success': False, 'error': WEATHER_FETCH_ERROR}, 500
+    
+    return {
+        'success': True,
+        'weather': result['weather'],
+        'mood': result['mood'],
+        'recommendations': frame_records(result['recommendations'])
+    }, 200
+
 @app.route('/weather-recommend', methods=['POST'])
 def weather_recommend():
     """Get music recommendations based on current weather"""
@@ -130,48 +335,112 @@ def weather_recommend():
         if not weather_recommender:
             return jsonify({
                 'success': False,
-                'error': 'Weather-based recommendations are currently unavailable. Please ensure the original music dataset (music_data.csv) is present.'
+                'error': WEATHER_UNAVAILABLE_ERROR
             }), 503
         
         result = weather_recommender.get_weather_based_recommendations(
-            latitude, longitude, n_recommendations=15
+            latitude, longitude, n_recommendations=WEATHER_RECOMMENDATIONS
         )
         
-        if result is None:
-            return jsonify({
-                'success': False,
-                'error': 'Unable to fetch weather data. Please check your internet connection or try again later.'
-            }), 500
-        
-        return jsonify({
-            'success': True,
-            'weather': result['weather'],
-            'mood': result['mood'],
-            'recommendations': result['recommendations'].to_dict('records')
-        })
+        payload, status = weather_result_payload(result)
+        return json_response(payload, status)
     except Exception as e:
-        import traceback
-        traceback.print_exc()
+        logger.exception("Error in weather recommendation")
         return jsonify({
             'success': False,
             'error': f'An error occurred: {str(e)}'
         }), 500
 
+# /get-songs pagination settings
+SONGS_PAGE_SIZE = 100
+SONGS_MAX_PAGE_SIZE = 1000
+SONGS_STREAM_CHUNK = 1000
+
+_catalog_version = (None, None)
+
+def get_catalog_version():
+    """Fingerprint of the loaded catalog, computed once per loaded model"""
+    global _catalog_version
+    if _catalog_version[0] is not music_recommender:
+        _catalog_version = (music_recommender, catalog_fingerprint(music_recommender))
+    return _catalog_version[1]
+
+def _encode_cursor(offset):
+    return base64.urlsafe_b64encode(str(offset).encode()).decode().rstrip('=')
+
+def _decode_cursor(cursor):
+    """Row offset encoded in a cursor (ValueError if malformed)"""
+    if not cursor:
+        return 0
+    padded = cursor + '=' * (-len(cursor) % 4)
+    offset = int(base64.urlsafe_b64decode(padded.encode()).decode())
+    if offset < 0:
+        raise ValueError('negative offset')
+    return offset
+
 @app.route('/get-songs', methods=['GET'])
 def get_songs():
-    """Get list of all available songs"""
+    """
+    Get available songs, one page at a time
+    
+    Query params:
+        cursor: Opaque cursor from a previous page's next_cursor (default: start)
+        limit: Page size (default 100, max 1000)
+        format: 'json' (default) for one page, or 'ndjson' to stream every
+            song from the cursor onwards as one JSON object per line
+    
+    Songs are returned in catalog order, so pages are stable for a loaded
+    catalog. Each response carries a weak ETag (the same page may be sent
+    gzip, br or identity encoded, see Vary: Accept-Encoding); send it back
+    in If-None-Match to get a 304 when the page has not changed.
+    """
     try:
         if not music_recommender or music_recommender.df is None:
             return jsonify({'error': 'System not initialized'}), 500
         
-        # Check which column name to use (song_name for Indian Languages, song for others)
-        song_column = 'song_name' if 'song_name' in music_recommender.df.columns else 'song'
+        try:
+            offset = _decode_cursor(request.args.get('cursor'))
+            limit = int(request.args.get('limit', SONGS_PAGE_SIZE))
+        except ValueError:
+            return jsonify({'error': 'Invalid cursor or limit'}), 400
+        limit = max(1, min(limit, SONGS_MAX_PAGE_SIZE))
+        stream = request.args.get('format') == 'ndjson'
         
-        songs = music_recommender.df[song_column].tolist()
-        return jsonify({
-            'success': True,
-            'songs': songs
-        })
+        etag = f"{get_catalog_version():x}-{offset}-{'all' if stream else limit}"
+        if request.if_none_match:
+            metrics.cache_lookup('songs_etag', request.if_none_match.contains_weak(etag))
+        if request.if_none_match.contains_weak(etag):
+            response = Response(status=304)
+            response.set_etag(etag, weak=True)
+            response.vary.add('Accept-Encoding')
+            return response
+        
+        songs_column = music_recommender.df[music_recommender.TITLE_COLUMN]
+        total = len(songs_column)
+        
+        if stream:
+            def generate():
+                # Serialize chunk by chunk so memory stays flat for any catalog size
+                for start in range(offset, total, SONGS_STREAM_CHUNK):
+                    titles = songs_column.iloc[start:start + SONGS_STREAM_CHUNK].tolist()
+                    yield ''.join(
+                        json.dumps({'id': start + i, 'song': title}, ensure_ascii=False) + '\n'
+                        for i, title in enumerate(titles)
+                    )
+            
+            response = Response(generate(), mimetype='application/x-ndjson')
+        else:
+            end = min(offset + limit, total)
+            response = json_response({
+                'success': True,
+                'songs': songs_column.iloc[offset:end].tolist(),
+                'total': total,
+                'next_cursor': _encode_cursor(end) if end < total else None
+            })
+        
+        response.set_etag(etag, weak=True)
+        response.vary.add('Accept-Encoding')
+        return response
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
@@ -180,146 +449,249 @@ def search_songs():
     """Search songs by query"""
     try:
         query = request.args.get('q', '').lower()
+        language = request.args.get('language', '')
         
         if not music_recommender or music_recommender.df is None:
             return jsonify({'error': 'System not initialized'}), 500
         
-        # Check which column name to use (song_name for Indian Languages, song for others)
-        song_column = 'song_name' if 'song_name' in music_recommender.df.columns else 'song'
+        titles = music_recommender.df[music_recommender.TITLE_COLUMN]
+        
+        # Language-scoped search only touches that language's partition
+        if language:
+            partitions = getattr(music_recommender, 'partitions', None)
+            if partitions is None:
+                return jsonify({'error': 'Language search is not supported for this dataset'}), 400
+            titles = titles.iloc[partitions.slice(language) or slice(0, 0)]
         
         if not query:
-            songs = music_recommender.df[song_column].head(50).tolist()
+            songs = titles.head(50).tolist()
         else:
-            songs = music_recommender.df[
-                music_recommender.df[song_column].str.lower().str.contains(query, na=False)
-            ][song_column].head(50).tolist()
+            # Plain substring match: the query is user text, not a pattern
+            songs = titles[titles.str.lower().str.contains(query, regex=False, na=False)].head(50).tolist()
         
-        return jsonify({
+        return json_response({
             'success': True,
             'songs': songs
         })
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
-@app.route('/generate-lyrics', methods=['POST'])
-def generate_lyrics():
-    """Generate AI lyrics based on user input"""
+@app.route('/dataset-stats', methods=['GET'])
+def dataset_stats():
+    """Catalog statistics, precomputed when the model was built"""
     try:
-        data = request.get_json()
-        theme = data.get('theme', '')
-        language = data.get('language', 'english')
-        genre = data.get('genre', 'pop')
-        mood = data.get('mood', 'happy')
-        
-        if not theme:
-            return jsonify({'error': 'Theme is required'}), 400
-        
-        # Generate lyrics with language support
-        lyrics = generate_lyrics_template(theme, genre, mood, language)
+        if not music_recommender or getattr(music_recommender, 'stats', None) is None:
+            return jsonify({'error': 'System not initialized'}), 500
         
-        return jsonify({
+        return json_response({
             'success': True,
-            'lyrics': lyrics,
-            'theme': theme,
-            'genre': genre,
-            'mood': mood,
-            'language': language
+            'stats': music_recommender.stats.snapshot
         })
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
-@app.route('/generate-song', methods=['POST'])
-def generate_song():
-    """Generate AI song description based on user input"""
-    try:
-        data = request.get_json()
-        prompt = data.get('prompt', '')
-        duration = data.get('duration', 'medium')
-        tempo = data.get('tempo', 'medium')
-        vocals = data.get('vocals', 'mixed')
-        
-        if not prompt:
-            return jsonify({'error': 'Prompt is required'}), 400
+@app.route('/metrics', methods=['GET'])
+def metrics_endpoint():
+    """Stage timings, cache hit rates and build durations (Prometheus text format)"""
+    if not metrics.ENABLED:
+        return jsonify({'error': 'Metrics are disabled (set METRICS_ENABLED=1)'}), 404
+    
+    return Response(metrics.render(), mimetype='text/plain; version=0.0.4')
+
+if metrics.ENABLED:
+    @app.before_request
+    def start_request_timer():
+        """Remember when request handling started"""
+        g.request_start = time.perf_counter()
+    
+    @app.after_request
+    def record_request_time(response):
+        """Record the handling time of the request under its route"""
+        route = request.url_rule.rule if request.url_rule else 'unmatched'
+        metrics.observe_request(route, time.perf_counter() - g.request_start)
+        return response
+
+if profiling.ENABLED:
+    # Requests with an X-Profile header or ?profile= run under a profiler
+    app.wsgi_app = profiling.ProfilingMiddleware(app.wsgi_app)
+    
+    @app.route('/profiles/<profile_id>', methods=['GET'])
+    def profile_report(profile_id):
+        """Stored profile of a request (?format=folded for its collapsed stacks)"""
+        # Same X-Profile header / ?profile= token check as profiled requests
+        token = request.headers.get('X-Profile') or request.args.get('profile')
+        if not profiling.authorized(token):
+            return jsonify({'error': 'Profiling token required'}), 403
         
-        # Generate song description
-        song_description = generate_song_description(prompt, duration, tempo, vocals)
+        report = profiling.load_report(profile_id)
+        if report is None:
+            return jsonify({'error': 'Profile not found'}), 404
+        if request.args.get('format') != 'folded':
+            return jsonify(report)
         
-        return jsonify({
-            'success': True,
-            'song_description': song_description,
-            'prompt': prompt
-        })
-    except Exception as e:
-        return jsonify({'error': str(e)}), 500
-
-def generate_song_description(prompt, duration, tempo, vocals):
-    """Generate detailed song description for AI music platforms"""
+        folded = profiling.load_report(profile_id, folded=True)
+        if folded is None:
+            return jsonify({
+                'error': f"Profile {profile_id} was recorded in {report['mode']} mode, which has "
+                         f"no collapsed stacks; profile the request with profile_mode=sample"
+            }), 400
+        return Response(folded, mimetype='text/plain')
+
+# Tempo BPM ranges and song structures of /generate-song
+TEMPO_BPM = {
+    'slow': '60-80 BPM',
+    'medium': '90-120 BPM',
+    'fast': '130-160 BPM'
+}
+
+SONG_STRUCTURES = {
+    'short': 'Intro → Verse → Chorus → Verse → Chorus → Outro',
+    'medium': 'Intro → Verse 1 → Chorus → Verse 2 → Chorus → Bridge → Final Chorus → Outro',
+    'long': 'Intro → Verse 1 → Pre-Chorus → Chorus → Verse 2 → Pre-Chorus → Chorus → Bridge → Instrumental Break → Final Chorus → Extended Outro'
+}
+
+# Vocal options of the song generator form
+VOCALS = ('male', 'female', 'mixed', 'instrumental')
+
+# Most specs accepted by one batch generation request
+BATCH_MAX_ITEMS = 1000
+
+def lyrics_payload(data):
+    """
+    Response of one lyrics spec
     
-    # Map tempo to BPM range
-    tempo_map = {
-        'slow': '60-80 BPM',
-        'medium': '90-120 BPM',
-        'fast': '130-160 BPM'
-    }
+    Raises:
+        ValueError: If the spec has no theme
+    """
+    theme = data.get('theme', '')
+    language = data.get('language', 'english')
+    genre = data.get('genre', 'pop')
+    mood = data.get('mood', 'happy')
+    
+    if not theme:
+        raise ValueError('Theme is required')
     
-    # Map duration to structure
-    duration_map = {
-        'short': 'Intro → Verse → Chorus → Verse → Chorus → Outro',
-        'medium': 'Intro → Verse 1 → Chorus → Verse 2 → Chorus → Bridge → Final Chorus → Outro',
-        'long': 'Intro → Verse 1 → Pre-Chorus → Chorus → Verse 2 → Pre-Chorus → Chorus → Bridge → Instrumental Break → Final Chorus → Extended Outro'
+    # Generate lyrics with language support
+    lyrics = generate_lyrics_template(theme, genre, mood, language)
+    
+    return {
+        'success': True,
+        'lyrics': lyrics,
+        'theme': theme,
+        'genre': genre,
+        'mood': mood,
+        'language': language
     }
+
+def _check_choice(name, value, choices):
+    if not isinstance(value, str) or value not in choices:
+        raise ValueError(f"Invalid {name} {value!r}, expected one of: {', '.join(choices)}")
+
+def song_payload(data):
+    """
+    Response of one song description spec
+    
+    Raises:
+        ValueError: If the spec has no prompt or an unknown duration, tempo or vocals
+    """
+    prompt = data.get('prompt', '')
+    duration = data.get('duration', 'medium')
+    tempo = data.get('tempo', 'medium')
+    vocals = data.get('vocals', 'mixed')
     
-    # Analyze the prompt to extract key elements
-    prompt_lower = prompt.lower()
+    if not prompt:
+        raise ValueError('Prompt is required')
+    _check_choice('duration', duration, SONG_STRUCTURES)
+    _check_choice('tempo', tempo, TEMPO_BPM)
+    _check_choice('vocals', vocals, VOCALS)
     
-    # Detect genre hints
-    genre_hints = []
-    if any(word in prompt_lower for word in ['rock', 'guitar', 'drums', 'electric']):
-        genre_hints.append('Rock')
-    if any(word in prompt_lower for word in ['pop', 'catchy', 'upbeat', 'radio']):
-        genre_hints.append('Pop')
-    if any(word in prompt_lower for word in ['electronic', 'edm', 'synth', 'beat']):
-        genre_hints.append('Electronic')
-    if any(word in prompt_lower for word in ['jazz', 'saxophone', 'swing']):
-        genre_hints.append('Jazz')
-    if any(word in prompt_lower for word in ['classical', 'orchestra', 'piano']):
-        genre_hints.append('Classical')
-    if any(word in prompt_lower for word in ['hip-hop', 'rap', 'trap', 'beats']):
-        genre_hints.append('Hip-Hop')
+    # Generate song description
+    song_description = generate_song_description(prompt, duration, tempo, vocals)
+    
+    return {
+        'success': True,
+        'song_description': song_description,
+        'prompt': prompt
+    }
+
+@app.route('/generate-lyrics', methods=['POST'])
+def generate_lyrics():
+    """Generate AI lyrics based on user input"""
+    try:
+        return jsonify(lyrics_payload(request.get_json()))
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+@app.route('/generate-song', methods=['POST'])
+def generate_song():
+    """Generate AI song description based on user input"""
+    try:
+        return jsonify(song_payload(request.get_json()))
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+def _batch_line(index, payload_function, spec):
+    """
+    NDJSON line of one batch item, with its error instead of failing the batch
     
-    genre_text = ', '.join(genre_hints) if genre_hints else 'Contemporary'
+    Validation errors (ValueError) are reported to the client; anything
+    else is logged and reported as an internal error.
+    """
+    try:
+        if not isinstance(spec, dict):
+            raise ValueError('Item must be a JSON object')
+        result = {'index': index, **payload_function(spec), 'error': None}
+    except ValueError as e:
+        result = {'index': index, 'success': False, 'error': str(e)}
+    except Exception:
+        logger.exception("Error generating batch item %d", index)
+        result = {'index': index, 'success': False, 'error': 'Internal error'}
+    return json.dumps(result, ensure_ascii=False) + '\n'
+
+def batch_response(payload_function):
+    """
+    Stream the results of a batch of specs as NDJSON
     
-    # Detect mood/emotion
-    mood_hints = []
-    if any(word in prompt_lower for word in ['happy', 'upbeat', 'cheerful', 'joyful', 'fun']):
-        mood_hints.append('uplifting and energetic')
-    if any(word in prompt_lower for word in ['sad', 'melancholic', 'emotional', 'heartbreak']):
-        mood_hints.append('emotional and introspective')
-    if any(word in prompt_lower for word in ['romantic', 'love', 'passion']):
-        mood_hints.append('romantic and tender')
-    if any(word in prompt_lower for word in ['aggressive', 'intense', 'powerful']):
-        mood_hints.append('intense and powerful')
-    if any(word in prompt_lower for word in ['calm', 'peaceful', 'relaxing', 'chill']):
-        mood_hints.append('calm and soothing')
+    The request body is a JSON array of specs, or an object with the array
+    under 'items'. Every spec is generated independently and yields one
+    line, in request order, with its 'index' in the array and an 'error'
+    (null on success).
+    """
+    data = request.get_json(silent=True)
+    specs = data.get('items') if isinstance(data, dict) else data
+    if not isinstance(specs, list):
+        return jsonify({'error': 'Expected a JSON array of items'}), 400
+    if len(specs) > BATCH_MAX_ITEMS:
+        return jsonify({'error': f'At most {BATCH_MAX_ITEMS} items per batch'}), 400
     
-    mood_text = ', '.join(mood_hints) if mood_hints else 'balanced and expressive'
+    def generate():
+        for index, spec in enumerate(specs):
+            yield _batch_line(index, payload_function, spec)
     
-    # Detect instruments
-    instruments = []
-    if 'guitar' in prompt_lower:
-        instruments.append('electric guitar' if 'electric' in prompt_lower else 'acoustic guitar')
-    if any(word in prompt_lower for word in ['piano', 'keys', 'keyboard']):
-        instruments.append('piano')
-    if 'drums' in prompt_lower or 'percussion' in prompt_lower:
-        instruments.append('dynamic drums and percussion')
-    if any(word in prompt_lower for word in ['synth', 'electronic']):
-        instruments.append('synthesizers')
-    if 'bass' in prompt_lower:
-        instruments.append('bass guitar')
-    if 'strings' in prompt_lower or 'violin' in prompt_lower:
-        instruments.append('string section')
+    return Response(generate(), mimetype='application/x-ndjson')
+
+@app.route('/generate-lyrics/batch', methods=['POST'])
+def generate_lyrics_batch():
+    """Generate lyrics for an array of /generate-lyrics specs, streamed as NDJSON"""
+    return batch_response(lyrics_payload)
+
+@app.route('/generate-song/batch', methods=['POST'])
+def generate_song_batch():
+    """Generate song descriptions for an array of /generate-song specs, streamed as NDJSON"""
+    return batch_response(song_payload)
+
+def generate_song_description(prompt, duration, tempo, vocals):
+    """Generate detailed song description for AI music platforms"""
     
-    instruments_text = ', '.join(instruments) if instruments else 'varied instrumentation'
+    # Analyze the prompt to extract key elements (one scan for all categories)
+    hints = analyze_prompt(prompt)
+    genre_text = ', '.join(hints['genre']) or 'Contemporary'
+    mood_text = ', '.join(hints['mood']) or 'balanced and expressive'
+    instruments_text = ', '.join(hints['instruments']) or 'varied instrumentation'
     
     # Build the description
     description = f"""🎵 AI SONG DESCRIPTION
@@ -334,7 +706,7 @@ def generate_song_description(prompt, duration, tempo, vocals):
 
 Genre: {genre_text}
 Mood/Emotion: {mood_text}
-Tempo: {tempo.capitalize()} ({tempo_map[tempo]})
+Tempo: {tempo.capitalize()} ({TEMPO_BPM[tempo]})
 Duration: {duration.capitalize()}
 Vocals: {vocals.capitalize()}
 
@@ -349,7 +721,7 @@ Vocal Style: {'Professional studio vocals with emotion and clarity' if vocals !=
 {'=' * 60}
 
 🎭 SONG STRUCTURE:
-{duration_map[duration]}
+{SONG_STRUCTURES[duration]}
 
 {'=' * 60}
 
@@ -380,308 +752,9 @@ platforms like Suno AI, Udio, or MusicLM for best results!
     
     return description
 
-def generate_multilingual_lyrics(theme, genre, mood, language):
-    """Generate lyrics in different Indian languages"""
-    
-    # Language-specific templates
-    lyrics_templates = {
-        'hindi': {
-            'verse': [
-                f"दिल में है {theme} की आग",
-                f"जो जलती है हर एक राग",
-                f"{theme} के साथ है ये सफर",
-                f"हर पल में मिले नया असर"
-            ],
-            'chorus': [
-                f"ओ {theme}, तू ही है मेरी जान",
-                f"तेरे बिना अधूरी ये कहान",
-                f"{theme} से है ये प्यार",
-                f"दिल की धड़कन, जीवन का आधार"
-            ],
-            'bridge': f"जब भी लगे अंधेरा\n{theme} बने सहारा मेरा",
-            'outro': f"{theme}... {theme}...\nसदा रहे दिल में बसा"
-        },
-        'kannada': {
-            'verse': [
-                f"{theme} ನನ್ನ ಹೃದಯದಲ್ಲಿ",
-                f"ಸದಾ ನಿನ್ನ ನೆನಪಿನಲ್ಲಿ",
-                f"{theme} ನೀನು ನನ್ನ ಜೀವನ",
-                f"ಪ್ರತಿ ಕ್ಷಣ ಹೊಸ ಸಂತೋಷ"
-            ],
-            'chorus': [
-                f"ಓ {theme}, ನೀನೇ ನನ್ನ ಪ್ರಾಣ",
-                f"ನಿನ್ನ ಬಿಟ್ಟು ಇಲ್ಲ ನನಗೆ ಸ್ಥಾನ",
-                f"{theme} ಯೊಂದಿಗೆ ಪ್ರೀತಿ",
-                f"ಹೃದಯದ ಗೀತೆ, ಜೀವನದ ರೀತಿ"
-            ],
-            'bridge': f"ಕತ್ತಲು ಆವರಿಸಿದಾಗ\n{theme} ನೀನೇ ನನ್ನ ಬೆಳಕು",
-            'outro': f"{theme}... {theme}...\nಎಂದೆಂದಿಗೂ ನನ್ನೊಂದಿಗೆ"
-        },
-        'tamil': {
-            'verse': [
-                f"{theme} என் மனதில்",
-                f"நீ எப்போதும் நினைவில்",
-                f"{theme} நீயே என் வாழ்க்கை",
-                f"ஒவ்வொரு நொடியும் புதிய மகிழ்ச்சி"
-            ],
-            'chorus': [
-                f"ஓ {theme}, நீதான் என் உயிர்",
-                f"உன்னை விட்டால் எனக்கு இடமில்லை",
-                f"{theme} உடன் காதல்",
-                f"இதயத்தின் பாட்டு, வாழ்க்கையின் வழி"
-            ],
-            'bridge': f"இருள் சூழும் போது\n{theme} நீயே என் ஒளி",
-            'outro': f"{theme}... {theme}...\nஎன்றென்றும் என்னுடன்"
-        },
-        'telugu': {
-            'verse': [
-                f"{theme} నా హృదయంలో",
-                f"నీవు ఎప్పుడూ జ్ఞాపకంలో",
-                f"{theme} నువ్వే నా జీవితం",
-                f"ప్రతి క్షణం కొత్త ఆనందం"
-            ],
-            'chorus': [
-                f"ఓ {theme}, నువ్వే నా ప్రాణం",
-                f"నిన్ను లేకుండా నాకు స్థానం లేదు",
-                f"{theme} తో ప్రేమ",
-                f"హృదయపు పాట, జీవిత మార్గం"
-            ],
-            'bridge': f"చీకటి ఆవరించినప్పుడు\n{theme} నువ్వే నా వెలుగు",
-            'outro': f"{theme}... {theme}...\nఎప్పటికీ నాతో"
-        },
-        'malayalam': {
-            'verse': [
-                f"{theme} എന്റെ ഹൃദയത്തിൽ",
-                f"നീ എപ്പോഴും ഓർമ്മയിൽ",
-                f"{theme} നീയാണ് എന്റെ ജീവിതം",
-                f"ഓരോ നിമിഷവും പുതിയ സന്തോഷം"
-            ],
-            'chorus': [
-                f"ഓ {theme}, നീയാണ് എന്റെ പ്രാണൻ",
-                f"നിന്നെ കൂടാതെ എനിക്ക് സ്ഥലമില്ല",
-                f"{theme} യോടൊപ്പം സ്നേഹം",
-                f"ഹൃദയത്തിന്റെ പാട്ട്, ജീവിതത്തിന്റെ വഴി"
-            ],
-            'bridge': f"ഇരുട്ട് വരുമ്പോൾ\n{theme} നീയാണ് എന്റെ വെളിച്ചം",
-            'outro': f"{theme}... {theme}...\nഎന്നെന്നേക്കും എന്നോടൊപ്പം"
-        },
-        'marathi': {
-            'verse': [
-                f"{theme} माझ्या हृदयात",
-                f"तू नेहमी आठवणीत",
-                f"{theme} तूच माझे जीवन",
-                f"प्रत्येक क्षण नवा आनंद"
-            ],
-            'chorus': [
-                f"ओ {theme}, तूच माझा प्राण",
-                f"तुझ्याशिवाय मला स्थान नाही",
-                f"{theme} सोबत प्रेम",
-                f"हृदयाचे गीत, जीवनाचा मार्ग"
-            ],
-            'bridge': f"जेव्हा अंधार येतो\n{theme} तूच माझा प्रकाश",
-            'outro': f"{theme}... {theme}...\nसदैव माझ्यासोबत"
-        },
-        'bengali': {
-            'verse': [
-                f"{theme} আমার হৃদয়ে",
-                f"তুমি সর্বদা স্মৃতিতে",
-                f"{theme} তুমিই আমার জীবন",
-                f"প্রতি মুহূর্তে নতুন আনন্দ"
-            ],
-            'chorus': [
-                f"ও {theme}, তুমিই আমার প্রাণ",
-                f"তোমাকে ছাড়া আমার কোনো স্থান নেই",
-                f"{theme} এর সাথে ভালোবাসা",
-                f"হৃদয়ের গান, জীবনের পথ"
-            ],
-            'bridge': f"যখন অন্ধকার আসে\n{theme} তুমিই আমার আলো",
-            'outro': f"{theme}... {theme}...\nচিরকাল আমার সাথে"
-        },
-        'punjabi': {
-            'verse': [
-                f"{theme} ਮੇਰੇ ਦਿਲ ਵਿੱਚ",
-                f"ਤੂੰ ਹਮੇਸ਼ਾ ਯਾਦਾਂ ਵਿੱਚ",
-                f"{theme} ਤੂੰ ਹੀ ਮੇਰੀ ਜ਼ਿੰਦਗੀ",
-                f"ਹਰ ਪਲ ਨਵੀਂ ਖੁਸ਼ੀ"
-            ],
-            'chorus': [
-                f"ਓ {theme}, ਤੂੰ ਹੀ ਮੇਰੀ ਜਾਨ",
-                f"ਤੇਰੇ ਬਿਨਾ ਨਹੀਂ ਕੋਈ ਥਾਂ",
-                f"{theme} ਨਾਲ ਪਿਆਰ",
-                f"ਦਿਲ ਦਾ ਗੀਤ, ਜੀਵਨ ਦਾ ਰਾਹ"
-            ],
-            'bridge': f"ਜਦੋਂ ਹਨੇਰਾ ਆਵੇ\n{theme} ਤੂੰ ਹੀ ਮੇਰੀ ਰੋਸ਼ਨੀ",
-            'outro': f"{theme}... {theme}...\nਹਮੇਸ਼ਾ ਮੇਰੇ ਨਾਲ"
-        },
-        'gujarati': {
-            'verse': [
-                f"{theme} મારા હૃદયમાં",
-                f"તું હંમેશા યાદમાં",
-                f"{theme} તું જ મારું જીવન",
-                f"દરેક ક્ષણે નવો આનંદ"
-            ],
-            'chorus': [
-                f"ઓ {theme}, તું જ મારો પ્રાણ",
-                f"તારા વિના મને સ્થાન નથી",
-                f"{theme} સાથે પ્રેમ",
-                f"હૃદયનું ગીત, જીવનનો માર્ગ"
-            ],
-            'bridge': f"જ્યારે અંધકાર આવે\n{theme} તું જ મારો પ્રકાશ",
-            'outro': f"{theme}... {theme}...\nસદા મારી સાથે"
-        }
-    }
-    
-    template = lyrics_templates.get(language, lyrics_templates['hindi'])
-    
-    # Build lyrics structure
-    lyrics = f"""[Verse 1]
-{template['verse'][0]}
-{template['verse'][1]}
-{template['verse'][2]}
-{template['verse'][3]}
-
-[Chorus]
-{template['chorus'][0]}
-{template['chorus'][1]}
-{template['chorus'][2]}
-{template['chorus'][3]}
-
-[Verse 2]
-{template['verse'][0]}
-{template['verse'][2]}
-{template['verse'][1]}
-{template['verse'][3]}
-
-[Chorus]
-{template['chorus'][0]}
-{template['chorus'][1]}
-{template['chorus'][2]}
-{template['chorus'][3]}
-
-[Bridge]
-{template['bridge']}
-
-[Final Chorus]
-{template['chorus'][0]}
-{template['chorus'][1]}
-{template['chorus'][2]}
-{template['chorus'][3]}
-
-[Outro]
-{template['outro']}
-"""
-    
-    return lyrics
-
 def generate_lyrics_template(theme, genre, mood, language='english'):
     """Generate lyrics using templates based on genre, mood, and language"""
-    
-    # If language is not English, generate transliterated/regional lyrics
-    if language != 'english':
-        return generate_multilingual_lyrics(theme, genre, mood, language)
-    
-    # Theme-based verse templates
-    verse_templates = {
-        'happy': [
-            f"When I think about {theme}, my heart starts to glow",
-            f"Every moment with {theme}, letting feelings flow",
-            f"Dancing through the day, {theme} lights my way",
-            f"Nothing can compare to this joy I display"
-        ],
-        'sad': [
-            f"Memories of {theme} fade like morning dew",
-            f"Lost in thoughts of {theme}, feeling so blue",
-            f"Searching for the light, through the darkest night",
-            f"Hoping {theme} will make things right"
-        ],
-        'energetic': [
-            f"Let's go, {theme} is calling out my name",
-            f"Feel the beat, {theme} sets my soul aflame",
-            f"No stopping now, we're breaking all the chains",
-            f"Living for {theme}, running through the veins"
-        ],
-        'calm': [
-            f"Peaceful moments with {theme} by my side",
-            f"Gentle whispers where {theme} resides",
-            f"In the stillness, {theme} helps me find",
-            f"A quiet place within my mind"
-        ]
-    }
-    
-    chorus_templates = {
-        'pop': [
-            f"Oh {theme}, you're everything I need",
-            f"{theme}, you're the one who sets me free",
-            f"Together we can fly so high",
-            f"With {theme}, reaching for the sky"
-        ],
-        'rock': [
-            f"{theme}! Breaking through the night!",
-            f"{theme}! We're ready for the fight!",
-            f"Nothing's gonna hold us back!",
-            f"With {theme}, we're on the attack!"
-        ],
-        'jazz': [
-            f"{theme} in the moonlight, soft and slow",
-            f"Swaying to the rhythm, letting feelings show",
-            f"In this jazzy paradise we've found",
-            f"With {theme}, love knows no bound"
-        ],
-        'hip-hop': [
-            f"Yeah, {theme} on my mind all day",
-            f"Living life my own unique way",
-            f"{theme} got me feeling so fly",
-            f"Reaching for the stars up in the sky"
-        ]
-    }
-    
-    # Select templates based on mood and genre
-    verses = verse_templates.get(mood, verse_templates['happy'])
-    chorus = chorus_templates.get(genre, chorus_templates['pop'])
-    
-    # Build the complete lyrics
-    lyrics = f"""[Verse 1]
-{verses[0]}
-{verses[1]}
-{verses[2]}
-{verses[3]}
-
-[Chorus]
-{chorus[0]}
-{chorus[1]}
-{chorus[2]}
-{chorus[3]}
-
-[Verse 2]
-The rhythm of {theme} pulses through my soul
-With every beat, {theme} makes me whole
-Can you feel the magic in the air?
-{theme}'s presence everywhere
-
-[Chorus]
-{chorus[0]}
-{chorus[1]}
-{chorus[2]}
-{chorus[3]}
-
-[Bridge]
-When the world feels cold and gray
-{theme} shows me the way
-Through the highs and through the lows
-{theme}'s the melody that flows
-
-[Final Chorus]
-{chorus[0]}
-{chorus[1]}
-{chorus[2]}
-{chorus[3]}
-
-[Outro]
-{theme}... {theme}...
-Forever in my heart, {theme}
-"""
-    
-    return lyrics
+    return render_lyrics(theme, genre, mood, language)
 
 @app.errorhandler(404)
 def not_found(e):
@@ -691,6 +764,11 @@ def not_found(e):
 def server_error(e):
     return render_template('500.html'), 500
 
+@app.before_request
+def tag_request():
+    """Give the request's log records an id and pick it for debug sampling"""
+    start_request(request.headers.get('X-Request-ID'))
+
 # Add lazy loading for first request (Vercel compatible)
 _data_loaded = False
 
@@ -702,8 +780,8 @@ def ensure_data_loaded():
         try:
             load_data()
             _data_loaded = True
-        except Exception as e:
-            print(f"Error loading data: {e}")
+        except Exception:
+            logger.exception("Error loading data")
             _data_loaded = False
 
 if __name__ == '__main__':
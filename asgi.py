@@ -0,0 +1,166 @@
+"""
+ASGI entry point (async serving mode)
+
+Run with:
+    uvicorn asgi:application --host 0.0.0.0 --port $PORT --workers 2
+
+/weather-recommend is served natively on the event loop: the OpenWeatherMap
+call goes through a shared non-blocking httpx client, so one worker keeps
+accepting requests while many weather round trips are in flight. The
+CPU-bound scoring runs on a bounded thread pool. Every other route is
+passed through to the Flask app unchanged.
+
+Requires the packages in requirements-async.txt.
+"""
+import asyncio
+import contextvars
+import json
+import os
+from functools import partial
+from concurrent.futures import ThreadPoolExecutor
+
+import httpx
+from asgiref.wsgi import WsgiToAsgi
+from werkzeug.datastructures import Headers
+from werkzeug.http import parse_accept_header
+
+import app as flask_app
+from serialization import compress, dumps
+from structured_log import get_logger, start_request
+from weather_client import fetch_weather_async
+
+# Threads available for similarity scoring, and how many scoring jobs may
+# be queued or running at once before new requests wait their turn
+SCORING_WORKERS = int(os.environ.get('ASYNC_SCORING_WORKERS', 4))
+SCORING_QUEUE_LIMIT = int(os.environ.get('ASYNC_SCORING_QUEUE', 32))
+
+# Maximum simultaneous connections to the weather API
+WEATHER_MAX_CONNECTIONS = int(os.environ.get('ASYNC_WEATHER_CONNECTIONS', 100))
+
+logger = get_logger(__name__)
+
+wsgi_application = WsgiToAsgi(flask_app.app)
+scoring_executor = ThreadPoolExecutor(max_workers=SCORING_WORKERS, thread_name_prefix='scoring')
+
+_http_client = None
+_scoring_slots = None
+_load_lock = None
+
+
+def _get_http_client():
+    global _http_client
+    if _http_client is None:
+        _http_client = httpx.AsyncClient(
+            limits=httpx.Limits(max_connections=WEATHER_MAX_CONNECTIONS)
+        )
+    return _http_client
+
+
+async def _run_scoring(func, *args):
+    """Run CPU-bound work on the bounded scoring pool"""
+    global _scoring_slots
+    if _scoring_slots is None:
+        _scoring_slots = asyncio.Semaphore(SCORING_QUEUE_LIMIT)
+    async with _scoring_slots:
+        loop = asyncio.get_running_loop()
+        # Carry the request's logging context over to the worker thread
+        context = contextvars.copy_context()
+        return await loop.run_in_executor(scoring_executor, partial(context.run, func, *args))
+
+
+async def _ensure_data_loaded():
+    """Load the datasets once, off the event loop"""
+    global _load_lock
+    if flask_app._data_loaded:
+        return
+    if _load_lock is None:
+        _load_lock = asyncio.Lock()
+    async with _load_lock:
+        if not flask_app._data_loaded:
+            await asyncio.get_running_loop().run_in_executor(None, flask_app.ensure_data_loaded)
+
+
+async def _read_body(receive):
+    body = b''
+    while True:
+        message = await receive()
+        body += message.get('body', b'')
+        if not message.get('more_body'):
+            return body
+
+
+async def _send_json(send, scope, payload, status):
+    headers = Headers([(k.decode('latin-1'), v.decode('latin-1')) for k, v in scope['headers']])
+    accept_encoding = parse_accept_header(headers.get('Accept-Encoding'))
+    body, encoding = compress(dumps(payload), accept_encoding)
+
+    response_headers = [
+        (b'content-type', b'application/json'),
+        (b'content-length', str(len(body)).encode()),
+        (b'vary', b'Accept-Encoding')
+    ]
+    if encoding:
+        response_headers.append((b'content-encoding', encoding.encode()))
+
+    await send({'type': 'http.response.start', 'status': status, 'headers': response_headers})
+    await send({'type': 'http.response.body', 'body': body})
+
+
+async def weather_recommend(scope, receive, send):
+    """Async version of the Flask /weather-recommend route"""
+    request_id = dict(scope['headers']).get(b'x-request-id')
+    start_request(request_id.decode('latin-1') if request_id else None)
+    try:
+        data = json.loads(await _read_body(receive) or b'{}')
+        await _ensure_data_loaded()
+
+        weather_recommender = flask_app.weather_recommender
+        if not weather_recommender:
+            await _send_json(send, scope, {
+                'success': False,
+                'error': flask_app.WEATHER_UNAVAILABLE_ERROR
+            }, 503)
+            return
+
+        weather_info = await fetch_weather_async(
+            _get_http_client(), data.get('latitude'), data.get('longitude'),
+            weather_recommender.api_key
+        )
+        result = await _run_scoring(
+            weather_recommender.recommend_for_weather,
+            weather_info, flask_app.WEATHER_RECOMMENDATIONS
+        )
+
+        payload, status = await _run_scoring(flask_app.weather_result_payload, result)
+        await _send_json(send, scope, payload, status)
+    except Exception as e:
+        logger.exception("Error in weather recommendation")
+        await _send_json(send, scope, {
+            'success': False,
+            'error': f'An error occurred: {str(e)}'
+        }, 500)
+
+
+async def _lifespan(receive, send):
+    while True:
+        message = await receive()
+        if message['type'] == 'lifespan.startup':
+            await _ensure_data_loaded()
+            await send({'type': 'lifespan.startup.complete'})
+        elif message['type'] == 'lifespan.shutdown':
+            if _http_client is not None:
+                await _http_client.aclose()
+            scoring_executor.shutdown(wait=False)
+            await send({'type': 'lifespan.shutdown.complete'})
+            return
+
+
+async def application(scope, receive, send):
+    """ASGI application: native async weather route, Flask for the rest"""
+    if scope['type'] == 'lifespan':
+        await _lifespan(receive, send)
+    elif (scope['type'] == 'http' and scope['path'] == '/weather-recommend'
+          and scope['method'] == 'POST'):
+        await weather_recommend(scope, receive, send)
+    else:
+        await wsgi_application(scope, receive, send)
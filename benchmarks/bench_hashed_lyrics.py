@@ -0,0 +1,132 @@
+"""
+Benchmark the peak memory of the Spotify build with and without hashed lyrics
+
+Every build runs in a fresh worker process on a catalog whose lyrics are
+drawn from a large Zipf-distributed vocabulary (like real lyrics, so the
+bigram dictionary of the default build is large). The worker reports the
+build time and the peak RSS above the catalog itself. Quality is the share
+of the default build's top-10 recommendations the hashed build also
+returns, over sampled seed songs.
+
+Usage:
+    python benchmarks/bench_hashed_lyrics.py --rows 50000 200000
+"""
+import argparse
+import json
+import os
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+
+import numpy as np
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, REPO_ROOT)
+
+from synthetic import spotify_catalog
+
+VOCABULARY_SIZE = 50000
+LYRICS_WORDS = 200
+TOP_N = 10
+
+
+def _peak_rss_mb():
+    # ru_maxrss is in KiB on Linux and in bytes on macOS
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak / (1024 * 1024) if sys.platform == 'darwin' else peak / 1024
+
+
+def lyrics_catalog(n_songs, seed=0):
+    """Spotify-shaped catalog with Zipf-distributed lyrics"""
+    rng = np.random.default_rng(seed)
+    df = spotify_catalog(n_songs, seed=seed)
+    vocabulary = np.array([f"word{i}" for i in range(VOCABULARY_SIZE)], dtype=object)
+    weights = 1.0 / np.arange(1, VOCABULARY_SIZE + 1)
+    words = rng.choice(VOCABULARY_SIZE, size=(n_songs, LYRICS_WORDS), p=weights / weights.sum())
+    df['text'] = [' '.join(row) for row in vocabulary[words]]
+    return df
+
+
+def _build(df, hashed):
+    from spotify_recommender import SpotifyMusicRecommender
+    return SpotifyMusicRecommender(df, hashed_lyrics=hashed, near_duplicate_threshold=None)
+
+
+def run_worker(n_songs, hashed):
+    """Build once and measure (runs in a worker process)"""
+    df = lyrics_catalog(n_songs)
+    catalog_rss = _peak_rss_mb()
+    start = time.perf_counter()
+    recommender = _build(df, hashed)
+    return {
+        'build_s': time.perf_counter() - start,
+        'build_peak_mb': _peak_rss_mb() - catalog_rss,
+        'matrix_mb': recommender.tfidf_matrix.data.nbytes / 1024 / 1024
+    }
+
+
+def _measure(n_songs, hashed):
+    with tempfile.NamedTemporaryFile(suffix='.json', delete=False) as handle:
+        output = handle.name
+    command = [sys.executable, os.path.abspath(__file__), '--worker', str(n_songs),
+               '1' if hashed else '0', output]
+    try:
+        subprocess.run(command, cwd=REPO_ROOT, check=True, stdout=subprocess.DEVNULL)
+        with open(output) as f:
+            return json.load(f)
+    finally:
+        os.remove(output)
+
+
+def recommendation_overlap(n_songs, n_seeds=200):
+    """Share of the default build's top-N neighbours the hashed build also finds"""
+    from ranking import top_k
+    with open(os.devnull, 'w') as devnull:
+        stdout, sys.stdout = sys.stdout, devnull
+        try:
+            df = lyrics_catalog(n_songs)
+            default, hashed = _build(df, False), _build(df, True)
+        finally:
+            sys.stdout = stdout
+
+    seeds = np.random.default_rng(1).choice(len(default.df), size=min(n_seeds, len(default.df)),
+                                            replace=False)
+    shared = 0
+    for seed in seeds:
+        expected = top_k(default._similarity_scores(seed), TOP_N, exclude=seed)
+        found = top_k(hashed._similarity_scores(seed), TOP_N, exclude=seed)
+        shared += len(np.intersect1d(expected, found))
+    return shared / (len(seeds) * TOP_N)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--rows', type=int, nargs='+', default=[50000, 200000])
+    parser.add_argument('--overlap-rows', type=int, default=20000,
+                        help="catalog size of the recommendation overlap check")
+    parser.add_argument('--worker', nargs=3, metavar=('SONGS', 'HASHED', 'OUTPUT'),
+                        help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.worker:
+        n_songs, hashed, output = args.worker
+        result = run_worker(int(n_songs), hashed == '1')
+        with open(output, 'w') as f:
+            json.dump(result, f)
+        return
+
+    print(f"{'rows':>10}  {'mode':<10}{'build (s)':>11}{'peak (MB)':>11}{'matrix (MB)':>13}")
+    for n_songs in args.rows:
+        for hashed in (False, True):
+            result = _measure(n_songs, hashed)
+            print(f"{n_songs:>10,}  {'hashed' if hashed else 'default':<10}{result['build_s']:>11.1f}"
+                  f"{result['build_peak_mb']:>11.0f}{result['matrix_mb']:>13.0f}")
+
+    overlap = recommendation_overlap(args.overlap_rows)
+    print(f"\nTop-{TOP_N} overlap with the default build ({args.overlap_rows:,} songs): {overlap:.1%}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,93 @@
+"""
+Compare sparse TF-IDF scoring with the dense latent (LSA) mode
+
+Reports build time, per-query latency and the overlap of the top-k
+recommendation lists between both modes.
+
+Usage:
+    python benchmarks/bench_latent.py --songs 50000 --dims 128
+"""
+import argparse
+import os
+import sys
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from synthetic import spotify_catalog, indian_catalog
+from spotify_recommender import SpotifyMusicRecommender
+from indian_languages_recommender import IndianLanguagesRecommender
+
+DATASETS = {
+    'spotify': (spotify_catalog, SpotifyMusicRecommender),
+    'indian_languages': (indian_catalog, IndianLanguagesRecommender)
+}
+
+
+def _top_k(scores, song_idx, k):
+    scores = scores.copy()
+    scores[song_idx] = -np.inf
+    top = np.argpartition(-scores, k)[:k]
+    return set(top.tolist())
+
+
+def _query_latency_ms(recommender, queries):
+    timings = []
+    for song_idx in queries:
+        start = time.perf_counter()
+        recommender._similarity_scores(song_idx)
+        timings.append((time.perf_counter() - start) * 1000)
+    return np.percentile(timings, [50, 95])
+
+
+def run(dataset, n_songs, dims, n_queries, k):
+    make_catalog, recommender_class = DATASETS[dataset]
+    df = make_catalog(n_songs)
+
+    start = time.perf_counter()
+    sparse = recommender_class(df)
+    sparse_build = time.perf_counter() - start
+
+    start = time.perf_counter()
+    dense = recommender_class(df, latent_dims=dims)
+    dense_build = time.perf_counter() - start
+
+    rng = np.random.default_rng(0)
+    queries = rng.choice(len(sparse.df), size=min(n_queries, len(sparse.df)), replace=False)
+
+    overlaps = []
+    for song_idx in queries:
+        sparse_top = _top_k(sparse._similarity_scores(song_idx), song_idx, k)
+        dense_top = _top_k(dense._similarity_scores(song_idx), song_idx, k)
+        overlaps.append(len(sparse_top & dense_top) / k)
+
+    sparse_p50, sparse_p95 = _query_latency_ms(sparse, queries)
+    dense_p50, dense_p95 = _query_latency_ms(dense, queries)
+
+    print("\n" + "=" * 60)
+    print(f"📊 {dataset}: {len(sparse.df):,} songs, {dense.latent_index.dims} latent dims")
+    print("=" * 60)
+    print(f"{'':<10}{'build (s)':>12}{'p50 (ms)':>12}{'p95 (ms)':>12}")
+    print(f"{'sparse':<10}{sparse_build:>12.2f}{sparse_p50:>12.3f}{sparse_p95:>12.3f}")
+    print(f"{'latent':<10}{dense_build:>12.2f}{dense_p50:>12.3f}{dense_p95:>12.3f}")
+    print(f"Top-{k} overlap with sparse results: {np.mean(overlaps):.1%}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--dataset', choices=list(DATASETS) + ['all'], default='all')
+    parser.add_argument('--songs', type=int, default=20000)
+    parser.add_argument('--dims', type=int, default=128)
+    parser.add_argument('--queries', type=int, default=200)
+    parser.add_argument('-k', type=int, default=10)
+    args = parser.parse_args()
+
+    datasets = list(DATASETS) if args.dataset == 'all' else [args.dataset]
+    for dataset in datasets:
+        run(dataset, args.songs, args.dims, args.queries, args.k)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,125 @@
+"""
+Benchmark /generate-lyrics with the compiled templates against the original code
+
+The original generate_lyrics_template() (which formats the templates of
+every language per call) is read from the app.py of a baseline commit,
+by default the one before lyrics_templates.py was added, and swapped into
+the app for the baseline runs. Two workloads are measured, through the
+Flask test client and as direct calls of the generator:
+
+- unique: every request has a new theme (LRU cache misses)
+- repeated: requests cycle through a few themes (LRU cache hits)
+
+Every response is checked to be identical between the two versions.
+
+Usage:
+    python benchmarks/bench_lyrics.py --requests 20000
+    python benchmarks/bench_lyrics.py --baseline v1.2
+"""
+import argparse
+import ast
+import itertools
+import os
+import subprocess
+import sys
+import time
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, REPO_ROOT)
+
+import app as flask_app
+from lyrics_templates import REGIONAL_TEMPLATES, _render
+
+LANGUAGES = ['english'] + list(REGIONAL_TEMPLATES)
+MOODS = ['happy', 'sad', 'energetic', 'calm']
+GENRES = ['pop', 'rock', 'jazz', 'hip-hop']
+REPEATED_THEMES = 20
+
+
+def _git(*args):
+    return subprocess.run(['git', *args], cwd=REPO_ROOT, check=True,
+                          capture_output=True, text=True).stdout.strip()
+
+
+def default_baseline():
+    """Commit before lyrics_templates.py was added (HEAD while it is uncommitted)"""
+    added = _git('log', '--diff-filter=A', '--format=%H', '--', 'lyrics_templates.py')
+    return f"{added.splitlines()[-1]}^" if added else 'HEAD'
+
+
+def baseline_generator(revision):
+    """generate_lyrics_template() of app.py at a revision"""
+    tree = ast.parse(_git('show', f"{revision}:app.py"))
+    functions = [node for node in tree.body if isinstance(node, ast.FunctionDef)
+                 and node.name in ('generate_lyrics_template', 'generate_multilingual_lyrics')]
+    namespace = {}
+    exec(compile(ast.Module(body=functions, type_ignores=[]), f"{revision}:app.py", 'exec'), namespace)
+    return namespace['generate_lyrics_template']
+
+
+def workload(n_requests, repeated):
+    """Lyrics specs of one workload, cycling through every language, mood and genre"""
+    styles = itertools.cycle(itertools.product(LANGUAGES, MOODS, GENRES))
+    return [
+        {'theme': f"theme {i % REPEATED_THEMES if repeated else i}",
+         'language': language, 'mood': mood, 'genre': genre}
+        for i, (language, mood, genre) in zip(range(n_requests), styles)
+    ]
+
+
+def endpoint_throughput(client, specs):
+    """Requests per second and response bodies of /generate-lyrics"""
+    bodies = []
+    start = time.perf_counter()
+    for spec in specs:
+        bodies.append(client.post('/generate-lyrics', json=spec).get_data())
+    return len(specs) / (time.perf_counter() - start), bodies
+
+
+def call_throughput(generate, specs):
+    """Calls per second and results of a lyrics generator"""
+    start = time.perf_counter()
+    results = [generate(spec['theme'], spec['genre'], spec['mood'], spec['language'])
+               for spec in specs]
+    return len(specs) / (time.perf_counter() - start), results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--requests', type=int, default=20000)
+    parser.add_argument('--baseline', help="git revision of the original code "
+                                           "(default: the commit before lyrics_templates.py)")
+    args = parser.parse_args()
+
+    revision = args.baseline or default_baseline()
+    compiled = flask_app.generate_lyrics_template
+    versions = {'baseline': baseline_generator(revision), 'compiled': compiled}
+    # Serve requests without loading any dataset
+    flask_app._data_loaded = True
+    client = flask_app.app.test_client()
+
+    print(f"Baseline: {revision}\n")
+    print(f"{'workload':<10}{'version':<10}{'endpoint (req/s)':>18}{'direct (calls/s)':>18}")
+    for name in ('unique', 'repeated'):
+        specs = workload(args.requests, name == 'repeated')
+        responses = {}
+        for version, generate in versions.items():
+            _render.cache_clear()
+            flask_app.generate_lyrics_template = generate
+            try:
+                endpoint_rate, responses[version] = endpoint_throughput(client, specs)
+            finally:
+                flask_app.generate_lyrics_template = compiled
+            _render.cache_clear()
+            call_rate, _ = call_throughput(generate, specs)
+            print(f"{name:<10}{version:<10}{endpoint_rate:>18,.0f}{call_rate:>18,.0f}")
+        if responses['baseline'] != responses['compiled']:
+            sys.exit(f"{name}: responses differ from the baseline")
+
+    info = _render.cache_info()
+    print(f"\nAll responses identical. LRU cache after the repeated direct calls: "
+          f"{info.hits:,} hits, {info.misses:,} misses")
+
+
+if __name__ == '__main__':
+    main()
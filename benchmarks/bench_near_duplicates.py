@@ -0,0 +1,60 @@
+"""
+Benchmark the near-duplicate stage on synthetic catalogs with injected variants
+
+A share of the songs is copied as "- 2011 Remaster", "(Live)" and
+"(feat. X)" variants with slightly changed lyrics. The benchmark reports
+the stage time, how many variants were merged into their original and
+how many distinct songs were merged by mistake.
+
+Usage:
+    python benchmarks/bench_near_duplicates.py --rows 100000 1000000
+"""
+import argparse
+import os
+import sys
+import time
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from synthetic import spotify_catalog
+from near_duplicates import find_near_duplicates
+
+SUFFIXES = [' - 2011 Remaster', ' (Live)', ' (feat. Guest Star)']
+
+
+def with_variants(df, share, seed=0):
+    """The catalog followed by variants of a share of its songs"""
+    rng = np.random.default_rng(seed)
+    originals = rng.choice(len(df), size=int(len(df) * share), replace=False)
+    variants = df.iloc[originals].copy()
+    variants['song'] = variants['song'] + np.array(SUFFIXES, dtype=object)[
+        rng.integers(0, len(SUFFIXES), len(variants))
+    ]
+    variants['text'] = variants['text'].str.slice(0, 180) + ' oh yeah'
+    return pd.concat([df, variants], ignore_index=True), originals
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--rows', type=int, nargs='+', default=[100000, 1000000])
+    parser.add_argument('--share', type=float, default=0.05, help="share of songs with a variant")
+    args = parser.parse_args()
+
+    print(f"{'rows':>10}{'time (s)':>10}{'variants':>10}{'merged':>9}{'false merges':>14}")
+    for n_rows in args.rows:
+        df, originals = with_variants(spotify_catalog(n_rows), args.share)
+        start = time.perf_counter()
+        canonical = find_near_duplicates(df['song'], df['artist'], df['text'])
+        elapsed = time.perf_counter() - start
+
+        variants = np.arange(n_rows, len(df))
+        merged = np.mean(canonical[variants] == canonical[originals])
+        false_merges = int(np.sum(canonical[:n_rows] != np.arange(n_rows)))
+        print(f"{len(df):>10,}{elapsed:>10.1f}{len(variants):>10,}{merged:>9.1%}{false_merges:>14,}")
+
+
+if __name__ == '__main__':
+    main()
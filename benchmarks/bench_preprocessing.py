@@ -0,0 +1,91 @@
+"""
+Benchmark the vectorized preprocessing against the former row-wise df.apply
+
+Usage:
+    python benchmarks/bench_preprocessing.py --rows 100000 1000000
+"""
+import argparse
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from synthetic import original_catalog, indian_catalog
+from preprocessing import audio_feature_tags, fill_text_columns
+from recommendation import MusicRecommender
+
+
+# Missing value fills of MusicRecommender's text fields
+TEXT_DEFAULTS = {'lyrics': '', 'genre': 'unknown', 'mood': 'neutral', 'artist': 'unknown'}
+
+
+def legacy_combined_features(df):
+    """Feature text as MusicRecommender built it before (one lambda per row)"""
+    df = df.copy()
+    for column, default in TEXT_DEFAULTS.items():
+        df[column] = df[column].fillna(default)
+    # Genre was repeated to weight it
+    df['genre_weight'] = df['genre'] + ' ' + df['genre'] + ' ' + df['genre']
+    columns = ['lyrics', 'genre', 'genre_weight', 'mood', 'artist']
+    return df[columns].apply(lambda x: ' '.join(x.astype(str)), axis=1).str.lower()
+
+
+def field_texts(df):
+    """Per-field vectorizer input as MusicRecommender builds it now"""
+    df = df.copy()
+    fill_text_columns(df, TEXT_DEFAULTS)
+    return {field: df[field].astype(str) for field in MusicRecommender.TEXT_FIELDS}
+
+
+def legacy_audio_tags(df):
+    """Audio tags as IndianLanguagesRecommender built them before"""
+    def to_text(row):
+        desc = []
+        if row['danceability'] > 0.7:
+            desc.append('high_dance')
+        elif row['danceability'] < 0.3:
+            desc.append('low_dance')
+        if row['energy'] > 0.7:
+            desc.append('high_energy')
+        elif row['energy'] < 0.3:
+            desc.append('low_energy')
+        if row['acousticness'] > 0.5:
+            desc.append('acoustic')
+        if row['Valence'] > 0.7:
+            desc.append('happy')
+        elif row['Valence'] < 0.3:
+            desc.append('sad')
+        return ' '.join(desc)
+    return df.apply(to_text, axis=1)
+
+
+def _time(func, *args):
+    start = time.perf_counter()
+    func(*args)
+    return time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--rows', type=int, nargs='+', default=[100000, 1000000])
+    args = parser.parse_args()
+
+    print(f"{'rows':>10}  {'stage':<18}{'row-wise (s)':>14}{'vectorized (s)':>16}{'speedup':>9}")
+    for n_rows in args.rows:
+        original = original_catalog(n_rows)
+        indian = indian_catalog(n_rows)
+
+        stages = [
+            ('feature text', legacy_combined_features, field_texts, original),
+            ('audio tags', legacy_audio_tags, audio_feature_tags, indian)
+        ]
+        for name, legacy, vectorized, df in stages:
+            legacy_time = _time(legacy, df)
+            vectorized_time = _time(vectorized, df)
+            print(f"{n_rows:>10,}  {name:<18}{legacy_time:>14.2f}{vectorized_time:>16.3f}"
+                  f"{legacy_time / vectorized_time:>8.0f}x")
+
+
+if __name__ == '__main__':
+    main()
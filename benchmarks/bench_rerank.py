@@ -0,0 +1,77 @@
+"""
+Benchmark diversity re-ranking (MMR + per-artist cap) on top of top-k
+
+Reports the latency of the re-ranking stage alone and of a full
+get_recommendations call, for k=10 and k=50 over a RERANK_POOL candidate
+pool, plus how many distinct artists end up in the result.
+
+Usage:
+    python benchmarks/bench_rerank.py --songs 50000 --repeat 200
+"""
+import argparse
+import os
+import sys
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from synthetic import spotify_catalog
+from spotify_recommender import SpotifyMusicRecommender
+from reranking import RERANK_POOL, rerank_rows
+
+SETTINGS = [
+    ('relevance only', 0.0, None),
+    ('cap 2/artist', 0.0, 2),
+    ('mmr 0.3', 0.3, None),
+    ('mmr 0.3 + cap 2', 0.3, 2)
+]
+
+
+def _time_ms(func, repeat):
+    start = time.perf_counter()
+    for _ in range(repeat):
+        result = func()
+    return (time.perf_counter() - start) / repeat * 1000, result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--songs', type=int, default=20000)
+    parser.add_argument('--latent-dims', type=int, default=None)
+    parser.add_argument('--repeat', type=int, default=100)
+    args = parser.parse_args()
+
+    recommender = SpotifyMusicRecommender(spotify_catalog(args.songs), latent_dims=args.latent_dims)
+    rng = np.random.default_rng(0)
+    seeds = rng.choice(len(recommender.df), size=args.repeat, replace=False)
+    seed_titles = recommender.df['song'].to_numpy()[seeds]
+    candidates = [recommender._top_similar(seed, RERANK_POOL) for seed in seeds]
+
+    print(f"\nCatalog: {len(recommender.df):,} songs, pool {RERANK_POOL}, "
+          f"{'latent ' + str(args.latent_dims) if args.latent_dims else 'TF-IDF'} scoring")
+    print(f"{'k':>4}  {'setting':<18}{'rerank (ms)':>12}{'end-to-end (ms)':>17}{'artists':>9}")
+    for k in (10, 50):
+        for label, diversity, max_per_artist in SETTINGS:
+            pending = iter(candidates)
+
+            def rerank_only():
+                rows, scores = next(pending)
+                return rerank_rows(recommender, rows, scores, k, diversity, max_per_artist)
+
+            rerank_ms, _ = _time_ms(rerank_only, args.repeat)
+
+            titles = iter(seed_titles)
+            full_ms, result = _time_ms(
+                lambda: recommender.get_recommendations(
+                    next(titles), k, diversity=diversity, max_per_artist=max_per_artist
+                ),
+                args.repeat
+            )
+            print(f"{k:>4}  {label:<18}{rerank_ms:>12.3f}{full_ms:>17.2f}"
+                  f"{result['artist'].nunique():>9}")
+
+
+if __name__ == '__main__':
+    main()
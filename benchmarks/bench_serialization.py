@@ -0,0 +1,91 @@
+"""
+Benchmark response serialization per route: DataFrame.to_dict + jsonify
+against the column-wise serialization layer
+
+Reports encode time and payload bytes (raw and compressed).
+
+Usage:
+    python benchmarks/bench_serialization.py --songs 20000 --repeat 200
+"""
+import argparse
+import os
+import sys
+import time
+
+import numpy as np
+from flask import Flask, jsonify
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from synthetic import indian_catalog, spotify_catalog
+from indian_languages_recommender import IndianLanguagesRecommender
+from spotify_recommender import SpotifyMusicRecommender
+import serialization
+from serialization import frame_records, json_response
+
+
+def _payloads(n_songs):
+    """Representative payloads of each catalog-backed route"""
+    spotify = SpotifyMusicRecommender(spotify_catalog(n_songs))
+    indian = IndianLanguagesRecommender(indian_catalog(n_songs))
+    seed_spotify = spotify.df['song'].iloc[0]
+    seed_indian = indian.df['song_name'].iloc[0]
+    titles = indian.df['song_name']
+
+    weather = indian.df.head(15)[['song_name', 'singer', 'language', 'popularity',
+                                  'energy', 'danceability', 'Valence']].copy()
+    weather['weather_match_score'] = np.random.default_rng(0).random(15)
+
+    return {
+        '/recommend spotify k=10': ('recommendations', spotify.get_recommendations(seed_spotify, 10)),
+        '/recommend spotify k=50': ('recommendations', spotify.get_recommendations(seed_spotify, 50)),
+        '/recommend indian k=10': ('recommendations', indian.get_recommendations(seed_indian, 10)),
+        '/recommend indian k=50': ('recommendations', indian.get_recommendations(seed_indian, 50)),
+        '/weather-recommend indian': ('recommendations', weather),
+        '/search-songs (50)': ('songs', titles.head(50)),
+        '/get-songs page (1000)': ('songs', titles.head(1000))
+    }
+
+
+def _legacy(key, value):
+    payload = value.to_dict('records') if hasattr(value, 'columns') else value.tolist()
+    return jsonify({'success': True, key: payload}).get_data()
+
+
+def _current(key, value):
+    payload = frame_records(value) if hasattr(value, 'columns') else value.tolist()
+    return json_response({'success': True, key: payload}).get_data()
+
+
+def _time_us(func, repeat):
+    start = time.perf_counter()
+    for _ in range(repeat):
+        body = func()
+    return (time.perf_counter() - start) / repeat * 1e6, len(body)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--songs', type=int, default=5000)
+    parser.add_argument('--repeat', type=int, default=200)
+    args = parser.parse_args()
+
+    payloads = _payloads(args.songs)
+    app = Flask(__name__)
+    encoder = 'orjson' if serialization.orjson else 'json'
+
+    print(f"\nEncoder: {encoder}, compression threshold: {serialization.COMPRESS_MIN_BYTES} B")
+    print(f"{'route':<28}{'to_dict+jsonify':>17}{'column-wise':>13}{'raw bytes':>11}"
+          f"{'gzip bytes':>12}")
+    for route, (key, value) in payloads.items():
+        with app.test_request_context():
+            legacy_us, legacy_bytes = _time_us(lambda: _legacy(key, value), args.repeat)
+            current_us, _ = _time_us(lambda: _current(key, value), args.repeat)
+        with app.test_request_context(headers={'Accept-Encoding': 'gzip'}):
+            _, gzip_bytes = _time_us(lambda: _current(key, value), 1)
+        print(f"{route:<28}{legacy_us:>14.0f} µs{current_us:>10.0f} µs"
+              f"{legacy_bytes:>11,}{gzip_bytes:>12,}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,133 @@
+"""
+Load test /weather-recommend in sync (gunicorn) and async (uvicorn) mode
+
+Starts a local OpenWeatherMap stub that answers after a fixed delay, runs
+the app in each serving mode against it and fires concurrent requests, so
+the effect of blocking workers on the weather round trip is visible.
+
+Usage:
+    python benchmarks/load_test_weather.py --requests 200 --concurrency 50 --latency 300
+"""
+import argparse
+import json
+import os
+import subprocess
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import numpy as np
+import requests
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+STUB_RESPONSE = json.dumps({
+    'name': 'Stubville',
+    'sys': {'country': 'IN'},
+    'weather': [{'main': 'Rain', 'description': 'light rain', 'icon': '10d'}],
+    'main': {'temp': 22.5, 'feels_like': 22.0, 'humidity': 81}
+}).encode()
+
+
+def start_weather_stub(port, latency_ms):
+    """Serve a canned weather response after latency_ms, on a background thread"""
+    class Handler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            time.sleep(latency_ms / 1000)
+            self.send_response(200)
+            self.send_header('Content-Type', 'application/json')
+            self.send_header('Content-Length', str(len(STUB_RESPONSE)))
+            self.end_headers()
+            self.wfile.write(STUB_RESPONSE)
+
+        def log_message(self, *args):
+            pass
+
+    ThreadingHTTPServer.daemon_threads = True
+    server = ThreadingHTTPServer(('127.0.0.1', port), Handler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+def start_app(mode, port, workers, weather_url):
+    env = dict(os.environ, OPENWEATHER_URL=weather_url)
+    bind = f'127.0.0.1:{port}'
+    if mode == 'sync':
+        command = [sys.executable, '-m', 'gunicorn', 'app:app', '--workers', str(workers),
+                   '--bind', bind, '--timeout', '120', '--log-level', 'warning']
+    else:
+        command = [sys.executable, '-m', 'uvicorn', 'asgi:application', '--workers', str(workers),
+                   '--host', '127.0.0.1', '--port', str(port), '--log-level', 'warning']
+    process = subprocess.Popen(command, cwd=REPO_ROOT, env=env,
+                               stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+
+    base_url = f'http://{bind}'
+    deadline = time.time() + 120
+    while time.time() < deadline:
+        try:
+            requests.get(f'{base_url}/get-songs?limit=1', timeout=60)
+            return process, base_url
+        except requests.ConnectionError:
+            time.sleep(0.5)
+    process.terminate()
+    raise RuntimeError(f"{mode} server did not start")
+
+
+def run_load(base_url, n_requests, concurrency):
+    def one_request(_):
+        start = time.perf_counter()
+        response = requests.post(f'{base_url}/weather-recommend',
+                                 json={'latitude': 12.97, 'longitude': 77.59}, timeout=120)
+        return time.perf_counter() - start, response.status_code == 200
+
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        # Warm up every worker (dataset loading happens on first request)
+        list(pool.map(one_request, range(concurrency)))
+
+        start = time.perf_counter()
+        results = list(pool.map(one_request, range(n_requests)))
+        elapsed = time.perf_counter() - start
+
+    latencies = np.array([r[0] for r in results]) * 1000
+    return {
+        'throughput_rps': n_requests / elapsed,
+        'p50_ms': float(np.percentile(latencies, 50)),
+        'p95_ms': float(np.percentile(latencies, 95)),
+        'errors': sum(1 for r in results if not r[1])
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--requests', type=int, default=200)
+    parser.add_argument('--concurrency', type=int, default=50)
+    parser.add_argument('--latency', type=int, default=300, help="weather stub delay in ms")
+    parser.add_argument('--workers', type=int, default=2)
+    parser.add_argument('--modes', nargs='+', choices=['sync', 'async'], default=['sync', 'async'])
+    parser.add_argument('--port', type=int, default=8765)
+    args = parser.parse_args()
+
+    stub = start_weather_stub(args.port + 1, args.latency)
+    weather_url = f'http://127.0.0.1:{args.port + 1}/weather'
+
+    print(f"\n{args.requests} requests, concurrency {args.concurrency}, "
+          f"{args.workers} workers, weather stub latency {args.latency} ms")
+    print(f"{'mode':<8}{'req/s':>10}{'p50 (ms)':>12}{'p95 (ms)':>12}{'errors':>8}")
+    try:
+        for mode in args.modes:
+            process, base_url = start_app(mode, args.port, args.workers, weather_url)
+            try:
+                stats = run_load(base_url, args.requests, args.concurrency)
+            finally:
+                process.terminate()
+                process.wait()
+            print(f"{mode:<8}{stats['throughput_rps']:>10.1f}{stats['p50_ms']:>12.0f}"
+                  f"{stats['p95_ms']:>12.0f}{stats['errors']:>8}")
+    finally:
+        stub.shutdown()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,313 @@
+"""
+Benchmark suite covering every recommender and route
+
+For each dataset schema and catalog size, a fresh worker process builds
+the recommenders on a synthetic catalog and measures:
+
+- model build time and peak RSS
+- per-query latency percentiles of recommend, search, mood and weather
+  lookups (the weather API is a local stub answering immediately)
+- Flask endpoint throughput through the test client
+
+Results are written to JSON; pass an earlier results file with --compare
+to print the change of every metric.
+
+Usage:
+    python benchmarks/run.py --sizes 1000 10000 100000 --output results.json
+    python benchmarks/run.py --datasets indian_languages --sizes 1000000 --compare results.json
+"""
+import argparse
+import json
+import os
+import platform
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+
+import numpy as np
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, REPO_ROOT)
+
+from synthetic import CATALOGS, MOODS
+from load_test_weather import start_weather_stub
+
+# The original recommender keeps a dense song x song similarity matrix,
+# so larger catalogs would not fit in memory
+MAX_SONGS = {'original': 10000}
+
+PERCENTILES = (50, 95, 99)
+
+COORDINATES = (12.97, 77.59)
+
+
+def _peak_rss_mb():
+    # ru_maxrss is in KiB on Linux and in bytes on macOS
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak / (1024 * 1024) if sys.platform == 'darwin' else peak / 1024
+
+
+def _timed(func):
+    start = time.perf_counter()
+    result = func()
+    return result, time.perf_counter() - start
+
+
+def _latency(func, queries):
+    """Latency percentiles (ms) of func over the queries"""
+    timings = []
+    for query in queries:
+        start = time.perf_counter()
+        func(query)
+        timings.append((time.perf_counter() - start) * 1000)
+    timings = np.array(timings)
+    stats = {f"p{p}": float(np.percentile(timings, p)) for p in PERCENTILES}
+    stats['mean'] = float(timings.mean())
+    return stats
+
+
+def _throughput(client, requests_):
+    """Requests per second of a route served through the Flask test client"""
+    statuses = []
+    start = time.perf_counter()
+    for method, url, body in requests_:
+        response = client.open(url, method=method, json=body)
+        statuses.append(response.status_code)
+    elapsed = time.perf_counter() - start
+    return {
+        'requests_per_s': len(requests_) / elapsed,
+        'errors': sum(1 for status in statuses if status >= 400)
+    }
+
+
+def _build(dataset, df, latent_dims):
+    """Recommenders for a dataset, with their build times"""
+    timings = {}
+    if dataset == 'original':
+        from recommendation import MusicRecommender
+        from weather_recommendation import WeatherMusicRecommender
+        recommender, timings['build_s'] = _timed(lambda: MusicRecommender(df))
+        weather, timings['weather_build_s'] = _timed(lambda: WeatherMusicRecommender(df))
+    elif dataset == 'spotify':
+        from spotify_recommender import SpotifyMusicRecommender
+        recommender, timings['build_s'] = _timed(
+            lambda: SpotifyMusicRecommender(df, latent_dims=latent_dims)
+        )
+        # The app serves weather requests from the original dataset
+        weather = None
+    else:
+        from indian_languages_recommender import IndianLanguagesRecommender
+        from indian_languages_weather import IndianLanguagesWeatherRecommender
+        recommender, timings['build_s'] = _timed(
+            lambda: IndianLanguagesRecommender(df, latent_dims=latent_dims)
+        )
+        weather, timings['weather_build_s'] = _timed(lambda: IndianLanguagesWeatherRecommender(df))
+    return recommender, weather, timings
+
+
+def _query_functions(dataset, recommender, weather):
+    """Timed operation per query type (None when the dataset lacks it)"""
+    if hasattr(recommender, 'search_songs'):
+        search = lambda query: recommender.search_songs(query)
+    else:
+        search = lambda query: recommender.title_lookup.search(query, limit=20)
+
+    mood = None
+    if dataset == 'original':
+        mood = lambda name: recommender.get_songs_by_mood(name)
+    elif weather is not None:
+        mood = lambda name: weather.get_recommendations_by_mood(name)
+
+    weather_lookup = None
+    if weather is not None:
+        weather_lookup = lambda _: weather.get_weather_based_recommendations(*COORDINATES)
+
+    return {
+        'recommend': lambda title: recommender.get_recommendations(title, 10),
+        'search': search,
+        'mood': mood,
+        'weather': weather_lookup
+    }
+
+
+def _route_requests(titles, words, n_requests, has_weather):
+    """Requests sent to each route in the throughput test"""
+    routes = {
+        'recommend': [('POST', '/recommend', {'song_name': title}) for title in titles],
+        'search-songs': [('GET', f'/search-songs?q={word}', None) for word in words],
+        'get-songs': [('GET', '/get-songs?limit=100', None)],
+        'dataset-stats': [('GET', '/dataset-stats', None)]
+    }
+    if has_weather:
+        latitude, longitude = COORDINATES
+        routes['weather-recommend'] = [
+            ('POST', '/weather-recommend', {'latitude': latitude, 'longitude': longitude})
+        ]
+    return {
+        route: [requests_[i % len(requests_)] for i in range(n_requests)]
+        for route, requests_ in routes.items()
+    }
+
+
+def run_case(dataset, n_songs, n_queries, n_requests, latent_dims):
+    """Build and measure one dataset at one size (runs in a worker process)"""
+    df = CATALOGS[dataset](n_songs)
+    catalog_rss = _peak_rss_mb()
+
+    recommender, weather, result = _build(dataset, df, latent_dims)
+    result.update({
+        'dataset': dataset,
+        'songs': len(recommender.df),
+        'catalog_rss_mb': catalog_rss,
+        'peak_rss_mb': _peak_rss_mb()
+    })
+
+    rng = np.random.default_rng(0)
+    rows = rng.choice(len(recommender.df), size=min(n_queries, len(recommender.df)), replace=False)
+    titles = recommender.df[recommender.TITLE_COLUMN].to_numpy()[rows].tolist()
+    words = [title.split()[0].lower() for title in titles]
+    moods = [MOODS[i % len(MOODS)] for i in range(len(titles))]
+    inputs = {'recommend': titles, 'search': words, 'mood': moods, 'weather': titles}
+
+    # Silence the recommenders' progress output while timing
+    with open(os.devnull, 'w') as devnull:
+        stdout, sys.stdout = sys.stdout, devnull
+        try:
+            result['latency_ms'] = {
+                name: _latency(func, inputs[name])
+                for name, func in _query_functions(dataset, recommender, weather).items()
+                if func is not None
+            }
+
+            import app as flask_app
+            flask_app.music_recommender = recommender
+            flask_app.weather_recommender = weather
+            flask_app._data_loaded = True
+            client = flask_app.app.test_client()
+            result['throughput'] = {
+                route: _throughput(client, requests_)
+                for route, requests_ in _route_requests(
+                    titles, words, n_requests, weather is not None
+                ).items()
+            }
+        finally:
+            sys.stdout = stdout
+    return result
+
+
+def _run_worker(args, dataset, n_songs, env):
+    """Run one case in a fresh process, so build memory is measured in isolation"""
+    with tempfile.NamedTemporaryFile(suffix='.json', delete=False) as handle:
+        output = handle.name
+    command = [
+        sys.executable, os.path.abspath(__file__), '--worker', dataset, str(n_songs), output,
+        '--queries', str(args.queries), '--requests', str(args.requests)
+    ]
+    if args.latent_dims:
+        command += ['--latent-dims', str(args.latent_dims)]
+    try:
+        completed = subprocess.run(command, cwd=REPO_ROOT, env=env,
+                                   stdout=subprocess.DEVNULL, stderr=subprocess.PIPE, text=True)
+        if completed.returncode != 0:
+            return {'dataset': dataset, 'songs': n_songs, 'error': completed.stderr.strip()[-2000:]}
+        with open(output) as f:
+            return json.load(f)
+    finally:
+        os.remove(output)
+
+
+def _flatten(result):
+    """Comparable metrics of one result as {name: value}"""
+    metrics = {key: result[key] for key in ('build_s', 'weather_build_s', 'peak_rss_mb') if key in result}
+    for name, stats in result.get('latency_ms', {}).items():
+        for stat in ('p50', 'p95'):
+            metrics[f"{name} {stat} (ms)"] = stats[stat]
+    for route, stats in result.get('throughput', {}).items():
+        metrics[f"/{route} (req/s)"] = stats['requests_per_s']
+    return metrics
+
+
+def print_result(result, baseline=None):
+    print(f"\n📊 {result['dataset']}: {result['songs']:,} songs")
+    if 'error' in result:
+        print(f"  ❌ {result['error'].splitlines()[-1] if result['error'] else 'worker failed'}")
+        return
+    before = _flatten(baseline) if baseline and 'error' not in baseline else {}
+    for name, value in _flatten(result).items():
+        line = f"  {name:<32}{value:>12.2f}"
+        if name in before and before[name]:
+            line += f"{(value - before[name]) / before[name]:>+10.1%}"
+        print(line)
+
+
+def _git_commit():
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], cwd=REPO_ROOT,
+                              capture_output=True, text=True).stdout.strip() or None
+    except OSError:
+        return None
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--datasets', nargs='+', choices=list(CATALOGS), default=list(CATALOGS))
+    parser.add_argument('--sizes', nargs='+', type=int, default=[1000, 10000, 100000])
+    parser.add_argument('--queries', type=int, default=200, help="queries per latency measurement")
+    parser.add_argument('--requests', type=int, default=200, help="requests per route")
+    parser.add_argument('--latent-dims', type=int, default=None)
+    parser.add_argument('--output', default='benchmark_results.json')
+    parser.add_argument('--compare', default=None, help="earlier results file to compare against")
+    parser.add_argument('--port', type=int, default=8770, help="port of the weather API stub")
+    parser.add_argument('--worker', nargs=3, metavar=('DATASET', 'SONGS', 'OUTPUT'),
+                        help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.worker:
+        dataset, n_songs, output = args.worker
+        result = run_case(dataset, int(n_songs), args.queries, args.requests, args.latent_dims)
+        with open(output, 'w') as f:
+            json.dump(result, f)
+        return
+
+    baseline = {}
+    if args.compare:
+        with open(args.compare) as f:
+            baseline = {(r['dataset'], r['songs']): r for r in json.load(f)['results']}
+
+    stub = start_weather_stub(args.port, 0)
+    env = dict(os.environ, OPENWEATHER_URL=f'http://127.0.0.1:{args.port}/weather')
+
+    results = []
+    try:
+        for dataset in args.datasets:
+            for n_songs in args.sizes:
+                if n_songs > MAX_SONGS.get(dataset, n_songs):
+                    print(f"\nℹ️  Skipping {dataset} at {n_songs:,} songs "
+                          f"(limit {MAX_SONGS[dataset]:,})")
+                    continue
+                result = _run_worker(args, dataset, n_songs, env)
+                print_result(result, baseline.get((dataset, result['songs'])))
+                results.append(result)
+    finally:
+        stub.shutdown()
+
+    with open(args.output, 'w') as f:
+        json.dump({
+            'commit': _git_commit(),
+            'created': time.strftime('%Y-%m-%dT%H:%M:%S'),
+            'python': platform.python_version(),
+            'platform': platform.platform(),
+            'settings': {
+                'queries': args.queries,
+                'requests': args.requests,
+                'latent_dims': args.latent_dims
+            },
+            'results': results
+        }, f, indent=2)
+    print(f"\n✓ Results written to {args.output}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,103 @@
+"""
+Synthetic catalogs matching the schema of each supported dataset
+
+Lyrics are drawn from a handful of topic vocabularies so that similarity
+search has real structure to find, and every generator is seeded so runs
+are reproducible.
+"""
+import numpy as np
+import pandas as pd
+
+TOPICS = [
+    ['love', 'heart', 'kiss', 'forever', 'darling', 'romance', 'tender', 'embrace', 'sweet', 'baby'],
+    ['night', 'city', 'lights', 'drive', 'neon', 'street', 'fast', 'midnight', 'club', 'party'],
+    ['rain', 'tears', 'alone', 'cold', 'grey', 'goodbye', 'broken', 'memories', 'lonely', 'fade'],
+    ['fire', 'fight', 'power', 'rise', 'storm', 'thunder', 'wild', 'blood', 'scream', 'rebel'],
+    ['sun', 'summer', 'beach', 'waves', 'dance', 'sunshine', 'golden', 'smile', 'holiday', 'breeze'],
+    ['road', 'home', 'train', 'mountain', 'river', 'journey', 'country', 'dust', 'highway', 'miles'],
+    ['dream', 'sky', 'moon', 'stars', 'fly', 'wings', 'heaven', 'float', 'cloud', 'angel'],
+    ['money', 'gold', 'hustle', 'crown', 'boss', 'cash', 'diamond', 'flex', 'grind', 'king']
+]
+COMMON_WORDS = ['oh', 'yeah', 'time', 'life', 'world', 'know', 'feel', 'way', 'day', 'baby']
+
+GENRES = ['pop', 'rock', 'jazz', 'hip-hop', 'electronic', 'indie', 'folk', 'classical',
+          'blues', 'r&b', 'ambient', 'acoustic', 'dance', 'reggae', 'soul', 'metal']
+MOODS = ['happy', 'sad', 'energetic', 'calm', 'relaxed', 'romantic', 'melancholic',
+         'peaceful', 'cozy', 'neutral']
+LANGUAGES = ['Hindi', 'Tamil', 'Telugu', 'Kannada', 'Malayalam', 'Bengali',
+             'Marathi', 'Punjabi', 'Gujarati']
+
+
+def _names(rng, prefix, n_unique, size):
+    pool = np.array([f"{prefix} {i}" for i in range(n_unique)], dtype=object)
+    # Zipf-like skew: a few artists own most of the catalog
+    weights = 1.0 / np.arange(1, n_unique + 1)
+    return pool[rng.choice(n_unique, size=size, p=weights / weights.sum())]
+
+
+def _titles(rng, topic_ids, size):
+    vocab = np.array([w.title() for words in TOPICS for w in words], dtype=object)
+    first = topic_ids * len(TOPICS[0]) + rng.integers(0, len(TOPICS[0]), size)
+    second = rng.integers(0, len(vocab), size)
+    return vocab[first] + ' ' + vocab[second] + ' ' + pd.Series(np.arange(size)).astype(str).to_numpy(dtype=object)
+
+
+def _lyrics(rng, topic_ids, size, n_words):
+    topic_words = np.array(TOPICS, dtype=object)
+    common = np.array(COMMON_WORDS, dtype=object)
+    on_topic = topic_words[topic_ids[:, None], rng.integers(0, topic_words.shape[1], (size, n_words))]
+    off_topic = common[rng.integers(0, len(common), (size, n_words))]
+    words = np.where(rng.random((size, n_words)) < 0.7, on_topic, off_topic)
+    return [' '.join(row) for row in words]
+
+
+def spotify_catalog(n_songs, seed=0, n_words=40):
+    """Catalog shaped like the Spotify Million Song Dataset"""
+    rng = np.random.default_rng(seed)
+    topic_ids = rng.integers(0, len(TOPICS), n_songs)
+    return pd.DataFrame({
+        'artist': _names(rng, 'Artist', max(n_songs // 20, 10), n_songs),
+        'song': _titles(rng, topic_ids, n_songs),
+        'link': [f"/a/song/{i}" for i in range(n_songs)],
+        'text': _lyrics(rng, topic_ids, n_songs, n_words)
+    })
+
+
+def indian_catalog(n_songs, seed=0):
+    """Catalog shaped like the Spotify Indian Languages Dataset"""
+    rng = np.random.default_rng(seed)
+    topic_ids = rng.integers(0, len(TOPICS), n_songs)
+    return pd.DataFrame({
+        'song_name': _titles(rng, topic_ids, n_songs),
+        'singer': _names(rng, 'Singer', max(n_songs // 20, 10), n_songs),
+        'language': rng.choice(LANGUAGES, n_songs),
+        'danceability': rng.random(n_songs).round(3),
+        'acousticness': rng.random(n_songs).round(3),
+        'energy': rng.random(n_songs).round(3),
+        'liveness': rng.random(n_songs).round(3),
+        'loudness': (-rng.random(n_songs) * 20).round(2),
+        'speechiness': rng.random(n_songs).round(3),
+        'tempo': (60 + rng.random(n_songs) * 120).round(1),
+        'Valence': rng.random(n_songs).round(3),
+        'popularity': rng.integers(0, 100, n_songs)
+    })
+
+
+def original_catalog(n_songs, seed=0, n_words=15):
+    """Catalog shaped like data/music_data.csv"""
+    rng = np.random.default_rng(seed)
+    topic_ids = rng.integers(0, len(TOPICS), n_songs)
+    return pd.DataFrame({
+        'song': _titles(rng, topic_ids, n_songs),
+        'artist': _names(rng, 'Artist', max(n_songs // 20, 10), n_songs),
+        'genre': rng.choice(GENRES, n_songs),
+        'mood': rng.choice(MOODS, n_songs),
+        'lyrics': _lyrics(rng, topic_ids, n_songs, n_words)
+    })
+
+
+CATALOGS = {
+    'spotify': spotify_catalog,
+    'indian_languages': indian_catalog,
+    'original': original_catalog
+}
@@ -0,0 +1,164 @@
+"""
+Catalog statistics snapshot
+
+CatalogStats is computed once when a recommender builds its model (and is
+saved with it in the model artifact): value counts of the categorical
+columns, a fixed-bin histogram and mean of every numeric feature, and
+popularity quantiles. Everything is kept as additive counts, so songs can
+be added or removed without rescanning the catalog, and the JSON snapshot
+served by /dataset-stats is rebuilt only when the catalog changes.
+"""
+from collections import Counter
+
+import numpy as np
+
+HISTOGRAM_BINS = 20
+
+# Largest values reported per categorical column in the snapshot
+TOP_VALUES = 50
+
+QUANTILES = (0.1, 0.25, 0.5, 0.75, 0.9, 0.99)
+
+
+class CatalogStats:
+    """
+    Incrementally maintained statistics of a song catalog
+    """
+
+    def __init__(self, df, count_columns=(), feature_columns=(), popularity_column=None):
+        """
+        Compute the statistics of a catalog
+
+        Args:
+            df: Catalog DataFrame
+            count_columns: Categorical columns to count values of
+            feature_columns: Numeric columns to histogram
+            popularity_column: Numeric column to report quantiles of (optional)
+        """
+        self.count_columns = [column for column in count_columns if column in df.columns]
+        self.feature_columns = [column for column in feature_columns if column in df.columns]
+        if popularity_column and popularity_column not in df.columns:
+            popularity_column = None
+        self.popularity_column = popularity_column
+
+        self.total = 0
+        self.counts = {column: Counter() for column in self.count_columns}
+        self.bin_edges = {}
+        self.histograms = {}
+        self.sums = {}
+        self.known = {}
+        for column in self.feature_columns:
+            values = df[column].to_numpy(dtype=np.float64)
+            finite = values[np.isfinite(values)]
+            low, high = (finite.min(), finite.max()) if len(finite) else (0.0, 1.0)
+            if low == high:
+                high = low + 1.0
+            # Fixed edges, so later updates stay comparable
+            self.bin_edges[column] = np.linspace(low, high, HISTOGRAM_BINS + 1)
+            self.histograms[column] = np.zeros(HISTOGRAM_BINS, dtype=np.int64)
+            self.sums[column] = 0.0
+            self.known[column] = 0
+        self.popularity_counts = Counter()
+
+        self.snapshot = None
+        self.add(df)
+
+    def add(self, df):
+        """Account for songs added to the catalog"""
+        self._apply(df, 1)
+
+    def remove(self, df):
+        """Account for songs removed from the catalog"""
+        self._apply(df, -1)
+
+    def update(self, added=None, removed=None):
+        """
+        Apply a catalog change
+
+        Args:
+            added: DataFrame of new songs (optional)
+            removed: DataFrame of deleted songs (optional)
+        """
+        if removed is not None:
+            self._apply(removed, -1, refresh=False)
+        if added is not None:
+            self._apply(added, 1, refresh=False)
+        self._refresh()
+
+    def _apply(self, df, sign, refresh=True):
+        self.total += sign * len(df)
+
+        for column in self.count_columns:
+            value_counts = df[column].value_counts()
+            counter = self.counts[column]
+            for value, count in zip(value_counts.index, value_counts.to_numpy()):
+                counter[value] += sign * int(count)
+                if counter[value] <= 0:
+                    del counter[value]
+
+        for column in self.feature_columns:
+            values = df[column].to_numpy(dtype=np.float64)
+            values = values[np.isfinite(values)]
+            edges = self.bin_edges[column]
+            # Values outside the build-time range land in the edge bins
+            bins = np.clip(np.searchsorted(edges, values, side='right') - 1, 0, HISTOGRAM_BINS - 1)
+            self.histograms[column] += sign * np.bincount(bins, minlength=HISTOGRAM_BINS)
+            self.sums[column] += sign * float(values.sum())
+            self.known[column] += sign * len(values)
+
+        if self.popularity_column:
+            values = df[self.popularity_column].to_numpy(dtype=np.float64)
+            unique, counts = np.unique(values[np.isfinite(values)], return_counts=True)
+            for value, count in zip(unique.tolist(), counts.tolist()):
+                self.popularity_counts[value] += sign * count
+                if self.popularity_counts[value] <= 0:
+                    del self.popularity_counts[value]
+
+        if refresh:
+            self._refresh()
+
+    def mean(self, column):
+        """Mean of a feature or popularity column (None if unknown or empty)"""
+        if column in self.sums:
+            return self.sums[column] / self.known[column] if self.known[column] else None
+        if column == self.popularity_column and self.popularity_counts:
+            total = sum(self.popularity_counts.values())
+            return sum(value * count for value, count in self.popularity_counts.items()) / total
+        return None
+
+    def quantiles(self):
+        """Popularity quantiles, from the exact value counts"""
+        if not self.popularity_counts:
+            return {}
+        values = np.array(sorted(self.popularity_counts))
+        cumulative = np.cumsum([self.popularity_counts[value] for value in values])
+        positions = np.ceil(np.array(QUANTILES) * cumulative[-1]).astype(np.int64)
+        picks = np.searchsorted(cumulative, np.maximum(positions, 1))
+        return {f"p{round(q * 100)}": float(values[i]) for q, i in zip(QUANTILES, picks)}
+
+    def _refresh(self):
+        """Rebuild the JSON snapshot served by /dataset-stats"""
+        snapshot = {
+            'total_songs': self.total,
+            'counts': {
+                column: {
+                    'distinct': len(counter),
+                    'top': [[value, count] for value, count in counter.most_common(TOP_VALUES)]
+                }
+                for column, counter in self.counts.items()
+            },
+            'features': {
+                column: {
+                    'mean': self.mean(column),
+                    'bin_edges': self.bin_edges[column].tolist(),
+                    'histogram': self.histograms[column].tolist()
+                }
+                for column in self.feature_columns
+            }
+        }
+        if self.popularity_column:
+            snapshot['popularity'] = {
+                'mean': self.mean(self.popularity_column),
+                'quantiles': self.quantiles()
+            }
+        self.snapshot = snapshot
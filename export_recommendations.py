@@ -0,0 +1,243 @@
+"""
+Offline export of the top-k similar songs for every song in a catalog
+
+Downstream systems that need "similar songs" for the whole catalog get
+them from one batch job instead of a million /recommend calls. The
+catalog is split into chunks that a process pool scores in blocks with
+the recommender's own similarity (the same default weights as
+/recommend, without filters or re-ranking).
+
+Each finished chunk is saved to the output directory as a checkpoint, so
+an interrupted run resumes where it stopped. The run manifest records the
+settings, recommender options and catalog fingerprint, and a resumed run
+must match them. When every chunk is done they are merged into one file:
+
+    npz:    song_ids (n,), neighbors (n, k) int32 row ids, scores (n, k)
+            float32, plus the catalog fingerprint
+    ndjson: one {"song_id", "title", "artist", "neighbors", "scores"}
+            object per line
+
+Usage:
+    python export_recommendations.py --dataset spotify -k 20 --out exports/spotify
+    python export_recommendations.py --dataset indian_languages --format ndjson --workers 8
+"""
+import argparse
+import json
+import multiprocessing
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+import numpy as np
+
+from related_songs import catalog_fingerprint
+from serialization import dumps
+
+# Songs per checkpointed chunk
+CHUNK_SIZE = 2048
+
+# Cells of the dense (block x catalog) score matrix computed at once
+BLOCK_CELLS = 2 ** 23
+
+MANIFEST = 'manifest.json'
+
+_recommender = None
+
+
+def _load(dataset):
+    from app import DATASETS, load_recommender
+    recommender_class, csv_path = DATASETS[dataset]
+    return load_recommender(dataset, recommender_class, csv_path)
+
+
+def _init_worker(dataset):
+    """Use the parent's model when forked, otherwise load it"""
+    global _recommender
+    if _recommender is None:
+        _recommender = _load(dataset)
+
+
+def top_k_rows(scores, song_ids, k):
+    """
+    Top-k columns of each row of a score block, best first
+
+    Args:
+        scores: (len(song_ids), n_songs) similarity scores
+        song_ids: Row id of each score row (excluded from its own neighbours)
+        k: Neighbours per song
+
+    Returns:
+        (neighbors, scores) arrays of shape (len(song_ids), k)
+    """
+    rows = np.arange(len(song_ids))
+    scores[rows, song_ids] = -np.inf
+    candidates = np.argpartition(-scores, k - 1, axis=1)[:, :k]
+    # Best first, ties by row id (as in ranking.top_k)
+    candidates.sort(axis=1)
+    candidate_scores = np.take_along_axis(scores, candidates, axis=1)
+    order = np.argsort(-candidate_scores, axis=1, kind='stable')
+    return (np.take_along_axis(candidates, order, axis=1),
+            np.take_along_axis(candidate_scores, order, axis=1))
+
+
+def export_chunk(start, stop, k, chunk_path):
+    """
+    Score one chunk of songs and save it as a checkpoint
+
+    Returns:
+        Number of songs in the chunk
+    """
+    n_songs = len(_recommender.df)
+    block = max(1, BLOCK_CELLS // n_songs)
+    song_ids = np.arange(start, stop)
+    neighbors = np.empty((len(song_ids), k), dtype=np.int32)
+    scores = np.empty((len(song_ids), k), dtype=np.float32)
+
+    for offset in range(0, len(song_ids), block):
+        ids = song_ids[offset:offset + block]
+        block_scores = np.asarray(_recommender._batch_similarity_scores(ids), dtype=np.float64)
+        neighbors[offset:offset + len(ids)], scores[offset:offset + len(ids)] = top_k_rows(
+            block_scores, ids, k
+        )
+
+    # Write then rename, so a checkpoint is either complete or absent
+    with open(chunk_path + '.tmp', 'wb') as f:
+        np.savez(f, neighbors=neighbors, scores=scores)
+    os.replace(chunk_path + '.tmp', chunk_path)
+    return len(song_ids)
+
+
+def _chunk_path(out_dir, index):
+    return os.path.join(out_dir, f"chunk-{index:06d}.npz")
+
+
+def _check_manifest(out_dir, manifest):
+    """Create the run manifest, or make sure a resumed run matches it"""
+    path = os.path.join(out_dir, MANIFEST)
+    if os.path.exists(path):
+        with open(path) as f:
+            existing = json.load(f)
+        if existing != manifest:
+            changed = sorted(key for key in manifest.keys() | existing.keys()
+                             if existing.get(key) != manifest.get(key))
+            raise SystemExit(
+                f"❌ {out_dir} holds an export with different settings, options or catalog "
+                f"({', '.join(changed)}); use another --out or delete it"
+            )
+        return
+    with open(path, 'w') as f:
+        json.dump(manifest, f, indent=2)
+
+
+def merge_npz(out_dir, chunks, n_export, k, fingerprint, path):
+    neighbors = np.empty((n_export, k), dtype=np.int32)
+    scores = np.empty((n_export, k), dtype=np.float32)
+    for index, (start, stop) in enumerate(chunks):
+        with np.load(_chunk_path(out_dir, index)) as chunk:
+            neighbors[start:stop] = chunk['neighbors']
+            scores[start:stop] = chunk['scores']
+    np.savez(path, song_ids=np.arange(n_export, dtype=np.int32), neighbors=neighbors,
+             scores=scores, fingerprint=np.int64(fingerprint))
+
+
+def merge_ndjson(recommender, out_dir, chunks, path):
+    titles = recommender.df[recommender.TITLE_COLUMN].to_numpy()
+    artists = recommender.df[recommender.ARTIST_COLUMN].to_numpy()
+    with open(path, 'wb') as f:
+        for index, (start, stop) in enumerate(chunks):
+            with np.load(_chunk_path(out_dir, index)) as chunk:
+                neighbors = chunk['neighbors']
+                scores = chunk['scores'].astype(np.float64).round(5)
+            f.write(b''.join(
+                dumps({
+                    'song_id': song_id,
+                    'title': titles[song_id],
+                    'artist': artists[song_id],
+                    'neighbors': neighbors[i].tolist(),
+                    'scores': scores[i].tolist()
+                }) + b'\n'
+                for i, song_id in enumerate(range(start, stop))
+            ))
+
+
+def main():
+    from app import DATASETS, RECOMMENDER_OPTIONS
+
+    parser = argparse.ArgumentParser(description="Export the top-k similar songs for every song")
+    parser.add_argument('--dataset', choices=list(DATASETS), required=True)
+    parser.add_argument('-k', type=int, default=20, help="neighbours per song")
+    parser.add_argument('--format', choices=['npz', 'ndjson'], default='npz')
+    parser.add_argument('--out', help="output directory (default: exports/<dataset>)")
+    parser.add_argument('--workers', type=int, default=os.cpu_count())
+    parser.add_argument('--chunk-size', type=int, default=CHUNK_SIZE)
+    parser.add_argument('--limit', type=int, help="only export the first N songs")
+    parser.add_argument('--keep-chunks', action='store_true', help="keep checkpoints after merging")
+    args = parser.parse_args()
+
+    global _recommender
+    _recommender = _load(args.dataset)
+    n_songs = len(_recommender.df)
+    n_export = min(args.limit or n_songs, n_songs)
+    k = min(args.k, n_songs - 1)
+
+    out_dir = args.out or os.path.join('exports', args.dataset)
+    os.makedirs(out_dir, exist_ok=True)
+    fingerprint = catalog_fingerprint(_recommender)
+    _check_manifest(out_dir, {
+        'dataset': args.dataset,
+        'songs': n_songs,
+        'exported': n_export,
+        'k': k,
+        'chunk_size': args.chunk_size,
+        'fingerprint': fingerprint,
+        # Scoring options (latent_dims, field weights, ...) set from the environment
+        'options': RECOMMENDER_OPTIONS.get(args.dataset, {})
+    })
+
+    chunks = [(start, min(start + args.chunk_size, n_export))
+              for start in range(0, n_export, args.chunk_size)]
+    pending = [index for index in range(len(chunks))
+               if not os.path.exists(_chunk_path(out_dir, index))]
+    done_songs = n_export - sum(chunks[i][1] - chunks[i][0] for i in pending)
+    if done_songs:
+        print(f"↻ Resuming: {len(chunks) - len(pending)}/{len(chunks)} chunks already exported")
+
+    print(f"🔄 Exporting top-{k} neighbours for {n_export:,} songs "
+          f"({len(pending)} chunks, {args.workers} workers)...")
+    start_time = time.perf_counter()
+    exported = 0
+    if pending:
+        # Forked workers share the parent's model instead of loading their own
+        methods = multiprocessing.get_all_start_methods()
+        context = multiprocessing.get_context('fork' if 'fork' in methods else None)
+        with ProcessPoolExecutor(max_workers=args.workers, mp_context=context,
+                                 initializer=_init_worker, initargs=(args.dataset,)) as pool:
+            futures = [
+                pool.submit(export_chunk, *chunks[index], k, _chunk_path(out_dir, index))
+                for index in pending
+            ]
+            for future in as_completed(futures):
+                exported += future.result()
+                elapsed = time.perf_counter() - start_time
+                print(f"  {done_songs + exported:,}/{n_export:,} songs "
+                      f"({exported / elapsed:,.0f} songs/s)")
+
+    elapsed = time.perf_counter() - start_time
+    if exported:
+        print(f"✓ Scored {exported:,} songs in {elapsed:.1f}s ({exported / elapsed:,.0f} songs/s)")
+
+    path = os.path.join(out_dir, f"recommendations.{args.format}")
+    if args.format == 'npz':
+        merge_npz(out_dir, chunks, n_export, k, fingerprint, path)
+    else:
+        merge_ndjson(_recommender, out_dir, chunks, path)
+    print(f"✓ Saved {path} ({os.path.getsize(path) / 1024 / 1024:.1f} MB)")
+
+    if not args.keep_chunks:
+        for index in range(len(chunks)):
+            os.remove(_chunk_path(out_dir, index))
+        os.remove(os.path.join(out_dir, MANIFEST))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,111 @@
+import numpy as np
+import scipy.sparse as sp
+from sklearn.feature_extraction.text import TfidfVectorizer
+from sklearn.preprocessing import normalize
+
+from hashed_tfidf import HashedTfidfVectorizer
+
+
+class FieldWeightedVectorizer:
+    """
+    TF-IDF vectorizer that keeps every text field in its own feature block
+
+    Each field (artist, song, lyrics, genre, mood, ...) gets a separate
+    TfidfVectorizer. The L2-normalised blocks are stacked side by side and
+    scaled by the square root of the field weight before the rows are
+    normalised again, so between two songs with text in every field a field
+    with weight w contributes w / sum(weights) of their cosine similarity.
+    Weights replace repeating a column's text in one combined string and can
+    be changed after fitting without tokenizing the catalog again.
+
+    Fields listed in hashed_fields use HashedTfidfVectorizer instead, which
+    bounds the build's memory on large texts such as lyrics.
+    """
+
+    def __init__(self, field_params, weights=None, hashed_fields=()):
+        """
+        Initialize the vectorizer
+
+        Args:
+            field_params: Mapping of field name to TfidfVectorizer keyword arguments
+            weights: Mapping of field name to relative weight (default 1.0)
+            hashed_fields: Fields vectorized with HashedTfidfVectorizer
+        """
+        self.field_params = field_params
+        self.hashed_fields = set(hashed_fields)
+        self.weights = {field: 1.0 for field in field_params}
+        self._check_fields(weights or {})
+        self.weights.update(weights or {})
+        self.vectorizers = {}
+        self.field_slices = {}
+        self.field_matrix = None
+
+    def fit_transform(self, fields):
+        """
+        Fit one vectorizer per field and return the weighted feature matrix
+
+        Args:
+            fields: Mapping of field name to an iterable of text, one per song
+
+        Returns:
+            Sparse CSR matrix with L2-normalised rows
+        """
+        blocks = []
+        offset = 0
+        for field, params in self.field_params.items():
+            if field in self.hashed_fields:
+                vectorizer = HashedTfidfVectorizer(**params)
+            else:
+                vectorizer = TfidfVectorizer(**params)
+            try:
+                block = vectorizer.fit_transform(fields[field])
+            except ValueError:
+                # No usable term in this field (empty or all stop words)
+                continue
+            self.vectorizers[field] = vectorizer
+            self.field_slices[field] = slice(offset, offset + block.shape[1])
+            offset += block.shape[1]
+            blocks.append(block)
+
+        if not blocks:
+            raise ValueError("None of the text fields produced any features")
+
+        # Unweighted blocks are kept so weights can change without refitting
+        self.field_matrix = sp.hstack(blocks, format='csr', dtype=np.float64)
+        return self._weighted(self.field_matrix)
+
+    def transform(self, fields):
+        """Vectorize new songs with the fitted vocabularies and current weights"""
+        blocks = [vectorizer.transform(fields[field])
+                  for field, vectorizer in self.vectorizers.items()]
+        return self._weighted(sp.hstack(blocks, format='csr', dtype=np.float64))
+
+    def set_weights(self, **weights):
+        """
+        Change field weights and return the re-weighted feature matrix
+
+        Args:
+            **weights: New relative weight per field name
+
+        Returns:
+            Sparse CSR matrix with L2-normalised rows
+        """
+        self._check_fields(weights)
+        self.weights.update(weights)
+        return self._weighted(self.field_matrix)
+
+    @property
+    def n_features(self):
+        """Total number of features across all fields"""
+        return 0 if self.field_matrix is None else self.field_matrix.shape[1]
+
+    def _weighted(self, matrix):
+        scale = np.ones(matrix.shape[1])
+        for field, columns in self.field_slices.items():
+            scale[columns] = np.sqrt(max(self.weights[field], 0.0))
+        return normalize(matrix @ sp.diags(scale), norm='l2', copy=False).tocsr()
+
+    def _check_fields(self, weights):
+        unknown = set(weights) - set(self.field_params)
+        if unknown:
+            raise ValueError(f"Unknown text fields: {', '.join(sorted(unknown))}")
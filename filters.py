@@ -0,0 +1,114 @@
+"""
+Filter predicates for similarity search
+
+A SongFilter precomputes, once per catalog, the sorted row ids of every
+language and artist and the popularity order, so a request's predicates
+(language in a set, popularity >= x, artist not in a set) become a few
+array operations. The recommenders apply the result before top-k
+selection: selective filters are scored row by row, broad ones mask the
+full score array. Either way k results come back whenever at least k
+rows match.
+"""
+import numpy as np
+import pandas as pd
+
+# Filters matching at most this share of the catalog are scored on their
+# own rows; broader filters mask the full score array instead
+SUBSET_SCORING_FRACTION = 0.3
+
+
+def _group_rows(series):
+    """Sorted row ids of each distinct (lowercased) value"""
+    codes, values = pd.factorize(series.astype(str).str.strip().str.lower())
+    order = np.argsort(codes, kind='stable').astype(np.int32)
+    bounds = np.cumsum(np.bincount(codes, minlength=len(values)))[:-1]
+    return dict(zip(values, np.split(order, bounds)))
+
+
+class SongFilter:
+    """
+    Precomputed row-id sets for filter predicates
+    """
+
+    def __init__(self, df, language_column=None, artist_column=None, popularity_column=None):
+        """
+        Index the filterable columns of a catalog
+
+        Args:
+            df: Catalog DataFrame (row positions are the row ids)
+            language_column: Column for language filters (optional)
+            artist_column: Column for artist filters (optional)
+            popularity_column: Column for minimum popularity filters (optional)
+        """
+        self.n_rows = len(df)
+        self.language_rows = _group_rows(df[language_column]) if language_column else None
+        self.artist_rows = _group_rows(df[artist_column]) if artist_column else None
+
+        self.popularity_order = None
+        self.popularity_sorted = None
+        if popularity_column:
+            popularity = df[popularity_column].to_numpy(dtype=np.float64)
+            known = np.flatnonzero(~np.isnan(popularity))
+            self.popularity_order = known[np.argsort(popularity[known], kind='stable')].astype(np.int32)
+            self.popularity_sorted = popularity[self.popularity_order]
+
+    @property
+    def languages(self):
+        """Known (lowercased) languages"""
+        return sorted(self.language_rows) if self.language_rows is not None else []
+
+    def rows(self, languages=None, min_popularity=None, exclude_artists=None):
+        """
+        Row ids passing every given predicate
+
+        Args:
+            languages: Keep only songs in one of these languages
+            min_popularity: Keep only songs with at least this popularity
+            exclude_artists: Drop songs by these artists
+
+        Returns:
+            Sorted 1-D int array of row ids, or None if no predicate is set
+
+        Raises:
+            ValueError: If a predicate's column is not available
+        """
+        if not languages and min_popularity is None and not exclude_artists:
+            return None
+
+        keep = np.ones(self.n_rows, dtype=bool)
+
+        if languages:
+            if self.language_rows is None:
+                raise ValueError("Language filters are not available for this catalog")
+            in_languages = np.zeros(self.n_rows, dtype=bool)
+            for language in languages:
+                rows = self.language_rows.get(str(language).strip().lower())
+                if rows is not None:
+                    in_languages[rows] = True
+            keep &= in_languages
+
+        if min_popularity is not None:
+            if self.popularity_order is None:
+                raise ValueError("Popularity filters are not available for this catalog")
+            start = np.searchsorted(self.popularity_sorted, min_popularity, side='left')
+            popular = np.zeros(self.n_rows, dtype=bool)
+            popular[self.popularity_order[start:]] = True
+            keep &= popular
+
+        if exclude_artists:
+            if self.artist_rows is None:
+                raise ValueError("Artist filters are not available for this catalog")
+            for artist in exclude_artists:
+                rows = self.artist_rows.get(str(artist).strip().lower())
+                if rows is not None:
+                    keep[rows] = False
+
+        return np.flatnonzero(keep)
+
+
+def row_position(rows, row):
+    """Position of a row id in a sorted row-id array, or None if absent"""
+    position = np.searchsorted(rows, row)
+    if position < len(rows) and rows[position] == row:
+        return int(position)
+    return None
@@ -0,0 +1,145 @@
+"""
+Memory-bounded TF-IDF for large text fields
+
+HashedTfidfVectorizer hashes terms into a fixed feature space instead of
+building TfidfVectorizer's full term dictionary, so vectorizing a large
+lyrics column needs a small, fixed amount of memory beyond the result.
+"""
+import numbers
+
+import numpy as np
+import scipy.sparse as sp
+from sklearn.feature_extraction.text import HashingVectorizer
+from sklearn.preprocessing import normalize
+
+
+class HashedTfidfVectorizer:
+    """
+    Memory-bounded drop-in for TfidfVectorizer on large text fields
+
+    TfidfVectorizer builds a dictionary of every term (every bigram with
+    ngram_range=(1, 2)) before min_df, max_df and max_features prune it, so
+    on a lyrics column its peak memory is many times the final model.
+    Here terms are hashed into a fixed feature space instead and the
+    documents are streamed in chunks twice:
+
+    1. Count the document and total frequency of every hashed feature
+       (two fixed-size arrays, whatever the vocabulary size).
+    2. Keep the features passing min_df/max_df, the max_features most
+       frequent of them, and compute their smoothed idf.
+
+    transform() then re-hashes the documents chunk by chunk and keeps only
+    the selected columns. Peak memory is the two counters, one chunk and
+    the final matrix. Apart from rare hash collisions, the result matches
+    TfidfVectorizer with the same settings.
+    """
+
+    def __init__(self, n_hash_features=2 ** 22, chunk_size=10000, max_features=None,
+                 min_df=1, max_df=1.0, **token_params):
+        """
+        Initialize the vectorizer
+
+        Args:
+            n_hash_features: Size of the hashed feature space
+            chunk_size: Documents tokenized at a time
+            max_features: Keep only the most frequent features (None for all)
+            min_df: Minimum document frequency (count, or share of documents)
+            max_df: Maximum document frequency (count, or share of documents)
+            **token_params: Tokenization options shared with TfidfVectorizer
+                (stop_words, ngram_range, token_pattern, lowercase, ...)
+        """
+        self.n_hash_features = n_hash_features
+        self.chunk_size = chunk_size
+        self.max_features = max_features
+        self.min_df = min_df
+        self.max_df = max_df
+        self.hasher = HashingVectorizer(n_features=n_hash_features, alternate_sign=False,
+                                        norm=None, **token_params)
+        self.columns = None
+        self.idf = None
+
+    def _chunks(self, documents):
+        for start in range(0, len(documents), self.chunk_size):
+            yield self.hasher.transform(documents[start:start + self.chunk_size])
+
+    def _document_count(self, value, n_documents):
+        return value if isinstance(value, numbers.Integral) else value * n_documents
+
+    def fit(self, documents):
+        """
+        Select the features and compute their idf from one pass over the documents
+
+        Args:
+            documents: Sequence of text, one per song
+
+        Returns:
+            self
+        """
+        documents = _as_sequence(documents)
+        n_documents = len(documents)
+        document_frequency = np.zeros(self.n_hash_features, dtype=np.int64)
+        term_frequency = np.zeros(self.n_hash_features, dtype=np.float64)
+        for counts in self._chunks(documents):
+            document_frequency += np.bincount(counts.indices, minlength=self.n_hash_features)
+            term_frequency += np.bincount(counts.indices, weights=counts.data,
+                                          minlength=self.n_hash_features)
+
+        if not document_frequency.any():
+            raise ValueError("empty vocabulary; perhaps the documents only contain stop words")
+
+        columns = np.flatnonzero(
+            (document_frequency > 0)
+            & (document_frequency >= self._document_count(self.min_df, n_documents))
+            & (document_frequency <= self._document_count(self.max_df, n_documents))
+        )
+        if len(columns) == 0:
+            raise ValueError("After pruning, no terms remain. Try a lower min_df or a higher max_df.")
+        if self.max_features is not None and len(columns) > self.max_features:
+            # Most frequent first, ties in column order (as TfidfVectorizer)
+            top = np.argsort(-term_frequency[columns], kind='stable')[:self.max_features]
+            columns = np.sort(columns[top])
+
+        self.columns = columns
+        # Smoothed idf, as TfidfVectorizer computes it
+        self.idf = np.log((1 + n_documents) / (1 + document_frequency[columns])) + 1
+        return self
+
+    def transform(self, documents):
+        """
+        TF-IDF rows of documents over the selected features
+
+        Returns:
+            Sparse CSR matrix with L2-normalised rows
+        """
+        documents = _as_sequence(documents)
+        column_of = np.full(self.n_hash_features, -1, dtype=np.int64)
+        column_of[self.columns] = np.arange(len(self.columns))
+
+        blocks = []
+        for counts in self._chunks(documents):
+            # Keep the selected hashed columns (sorted, so rows stay sorted)
+            columns = column_of[counts.indices]
+            kept = columns >= 0
+            rows = np.repeat(np.arange(counts.shape[0]), np.diff(counts.indptr))[kept]
+            indptr = np.concatenate([[0], np.cumsum(np.bincount(rows, minlength=counts.shape[0]))])
+            columns = columns[kept]
+            blocks.append(sp.csr_matrix(
+                (counts.data[kept] * self.idf[columns], columns, indptr),
+                shape=(counts.shape[0], len(self.columns))
+            ))
+
+        if not blocks:
+            return sp.csr_matrix((0, len(self.columns)), dtype=np.float64)
+        return normalize(sp.vstack(blocks, format='csr'), norm='l2', copy=False)
+
+    def fit_transform(self, documents):
+        """Fit on documents and return their TF-IDF rows"""
+        documents = _as_sequence(documents)
+        return self.fit(documents).transform(documents)
+
+
+def _as_sequence(documents):
+    """Documents as a sliceable sequence (Series are read without copying the text)"""
+    if hasattr(documents, 'to_numpy'):
+        return documents.to_numpy(dtype=object)
+    return documents if hasattr(documents, '__getitem__') else list(documents)
@@ -1,17 +1,52 @@
 import pandas as pd
 import numpy as np
-from sklearn.feature_extraction.text import TfidfVectorizer
 from sklearn.metrics.pairwise import cosine_similarity
+from catalog_stats import CatalogStats
+from field_vectorizer import FieldWeightedVectorizer
+from latent_index import LatentIndex
+import metrics
+from near_duplicates import NEAR_DUPLICATE_THRESHOLD, collapse_near_duplicates
+from partitions import CatalogPartitions, csr_rows, partition_order
+from preprocessing import (
+    audio_feature_tags, fill_numeric_median, fill_text_columns, has_audio_tag_columns
+)
+from filters import SUBSET_SCORING_FRACTION, SongFilter, row_position
+from ranking import top_k
+from reranking import RERANK_POOL, rerank_rows, wants_rerank
+from structured_log import get_logger
+from title_index import TitleIndex
+import time
 import warnings
 warnings.filterwarnings('ignore')
 
+logger = get_logger(__name__)
+
 class IndianLanguagesRecommender:
     """
     Content-based music recommendation system for Indian Languages Dataset
     Optimized for Spotify Indian Languages Dataset from Kaggle
     """
     
-    def __init__(self, df):
+    TITLE_COLUMN = 'song_name'
+    ARTIST_COLUMN = 'singer'
+    
+    # Audio features blended into the hybrid similarity score
+    AUDIO_FEATURES = ['danceability', 'energy', 'acousticness', 'Valence',
+                      'tempo', 'loudness', 'speechiness', 'liveness']
+    
+    # TF-IDF settings for each text field ('audio_tags' is derived from the audio features)
+    TEXT_FIELDS = {
+        'language': {},
+        'singer': {'ngram_range': (1, 2), 'max_features': 5000},
+        'song_name': {'ngram_range': (1, 2), 'stop_words': 'english', 'max_features': 5000, 'max_df': 0.8},
+        'audio_tags': {'token_pattern': r'\S+'}
+    }
+    
+    # Relative weight of each text field (singer and language weighted up)
+    FIELD_WEIGHTS = {'language': 2.0, 'singer': 3.0, 'song_name': 1.0, 'audio_tags': 1.0}
+    
+    def __init__(self, df, latent_dims=None, text_weight=0.7, audio_weight=0.3,
+                 field_weights=None, near_duplicate_threshold=NEAR_DUPLICATE_THRESHOLD):
         """
         Initialize the recommender with Indian Languages dataset
         
@@ -19,180 +54,397 @@ class IndianLanguagesRecommender:
             df: Pandas DataFrame with columns:
                 'song_name', 'singer', 'language', 'danceability', 'energy', 
                 'acousticness', 'valence', 'tempo', 'popularity', etc.
+            latent_dims: If set (64-256), score with dense LSA embeddings
+                instead of the sparse TF-IDF rows
+            text_weight: Weight of the text (TF-IDF) similarity
+            audio_weight: Weight of the audio-feature similarity
+            field_weights: Override FIELD_WEIGHTS for some text fields
+            near_duplicate_threshold: Collapse songs of the same singer whose
+                titles are at least this similar (None to keep them)
         """
         self.df = df.copy()
+        self.latent_dims = latent_dims
+        self.field_weights = {**self.FIELD_WEIGHTS, **(field_weights or {})}
+        self.text_weight = text_weight
+        self.audio_weight = audio_weight
+        self.near_duplicate_threshold = near_duplicate_threshold
+        self.aliases = None
         self.tfidf_matrix = None
         self.similarity_matrix = None
         self.tfidf_vectorizer = None
+        self.latent_index = None
+        self.audio_matrix = None
+        self.related_table = None
+        self.song_filter = None
+        self.partitions = None
+        self.title_index = None
+        self.title_lookup = None
+        self.singer_index = None
+        self.stats = None
         self._preprocess_data()
         self._build_recommendation_model()
     
     def _preprocess_data(self):
         """Preprocess the Indian Languages music data"""
         # Clean and prepare data
-        self.df['song_name'] = self.df['song_name'].fillna('Unknown')
-        self.df['singer'] = self.df['singer'].fillna('Unknown')
-        self.df['language'] = self.df['language'].fillna('Unknown')
+        fill_text_columns(self.df, {'song_name': 'Unknown', 'singer': 'Unknown', 'language': 'Unknown'})
         
         # Fill numeric features
         numeric_features = ['danceability', 'acousticness', 'energy', 'liveness', 
                           'loudness', 'speechiness', 'tempo', 'Valence', 'popularity']
-        for feature in numeric_features:
-            if feature in self.df.columns:
-                self.df[feature] = self.df[feature].fillna(self.df[feature].median())
-        
-        # Create combined features for text-based recommendation
-        # Language (repeated 2x for weight) + Singer (repeated 3x) + Song name
-        self.df['combined_features'] = (
-            self.df['language'].astype(str) + ' ' +
-            self.df['language'].astype(str) + ' ' +
-            self.df['singer'].astype(str) + ' ' +
-            self.df['singer'].astype(str) + ' ' +
-            self.df['singer'].astype(str) + ' ' +
-            self.df['song_name'].astype(str)
-        )
-        
-        # Add audio features as text for better matching
-        if 'danceability' in self.df.columns and 'energy' in self.df.columns:
-            self.df['combined_features'] += ' ' + self.df.apply(
-                lambda x: self._audio_features_to_text(x), axis=1
-            )
-        
-        # Clean up the text
-        self.df['combined_features'] = self.df['combined_features'].str.lower()
+        fill_numeric_median(self.df, numeric_features)
         
         # Remove duplicates
         self.df = self.df.drop_duplicates(subset=['song_name', 'singer'], keep='first')
-        self.df = self.df.reset_index(drop=True)
-        
-        print(f"✓ Preprocessed {len(self.df)} unique songs")
-    
-    def _audio_features_to_text(self, row):
-        """Convert audio features to descriptive text"""
-        desc = []
         
-        # Danceability
-        if row['danceability'] > 0.7:
-            desc.append('high_dance')
-        elif row['danceability'] < 0.3:
-            desc.append('low_dance')
+        # Collapse remasters, live versions and "feat." variants into their
+        # most popular version; their titles stay resolvable as aliases
+        if self.near_duplicate_threshold:
+            start = time.perf_counter()
+            self.df, self.aliases = collapse_near_duplicates(
+                self.df, 'song_name', 'singer', priority_column='popularity',
+                threshold=self.near_duplicate_threshold
+            )
+            print(f"✓ Collapsed {len(self.aliases):,} near-duplicate songs "
+                  f"in {time.perf_counter() - start:.1f}s")
         
-        # Energy
-        if row['energy'] > 0.7:
-            desc.append('high_energy')
-        elif row['energy'] < 0.3:
-            desc.append('low_energy')
+        # Group the catalog by language so every language is one contiguous row range
+        order = partition_order(self.df['language'])
+        self.df = self.df.iloc[order].reset_index(drop=True)
+        if self.aliases is not None:
+            new_ids = np.empty(len(order), dtype=np.int64)
+            new_ids[order] = np.arange(len(order))
+            self.aliases['song_id'] = new_ids[self.aliases['song_id'].to_numpy()]
         
-        # Acousticness
-        if row['acousticness'] > 0.5:
-            desc.append('acoustic')
+        print(f"✓ Preprocessed {len(self.df)} unique songs")
+    
+    def _build_audio_matrix(self):
+        """Standardize the audio features into a unit-length float32 matrix"""
+        features = [f for f in self.AUDIO_FEATURES if f in self.df.columns]
+        if not features:
+            return None
         
-        # Valence (mood)
-        if row['Valence'] > 0.7:
-            desc.append('happy')
-        elif row['Valence'] < 0.3:
-            desc.append('sad')
+        values = self.df[features].to_numpy(dtype=np.float32)
+        std = values.std(axis=0)
+        std[std == 0] = 1.0
+        values = (values - values.mean(axis=0)) / std
         
-        return ' '.join(desc)
+        # Unit rows turn the audio cosine similarity into a dot product
+        norms = np.linalg.norm(values, axis=1, keepdims=True)
+        norms[norms == 0] = 1.0
+        return np.ascontiguousarray(values / norms, dtype=np.float32)
     
     def _build_recommendation_model(self):
         """Build TF-IDF model for content-based recommendations"""
         print("🔄 Building TF-IDF matrix for {} songs...".format(len(self.df)))
         
-        # Create TF-IDF matrix with optimized parameters
-        self.tfidf_vectorizer = TfidfVectorizer(
-            max_features=5000,
-            ngram_range=(1, 2),
-            stop_words='english',
-            min_df=1,
-            max_df=0.8
-        )
+        # Text fields: language, singer, song name and audio tags for better matching
+        fields = {field: self.df[field].astype(str)
+                  for field in ['language', 'singer', 'song_name']}
+        if has_audio_tag_columns(self.df):
+            fields['audio_tags'] = audio_feature_tags(self.df)
         
-        self.tfidf_matrix = self.tfidf_vectorizer.fit_transform(
-            self.df['combined_features']
-        )
+        # One TF-IDF vectorizer per field, weighted on stacking
+        text_fields = {field: self.TEXT_FIELDS[field] for field in fields}
+        self.tfidf_vectorizer = FieldWeightedVectorizer(text_fields, {
+            field: weight for field, weight in self.field_weights.items()
+            if field in text_fields
+        })
+        self.tfidf_matrix = self.tfidf_vectorizer.fit_transform(fields)
+        
+        if self.latent_dims:
+            print(f"🔄 Fitting {self.latent_dims}-dim latent embeddings...")
+            self.latent_index = LatentIndex(self.latent_dims).fit(self.tfidf_matrix)
+        
+        self.audio_matrix = self._build_audio_matrix()
+        self.song_filter = SongFilter(self.df, language_column='language', artist_column='singer',
+                                      popularity_column='popularity')
+        self._build_partitions()
+        self.stats = CatalogStats(self.df, count_columns=['language', 'singer'],
+                                  feature_columns=self.AUDIO_FEATURES,
+                                  popularity_column='popularity')
         
         print(f"✓ Recommendation model built successfully!")
         print(f"  - Dataset size: {len(self.df)} songs")
         print(f"  - Feature matrix shape: {self.tfidf_matrix.shape}")
-        print(f"  - Languages: {self.df['language'].nunique()}")
-        print(f"  - Unique singers: {self.df['singer'].nunique()}")
-        print(f"  - Using on-demand similarity computation for efficiency")
+        print(f"  - Languages: {len(self.stats.counts['language'])}")
+        print(f"  - Unique singers: {len(self.stats.counts['singer'])}")
+        if self.latent_index is not None:
+            print(f"  - Using {self.latent_index.dims}-dim latent embeddings for scoring")
+        else:
+            print(f"  - Using on-demand similarity computation for efficiency")
+        if self.audio_matrix is not None:
+            print(f"  - Hybrid scoring: text {self.text_weight}, audio {self.audio_weight}")
     
-    def get_recommendations(self, song_name, n_recommendations=10):
+    def _build_partitions(self):
+        """Per-language row ranges, title lookup and lowercased title/singer indexes"""
+        self.partitions = CatalogPartitions(self.df['language'])
+        self.title_lookup = TitleIndex(self.df[self.TITLE_COLUMN], self._title_aliases())
+        self.title_index = self.df['song_name'].str.lower()
+        self.singer_index = self.df['singer'].str.lower()
+    
+    def _title_aliases(self):
+        """Titles of the collapsed near-duplicates, indexed by canonical song id"""
+        if self.aliases is None:
+            return None
+        return self.aliases.set_index('song_id')[self.TITLE_COLUMN]
+    
+    def set_field_weights(self, **weights):
+        """
+        Re-weight the text fields without re-tokenizing the catalog
+        
+        Args:
+            **weights: New relative weight per field
+                ('language', 'singer', 'song_name', 'audio_tags')
+        """
+        self.tfidf_matrix = self.tfidf_vectorizer.set_weights(**weights)
+        self.field_weights.update(self.tfidf_vectorizer.weights)
+        
+        # The latent projection depends on the weighted matrix
+        if self.latent_index is not None:
+            self.latent_index = LatentIndex(self.latent_dims).fit(self.tfidf_matrix)
+        
+        # Precomputed neighbours were scored with the old weights
+        self.related_table = None
+    
+    def _text_similarity(self, song_idx, rows=None):
+        """Text (TF-IDF or latent) similarity of one song against the catalog (or some rows)"""
+        if self.latent_index is not None:
+            return self.latent_index.similarity_scores(song_idx, rows)
+        
+        song_vector = self.tfidf_matrix[song_idx]
+        if rows is None:
+            candidates = self.tfidf_matrix
+        elif isinstance(rows, slice):
+            # A language partition: its rows share the catalog's buffers
+            candidates = csr_rows(self.tfidf_matrix, rows)
+        else:
+            candidates = self.tfidf_matrix[rows]
+        return cosine_similarity(song_vector, candidates).flatten()
+    
+    def _similarity_scores(self, song_idx, text_weight=None, audio_weight=None, rows=None):
+        """
+        Hybrid similarity of one song against the whole catalog (or only some rows)
+        
+        Blends the text cosine similarity with the cosine similarity of the
+        standardized audio features, each weighted and normalized to [0, 1].
+        """
+        text_weight = self.text_weight if text_weight is None else text_weight
+        audio_weight = self.audio_weight if audio_weight is None else audio_weight
+        
+        scores = self._text_similarity(song_idx, rows)
+        if self.audio_matrix is None or audio_weight <= 0:
+            return scores
+        
+        total = text_weight + audio_weight
+        audio_vectors = self.audio_matrix if rows is None else self.audio_matrix[rows]
+        audio_scores = audio_vectors @ self.audio_matrix[song_idx]
+        
+        # Audio cosine lies in [-1, 1]; shift it onto the [0, 1] text range
+        scores = scores * (text_weight / total)
+        scores += (audio_scores + 1.0) * (0.5 * audio_weight / total)
+        return scores
+    
+    def _batch_similarity_scores(self, song_ids):
+        """
+        Hybrid similarity (default weights) of several songs against the
+        whole catalog (len(song_ids) x n_songs)
+        """
+        if self.latent_index is not None:
+            embeddings = self.latent_index.embeddings
+            scores = embeddings[song_ids] @ embeddings.T
+        else:
+            scores = cosine_similarity(self.tfidf_matrix[song_ids], self.tfidf_matrix)
+        if self.audio_matrix is None or self.audio_weight <= 0:
+            return scores
+        
+        total = self.text_weight + self.audio_weight
+        scores = scores * (self.text_weight / total)
+        scores += (self.audio_matrix[song_ids] @ self.audio_matrix.T + 1.0) * (0.5 * self.audio_weight / total)
+        return scores
+    
+    def _pairwise_similarity(self, rows, text_weight=None, audio_weight=None):
+        """Hybrid similarity between a few songs (len(rows) x len(rows))"""
+        text_weight = self.text_weight if text_weight is None else text_weight
+        audio_weight = self.audio_weight if audio_weight is None else audio_weight
+        
+        if self.latent_index is not None:
+            vectors = self.latent_index.embeddings[rows]
+            scores = vectors @ vectors.T
+        else:
+            scores = cosine_similarity(self.tfidf_matrix[rows])
+        if self.audio_matrix is None or audio_weight <= 0:
+            return scores
+        
+        total = text_weight + audio_weight
+        audio = self.audio_matrix[rows]
+        return (scores * (text_weight / total)
+                + (audio @ audio.T + 1.0) * (0.5 * audio_weight / total))
+    
+    def _top_similar(self, song_idx, n, text_weight=None, audio_weight=None, rows=None):
+        """
+        Row ids and scores of the n songs most similar to a song
+        
+        Popular seeds are served from the precomputed related songs table
+        (built with the default weights); every other request is scored live.
+        When rows is given, only those rows are candidates: a language
+        partition (slice) or a selective filter is scored on its own rows, a
+        broad filter masks the full scores.
+        """
+        default_weights = text_weight is None and audio_weight is None
+        if self.related_table is not None and default_weights and rows is None:
+            related = self.related_table.lookup(song_idx, n)
+            if related is not None:
+                return related
+        
+        if isinstance(rows, slice):
+            with metrics.stage('scoring'):
+                similarity_scores = self._similarity_scores(song_idx, text_weight, audio_weight, rows)
+            in_partition = rows.start <= song_idx < rows.stop
+            top_positions = top_k(similarity_scores, n,
+                                  exclude=song_idx - rows.start if in_partition else None)
+            return top_positions + rows.start, similarity_scores[top_positions]
+        
+        if rows is not None and len(rows) == 0:
+            return rows, np.empty(0, dtype=np.float32)
+        
+        if rows is not None and len(rows) <= SUBSET_SCORING_FRACTION * len(self.df):
+            with metrics.stage('scoring'):
+                similarity_scores = self._similarity_scores(song_idx, text_weight, audio_weight, rows)
+            top_positions = top_k(similarity_scores, n, exclude=row_position(rows, song_idx))
+            return rows[top_positions], similarity_scores[top_positions]
+        
+        with metrics.stage('scoring'):
+            similarity_scores = self._similarity_scores(song_idx, text_weight, audio_weight)
+        if rows is not None:
+            # Rows outside the filter can never be selected
+            masked_scores = np.full(len(similarity_scores), -np.inf)
+            masked_scores[rows] = similarity_scores[rows]
+            top_indices = top_k(masked_scores, n, exclude=song_idx)
+            top_indices = top_indices[np.isfinite(masked_scores[top_indices])]
+        else:
+            top_indices = top_k(similarity_scores, n, exclude=song_idx)
+        return top_indices, similarity_scores[top_indices]
+    
+    def _allowed_rows(self, languages=None, min_popularity=None, exclude_artists=None):
+        """
+        Candidate rows for a set of filters
+        
+        Returns:
+            The language's partition slice for a single-language filter,
+            otherwise sorted row ids (None when no filter is set)
+        """
+        if languages and len(languages) == 1 and min_popularity is None and not exclude_artists:
+            partition = self.partitions.slice(languages[0])
+            if partition is not None:
+                return partition
+        return self.song_filter.rows(languages, min_popularity, exclude_artists)
+    
+    def get_recommendations(self, song_name, n_recommendations=10,
+                            text_weight=None, audio_weight=None,
+                            diversity=0.0, max_per_artist=None,
+                            languages=None, min_popularity=None, exclude_artists=None,
+                            song_id=None):
         """
         Get song recommendations based on a given song
         
         Args:
             song_name: Name of the song to base recommendations on
             n_recommendations: Number of recommendations to return
+            text_weight: Override the text similarity weight
+            audio_weight: Override the audio similarity weight
+            diversity: MMR trade-off between relevance and variety (0 to 1)
+            max_per_artist: Maximum recommendations per singer (None for no cap)
+            languages: Only recommend songs in these languages
+            min_popularity: Only recommend songs at least this popular
+            exclude_artists: Never recommend songs by these singers
+            song_id: Row id of the song, to pick one of several matching titles
             
         Returns:
             DataFrame with recommended songs
         """
         try:
-            # Find the song in the dataset (case-insensitive partial match)
-            song_matches = self.df[
-                self.df['song_name'].str.lower().str.contains(song_name.lower(), na=False)
-            ]
+            # Find the song: exact title first, then the closest partial or misspelled one
+            song_idx = self.title_lookup.resolve(song_name, song_id)
             
-            if len(song_matches) == 0:
-                print(f"Song '{song_name}' not found in database")
+            if song_idx is None:
+                logger.debug("Song not found", extra={'query': song_name})
                 return None
             
-            # Use the first match
-            song_idx = song_matches.index[0]
-            song_row = self.df.loc[song_idx]
+            song_row = self.df.iloc[song_idx]
             
-            print(f"\n🎵 Base Song: {song_row['song_name']} by {song_row['singer']}")
-            print(f"   Language: {song_row['language']}")
+            logger.debug("Base song", extra={
+                'song': song_row['song_name'],
+                'singer': song_row['singer'],
+                'language': song_row['language']
+            })
             
-            # Compute similarity only for this song (memory efficient)
-            song_vector = self.tfidf_matrix[song_idx]
-            similarity_scores = cosine_similarity(song_vector, self.tfidf_matrix).flatten()
+            # Rows allowed by the filters (None when no filter is set)
+            allowed_rows = self._allowed_rows(languages, min_popularity, exclude_artists)
             
             # Get top N similar songs (excluding the input song itself)
-            similar_indices = similarity_scores.argsort()[::-1][1:n_recommendations+1]
+            if wants_rerank(diversity, max_per_artist):
+                # Over-fetch candidates and re-rank them for variety
+                similar_indices, similar_scores = self._top_similar(
+                    song_idx, max(RERANK_POOL, n_recommendations), text_weight, audio_weight,
+                    allowed_rows
+                )
+                similar_indices, similar_scores = rerank_rows(
+                    self, similar_indices, similar_scores, n_recommendations,
+                    diversity, max_per_artist,
+                    text_weight=text_weight, audio_weight=audio_weight
+                )
+            else:
+                similar_indices, similar_scores = self._top_similar(
+                    song_idx, n_recommendations, text_weight, audio_weight, allowed_rows
+                )
             
             # Return recommended songs with similarity scores
-            recommendations = self.df.iloc[similar_indices].copy()
-            recommendations['similarity_score'] = similarity_scores[similar_indices]
-            recommendations['similarity_percentage'] = (
-                recommendations['similarity_score'] * 100
-            ).round(1)
-            
-            return recommendations[[
-                'song_name', 'singer', 'language', 'popularity', 
-                'danceability', 'energy', 'Valence', 
-                'similarity_score', 'similarity_percentage'
-            ]]
+            with metrics.stage('slicing'):
+                recommendations = self.df.iloc[similar_indices].copy()
+                recommendations['similarity_score'] = similar_scores
+                recommendations['similarity_percentage'] = (
+                    recommendations['similarity_score'] * 100
+                ).round(1)
+                
+                return recommendations[[
+                    'song_name', 'singer', 'language', 'popularity', 
+                    'danceability', 'energy', 'Valence', 
+                    'similarity_score', 'similarity_percentage'
+                ]]
             
-        except Exception as e:
-            print(f"Error in recommendation: {e}")
-            import traceback
-            traceback.print_exc()
+        except Exception:
+            logger.exception("Error in recommendation")
             return None
     
-    def search_songs(self, query, limit=20):
+    def search_songs(self, query, limit=20, language=None):
         """
         Search for songs by name or singer
         
         Args:
             query: Search query string
             limit: Maximum number of results
+            language: Only search this language's partition (optional)
             
         Returns:
             DataFrame with matching songs
         """
         query_lower = query.lower()
+        titles, singers = self.title_index, self.singer_index
+        
+        if language:
+            partition = self.partitions.slice(language)
+            if partition is None:
+                partition = slice(0, 0)
+            titles, singers = titles.iloc[partition], singers.iloc[partition]
         
-        # Search in song name and singer
+        # Search in song name and singer (plain substring, not a regex)
         mask = (
-            self.df['song_name'].str.lower().str.contains(query_lower, na=False) |
-            self.df['singer'].str.lower().str.contains(query_lower, na=False)
+            titles.str.contains(query_lower, regex=False, na=False) |
+            singers.str.contains(query_lower, regex=False, na=False)
         )
         
-        results = self.df[mask].head(limit)
+        results = self.df.loc[mask.index[mask.to_numpy()][:limit]]
         
         return results[[
             'song_name', 'singer', 'language', 'popularity', 
@@ -201,9 +453,10 @@ class IndianLanguagesRecommender:
     
     def get_songs_by_language(self, language, limit=50):
         """Get songs in a specific language"""
-        language_songs = self.df[
-            self.df['language'].str.lower() == language.lower()
-        ].head(limit)
+        partition = self.partitions.slice(language)
+        if partition is None:
+            partition = slice(0, 0)
+        language_songs = self.df.iloc[partition].head(limit)
         
         return language_songs[[
             'song_name', 'singer', 'language', 'popularity',
@@ -211,12 +464,13 @@ class IndianLanguagesRecommender:
         ]]
     
     def get_dataset_info(self):
-        """Get information about the dataset"""
+        """Get information about the dataset (from the precomputed stats)"""
+        language_counts = self.stats.counts['language']
         info = {
-            'total_songs': len(self.df),
-            'languages': sorted(self.df['language'].unique().tolist()),
-            'language_counts': self.df['language'].value_counts().to_dict(),
-            'total_singers': self.df['singer'].nunique(),
-            'avg_popularity': self.df['popularity'].mean() if 'popularity' in self.df.columns else None
+            'total_songs': self.stats.total,
+            'languages': sorted(language_counts),
+            'language_counts': dict(language_counts.most_common()),
+            'total_singers': len(self.stats.counts['singer']),
+            'avg_popularity': self.stats.mean('popularity')
         }
         return info
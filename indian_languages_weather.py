@@ -1,7 +1,12 @@
-import requests
 import pandas as pd
 from datetime import datetime
 import numpy as np
+from filters import SongFilter
+from sampling import AliasTable, request_rng, sample_rows
+from structured_log import get_logger
+from weather_client import demo_weather, fetch_weather
+
+logger = get_logger(__name__)
 
 class IndianLanguagesWeatherRecommender:
     """
@@ -9,6 +14,13 @@ class IndianLanguagesWeatherRecommender:
     Suggests Indian language songs based on current weather conditions
     """
     
+    # Best-ranked songs kept for every (condition, temperature, language) cell
+    POOL_SIZE = 200
+    
+    # A request samples from the best n * POOL_SAMPLE_FACTOR songs of its
+    # cell, weighted by popularity
+    POOL_SAMPLE_FACTOR = 3
+    
     def __init__(self, df, api_key=None):
         """
         Initialize weather-based recommender for Indian Languages
@@ -86,6 +98,8 @@ class IndianLanguagesWeatherRecommender:
             'warm': {'energy': 0.1, 'valence': 0.2},         # 25-35°C
             'hot': {'energy': 0.2, 'valence': 0.1}           # > 35°C
         }
+        
+        self.build_weather_pools()
     
     def get_weather_data(self, latitude, longitude):
         """
@@ -98,60 +112,11 @@ class IndianLanguagesWeatherRecommender:
         Returns:
             Dictionary with weather information
         """
-        try:
-            url = f"https://api.openweathermap.org/data/2.5/weather"
-            params = {
-                'lat': latitude,
-                'lon': longitude,
-                'appid': self.api_key,
-                'units': 'metric'
-            }
-            
-            response = requests.get(url, params=params, timeout=10)
-            
-            if response.status_code == 200:
-                data = response.json()
-                
-                # Get city and country information
-                city_name = data.get('name', 'Unknown Location')
-                country_code = data.get('sys', {}).get('country', '')
-                
-                # Create full location name
-                if country_code:
-                    full_location = f"{city_name}, {country_code}"
-                else:
-                    full_location = city_name
-                
-                weather_info = {
-                    'condition': data['weather'][0]['main'],
-                    'description': data['weather'][0]['description'],
-                    'temperature': data['main']['temp'],
-                    'feels_like': data['main']['feels_like'],
-                    'humidity': data['main']['humidity'],
-                    'city': full_location,
-                    'icon': data['weather'][0]['icon']
-                }
-                
-                return weather_info
-            else:
-                print(f"Weather API Error: {response.status_code}")
-                return self._get_demo_weather()
-                
-        except Exception as e:
-            print(f"Error fetching weather: {e}")
-            return self._get_demo_weather()
+        return fetch_weather(latitude, longitude, self.api_key)
     
     def _get_demo_weather(self):
         """Return demo weather data for testing"""
-        return {
-            'condition': 'Clear',
-            'description': 'clear sky',
-            'temperature': 25,
-            'feels_like': 24,
-            'humidity': 60,
-            'city': 'Demo City (API Key Required)',
-            'icon': '01d'
-        }
+        return demo_weather()
     
     def _get_temp_category(self, temperature):
         """Categorize temperature"""
@@ -166,6 +131,119 @@ class IndianLanguagesWeatherRecommender:
         else:
             return 'hot'
     
+    def _weather_ranges(self, condition, temp_category):
+        """
+        Audio feature ranges for a weather condition and temperature category
+        
+        Returns:
+            Tuple of (energy_min, energy_max, valence_min, valence_max, dance_min, dance_max)
+        """
+        audio_ranges = self.weather_audio_map[condition]
+        temp_adj = self.temp_adjustments[temp_category]
+        
+        # Adjust ranges based on temperature
+        energy_min = max(0, audio_ranges['energy_range'][0] + temp_adj['energy'])
+        energy_max = min(1, audio_ranges['energy_range'][1] + temp_adj['energy'])
+        valence_min = max(0, audio_ranges['valence_range'][0] + temp_adj['valence'])
+        valence_max = min(1, audio_ranges['valence_range'][1] + temp_adj['valence'])
+        dance_min = audio_ranges['danceability_range'][0]
+        dance_max = audio_ranges['danceability_range'][1]
+        
+        return energy_min, energy_max, valence_min, valence_max, dance_min, dance_max
+    
+    def build_weather_pools(self):
+        """
+        Precompute a ranked candidate pool for every weather cell
+        
+        A cell is a (condition, temperature category) pair; each cell holds an
+        all-language pool (key None) plus one pool per language. A language
+        pool ranks the language's exact matches first, followed by its other
+        songs, so a language preference can always be honoured. Called on
+        construction, so the pools are rebuilt whenever the app reloads the
+        dataset. Call it again after replacing self.df.
+        """
+        energy = self.df['energy'].to_numpy(dtype=float)
+        valence = self.df['Valence'].to_numpy(dtype=float)
+        danceability = self.df['danceability'].to_numpy(dtype=float)
+        popularity = self.df['popularity'].to_numpy(dtype=float)
+        self.song_filter = SongFilter(self.df, language_column='language')
+        
+        self.weather_pools = {}
+        for condition in self.weather_audio_map:
+            for temp_category in self.temp_adjustments:
+                (energy_min, energy_max, valence_min, valence_max,
+                 dance_min, dance_max) = self._weather_ranges(condition, temp_category)
+                
+                exact = (
+                    (energy >= energy_min) & (energy <= energy_max) &
+                    (valence >= valence_min) & (valence <= valence_max) &
+                    (danceability >= dance_min) & (danceability <= dance_max)
+                )
+                
+                # Calculate matching score
+                weather_match_score = (
+                    (1 - np.abs(energy - (energy_min + energy_max) / 2)) * 0.4 +
+                    (1 - np.abs(valence - (valence_min + valence_max) / 2)) * 0.4 +
+                    (1 - np.abs(danceability - (dance_min + dance_max) / 2)) * 0.2
+                )
+                combined_score = weather_match_score * 0.7 + (popularity / 100) * 0.3
+                scores = (weather_match_score, combined_score)
+                
+                rows = np.flatnonzero(exact)
+                relaxed = len(rows) == 0
+                if relaxed:
+                    rows = np.flatnonzero(
+                        (energy >= energy_min - 0.2) & (energy <= energy_max + 0.2)
+                    )
+                cell = {None: self._make_pool(rows, np.ones(len(rows), dtype=bool),
+                                              scores, popularity, relaxed)}
+                
+                for language, language_rows in self.song_filter.language_rows.items():
+                    cell[language] = self._make_pool(language_rows, exact[language_rows],
+                                                     scores, popularity, relaxed=False)
+                
+                self.weather_pools[(condition, temp_category)] = cell
+    
+    def _make_pool(self, rows, exact, scores, popularity, relaxed):
+        """
+        Rank candidate rows (exact matches first, then by combined score)
+        and keep the best POOL_SIZE
+        """
+        weather_match_score, combined_score = scores
+        order = np.lexsort((-combined_score[rows], ~exact))
+        
+        # Drop songs without a score
+        order = order[~np.isnan(combined_score[rows][order])][:self.POOL_SIZE]
+        rows = rows[order]
+        return {
+            'rows': rows,
+            'alias': AliasTable(popularity[rows]),
+            'weather_match_score': weather_match_score[rows],
+            'combined_score': combined_score[rows],
+            'matches': int(np.count_nonzero(exact)),
+            'relaxed': relaxed
+        }
+    
+    def _sample_pool(self, pool, n_recommendations, rng):
+        """
+        Pick n songs from the best of a pool, returned in rank order
+        
+        Returns:
+            DataFrame with the recommended songs and their scores
+        """
+        # Stay within the exact matches when there are enough of them
+        window = min(len(pool['rows']), n_recommendations * self.POOL_SAMPLE_FACTOR,
+                     max(pool['matches'], n_recommendations))
+        picks = np.sort(sample_rows(window, n_recommendations, rng, alias=pool['alias']))
+        
+        recommendations = self.df.iloc[pool['rows'][picks]][[
+            'song_name', 'singer', 'language', 'popularity',
+            'energy', 'danceability', 'Valence'
+        ]].copy()
+        recommendations['weather_match_score'] = pool['weather_match_score'][picks]
+        recommendations['combined_score'] = pool['combined_score'][picks]
+        return recommendations
+    
     def get_weather_based_recommendations(self, latitude, longitude, n_recommendations=15, language_preference=None):
         """
         Get Indian language song recommendations based on weather
@@ -176,102 +254,87 @@ class IndianLanguagesWeatherRecommender:
             n_recommendations: Number of songs to recommend
             language_preference: Preferred language (optional)
             
+        Returns:
+            Dictionary with weather info, mood, and recommendations
+        """
+        # Get current weather
+        weather_info = self.get_weather_data(latitude, longitude)
+        return self.recommend_for_weather(
+            weather_info, n_recommendations, language_preference
+        )
+    
+    def recommend_for_weather(self, weather_info, n_recommendations=15, language_preference=None,
+                              seed=None):
+        """
+        Get Indian language song recommendations for already fetched weather data
+        
+        Args:
+            weather_info: Dictionary with weather information
+            n_recommendations: Number of songs to recommend
+            language_preference: Preferred language (optional)
+            seed: Optional random seed for a reproducible pick
+            
         Returns:
             Dictionary with weather info, mood, and recommendations
         """
         try:
-            # Get current weather
-            weather_info = self.get_weather_data(latitude, longitude)
             condition = weather_info['condition']
             temperature = weather_info['temperature']
             
-            print(f"\n🌤️  Weather: {condition} - {weather_info['description']}")
-            print(f"🌡️  Temperature: {temperature}°C")
-            print(f"📍 Location: {weather_info['city']}")
-            
             # Get audio feature ranges for this weather
             if condition not in self.weather_audio_map:
                 condition = 'Clear'  # Default
             
-            audio_ranges = self.weather_audio_map[condition]
-            mood = audio_ranges['mood']
-            
-            # Get temperature adjustments
+            mood = self.weather_audio_map[condition]['mood']
             temp_category = self._get_temp_category(temperature)
-            temp_adj = self.temp_adjustments[temp_category]
+            (energy_min, energy_max, valence_min, valence_max,
+             dance_min, dance_max) = self._weather_ranges(condition, temp_category)
             
-            # Adjust ranges based on temperature
-            energy_min = max(0, audio_ranges['energy_range'][0] + temp_adj['energy'])
-            energy_max = min(1, audio_ranges['energy_range'][1] + temp_adj['energy'])
-            valence_min = max(0, audio_ranges['valence_range'][0] + temp_adj['valence'])
-            valence_max = min(1, audio_ranges['valence_range'][1] + temp_adj['valence'])
-            dance_min = audio_ranges['danceability_range'][0]
-            dance_max = audio_ranges['danceability_range'][1]
-            
-            print(f"🎭 Mood: {mood}")
-            print(f"🎵 Looking for songs with:")
-            print(f"   Energy: {energy_min:.1f} - {energy_max:.1f}")
-            print(f"   Valence: {valence_min:.1f} - {valence_max:.1f}")
-            print(f"   Danceability: {dance_min:.1f} - {dance_max:.1f}")
+            logger.debug("Weather recommendation request", extra={
+                'condition': condition,
+                'description': weather_info['description'],
+                'temperature': temperature,
+                'city': weather_info['city'],
+                'mood': mood,
+                'energy_range': [energy_min, energy_max],
+                'valence_range': [valence_min, valence_max],
+                'danceability_range': [dance_min, dance_max],
+                'language': language_preference
+            })
             
-            # Filter songs based on audio features
-            filtered_df = self.df[
-                (self.df['energy'] >= energy_min) & (self.df['energy'] <= energy_max) &
-                (self.df['Valence'] >= valence_min) & (self.df['Valence'] <= valence_max) &
-                (self.df['danceability'] >= dance_min) & (self.df['danceability'] <= dance_max)
-            ].copy()
+            # Candidates were filtered and ranked by build_weather_pools
+            cell = self.weather_pools[(condition, temp_category)]
+            pool = cell[None]
             
-            # If language preference is specified, filter by language
+            # If language preference is specified, use that language's pool
             if language_preference:
-                lang_filtered = filtered_df[
-                    filtered_df['language'].str.lower() == language_preference.lower()
-                ]
-                if len(lang_filtered) >= n_recommendations:
-                    filtered_df = lang_filtered
-                    print(f"   Language: {language_preference}")
-            
-            if len(filtered_df) == 0:
-                print("⚠️  No exact matches found, relaxing criteria...")
-                # Relax the criteria
-                filtered_df = self.df[
-                    (self.df['energy'] >= energy_min - 0.2) & (self.df['energy'] <= energy_max + 0.2)
-                ].copy()
-            
-            # Calculate matching score
-            filtered_df['weather_match_score'] = (
-                (1 - abs(filtered_df['energy'] - (energy_min + energy_max) / 2)) * 0.4 +
-                (1 - abs(filtered_df['Valence'] - (valence_min + valence_max) / 2)) * 0.4 +
-                (1 - abs(filtered_df['danceability'] - (dance_min + dance_max) / 2)) * 0.2
-            )
+                lang_pool = cell.get(language_preference.strip().lower())
+                if lang_pool is not None:
+                    pool = lang_pool
+                else:
+                    logger.debug("No songs in the preferred language, using all languages",
+                                 extra={'language': language_preference})
             
-            # Sort by match score and popularity
-            filtered_df['combined_score'] = (
-                filtered_df['weather_match_score'] * 0.7 +
-                (filtered_df['popularity'] / 100) * 0.3
-            )
+            if pool['relaxed'] or pool['matches'] < n_recommendations:
+                logger.debug("Not enough exact matches found, relaxing criteria",
+                             extra={'matches': pool['matches']})
             
             # Get top recommendations
-            recommendations = filtered_df.nlargest(n_recommendations, 'combined_score')
+            recommendations = self._sample_pool(pool, n_recommendations, request_rng(seed))
             
-            print(f"✓ Found {len(recommendations)} matching songs")
+            logger.debug("Weather recommendations ready", extra={'count': len(recommendations)})
             
             # Prepare result
             result = {
                 'weather': weather_info,
                 'mood': mood,
-                'recommendations': recommendations[[
-                    'song_name', 'singer', 'language', 'popularity',
-                    'energy', 'danceability', 'Valence', 
-                    'weather_match_score', 'combined_score'
-                ]]
+                'recommendations': recommendations
             }
             
             return result
             
-        except Exception as e:
-            print(f"Error in weather-based recommendations: {e}")
-            import traceback
-            traceback.print_exc()
+        except Exception:
+            logger.exception("Error in weather-based recommendations")
             return None
     
     def get_recommendations_by_mood(self, mood, n_recommendations=15, language_preference=None):
@@ -302,25 +365,28 @@ class IndianLanguagesWeatherRecommender:
         ranges = mood_map[mood.lower()]
         
         # Filter songs
-        filtered_df = self.df[
+        in_range = (
             (self.df['energy'] >= ranges['energy'][0]) & 
             (self.df['energy'] <= ranges['energy'][1]) &
             (self.df['Valence'] >= ranges['valence'][0]) & 
             (self.df['Valence'] <= ranges['valence'][1]) &
             (self.df['danceability'] >= ranges['dance'][0]) & 
             (self.df['danceability'] <= ranges['dance'][1])
-        ].copy()
+        ).to_numpy()
         
-        # Language preference
+        # Language preference: the language's songs in range come first, then
+        # its other songs, so the language is kept whenever it has enough songs
+        language_rows = None
         if language_preference:
-            lang_filtered = filtered_df[
-                filtered_df['language'].str.lower() == language_preference.lower()
-            ]
-            if len(lang_filtered) >= n_recommendations:
-                filtered_df = lang_filtered
+            language_rows = self.song_filter.rows(languages=[language_preference])
         
-        # Sort by popularity
-        recommendations = filtered_df.nlargest(n_recommendations, 'popularity')
+        if language_rows is not None and len(language_rows) > 0:
+            popularity = self.df['popularity'].to_numpy(dtype=float)[language_rows]
+            order = np.lexsort((-popularity, ~in_range[language_rows]))[:n_recommendations]
+            recommendations = self.df.iloc[language_rows[order]]
+        else:
+            # Sort by popularity
+            recommendations = self.df[in_range].nlargest(n_recommendations, 'popularity')
         
         return recommendations[[
             'song_name', 'singer', 'language', 'popularity',
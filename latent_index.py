@@ -0,0 +1,91 @@
+import numpy as np
+from sklearn.decomposition import TruncatedSVD
+
+
+class LatentIndex:
+    """
+    Dense latent embeddings (LSA) for fast similarity scoring
+
+    Fits a TruncatedSVD on a TF-IDF matrix and keeps the projected rows as a
+    contiguous, L2-normalised float32 array, so the cosine similarity of one
+    song against the whole catalog is a single BLAS matrix-vector product.
+    The projection also groups co-occurring terms, which lets songs match
+    on related lyrics vocabulary rather than exact tokens only.
+    """
+
+    MIN_COMPONENTS = 64
+    MAX_COMPONENTS = 256
+
+    def __init__(self, n_components=128, random_state=42):
+        """
+        Initialize the latent index
+
+        Args:
+            n_components: Number of latent dimensions (64 to 256)
+            random_state: Seed for the randomized SVD solver
+        """
+        if not self.MIN_COMPONENTS <= n_components <= self.MAX_COMPONENTS:
+            raise ValueError(
+                f"n_components must be between {self.MIN_COMPONENTS} and "
+                f"{self.MAX_COMPONENTS}, got {n_components}"
+            )
+        self.n_components = n_components
+        self.random_state = random_state
+        self.svd = None
+        self.embeddings = None
+
+    def fit(self, tfidf_matrix):
+        """
+        Fit the SVD on a TF-IDF matrix and store its row embeddings
+
+        Args:
+            tfidf_matrix: Sparse (n_songs, n_features) TF-IDF matrix
+
+        Returns:
+            self
+        """
+        # Small catalogs cannot support the requested rank
+        n_components = min(
+            self.n_components,
+            tfidf_matrix.shape[0] - 1,
+            tfidf_matrix.shape[1] - 1
+        )
+        self.svd = TruncatedSVD(
+            n_components=max(n_components, 1),
+            algorithm='randomized',
+            random_state=self.random_state
+        )
+        self.embeddings = self._normalize(self.svd.fit_transform(tfidf_matrix))
+        return self
+
+    def transform(self, tfidf_rows):
+        """Project TF-IDF rows into the latent space"""
+        return self._normalize(self.svd.transform(tfidf_rows))
+
+    def similarity_scores(self, row_idx, rows=None):
+        """
+        Cosine similarity of one catalog row against every row
+
+        Args:
+            row_idx: Row position of the song in the catalog
+            rows: Only score these row positions (default: all rows)
+
+        Returns:
+            1-D float32 array of similarity scores
+        """
+        if rows is not None:
+            return self.embeddings[rows] @ self.embeddings[row_idx]
+        return self.embeddings @ self.embeddings[row_idx]
+
+    @property
+    def dims(self):
+        """Number of latent dimensions actually fitted"""
+        return 0 if self.embeddings is None else self.embeddings.shape[1]
+
+    @staticmethod
+    def _normalize(vectors):
+        vectors = np.ascontiguousarray(vectors, dtype=np.float32)
+        norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+        norms[norms == 0] = 1.0
+        vectors /= norms
+        return vectors
@@ -0,0 +1,354 @@
+"""
+Lyrics templates of the lyrics generator
+
+Every template is rendered once at import with a {theme} placeholder and
+split on it, so generating lyrics is a single join of the pieces with the
+theme instead of formatting the templates of every language per request.
+Rendered lyrics are also kept in a bounded LRU cache, as the same themes
+are requested again and again.
+"""
+from functools import lru_cache
+
+THEME = '{theme}'
+LYRICS_CACHE_SIZE = 4096
+
+# Verses, chorus, bridge and outro of the regional languages
+REGIONAL_TEMPLATES = {
+    'hindi': {
+        'verse': [
+            "दिल में है {theme} की आग",
+            "जो जलती है हर एक राग",
+            "{theme} के साथ है ये सफर",
+            "हर पल में मिले नया असर"
+        ],
+        'chorus': [
+            "ओ {theme}, तू ही है मेरी जान",
+            "तेरे बिना अधूरी ये कहान",
+            "{theme} से है ये प्यार",
+            "दिल की धड़कन, जीवन का आधार"
+        ],
+        'bridge': "जब भी लगे अंधेरा\n{theme} बने सहारा मेरा",
+        'outro': "{theme}... {theme}...\nसदा रहे दिल में बसा"
+    },
+    'kannada': {
+        'verse': [
+            "{theme} ನನ್ನ ಹೃದಯದಲ್ಲಿ",
+            "ಸದಾ ನಿನ್ನ ನೆನಪಿನಲ್ಲಿ",
+            "{theme} ನೀನು ನನ್ನ ಜೀವನ",
+            "ಪ್ರತಿ ಕ್ಷಣ ಹೊಸ ಸಂತೋಷ"
+        ],
+        'chorus': [
+            "ಓ {theme}, ನೀನೇ ನನ್ನ ಪ್ರಾಣ",
+            "ನಿನ್ನ ಬಿಟ್ಟು ಇಲ್ಲ ನನಗೆ ಸ್ಥಾನ",
+            "{theme} ಯೊಂದಿಗೆ ಪ್ರೀತಿ",
+            "ಹೃದಯದ ಗೀತೆ, ಜೀವನದ ರೀತಿ"
+        ],
+        'bridge': "ಕತ್ತಲು ಆವರಿಸಿದಾಗ\n{theme} ನೀನೇ ನನ್ನ ಬೆಳಕು",
+        'outro': "{theme}... {theme}...\nಎಂದೆಂದಿಗೂ ನನ್ನೊಂದಿಗೆ"
+    },
+    'tamil': {
+        'verse': [
+            "{theme} என் மனதில்",
+            "நீ எப்போதும் நினைவில்",
+            "{theme} நீயே என் வாழ்க்கை",
+            "ஒவ்வொரு நொடியும் புதிய மகிழ்ச்சி"
+        ],
+        'chorus': [
+            "ஓ {theme}, நீதான் என் உயிர்",
+            "உன்னை விட்டால் எனக்கு இடமில்லை",
+            "{theme} உடன் காதல்",
+            "இதயத்தின் பாட்டு, வாழ்க்கையின் வழி"
+        ],
+        'bridge': "இருள் சூழும் போது\n{theme} நீயே என் ஒளி",
+        'outro': "{theme}... {theme}...\nஎன்றென்றும் என்னுடன்"
+    },
+    'telugu': {
+        'verse': [
+            "{theme} నా హృదయంలో",
+            "నీవు ఎప్పుడూ జ్ఞాపకంలో",
+            "{theme} నువ్వే నా జీవితం",
+            "ప్రతి క్షణం కొత్త ఆనందం"
+        ],
+        'chorus': [
+            "ఓ {theme}, నువ్వే నా ప్రాణం",
+            "నిన్ను లేకుండా నాకు స్థానం లేదు",
+            "{theme} తో ప్రేమ",
+            "హృదయపు పాట, జీవిత మార్గం"
+        ],
+        'bridge': "చీకటి ఆవరించినప్పుడు\n{theme} నువ్వే నా వెలుగు",
+        'outro': "{theme}... {theme}...\nఎప్పటికీ నాతో"
+    },
+    'malayalam': {
+        'verse': [
+            "{theme} എന്റെ ഹൃദയത്തിൽ",
+            "നീ എപ്പോഴും ഓർമ്മയിൽ",
+            "{theme} നീയാണ് എന്റെ ജീവിതം",
+            "ഓരോ നിമിഷവും പുതിയ സന്തോഷം"
+        ],
+        'chorus': [
+            "ഓ {theme}, നീയാണ് എന്റെ പ്രാണൻ",
+            "നിന്നെ കൂടാതെ എനിക്ക് സ്ഥലമില്ല",
+            "{theme} യോടൊപ്പം സ്നേഹം",
+            "ഹൃദയത്തിന്റെ പാട്ട്, ജീവിതത്തിന്റെ വഴി"
+        ],
+        'bridge': "ഇരുട്ട് വരുമ്പോൾ\n{theme} നീയാണ് എന്റെ വെളിച്ചം",
+        'outro': "{theme}... {theme}...\nഎന്നെന്നേക്കും എന്നോടൊപ്പം"
+    },
+    'marathi': {
+        'verse': [
+            "{theme} माझ्या हृदयात",
+            "तू नेहमी आठवणीत",
+            "{theme} तूच माझे जीवन",
+            "प्रत्येक क्षण नवा आनंद"
+        ],
+        'chorus': [
+            "ओ {theme}, तूच माझा प्राण",
+            "तुझ्याशिवाय मला स्थान नाही",
+            "{theme} सोबत प्रेम",
+            "हृदयाचे गीत, जीवनाचा मार्ग"
+        ],
+        'bridge': "जेव्हा अंधार येतो\n{theme} तूच माझा प्रकाश",
+        'outro': "{theme}... {theme}...\nसदैव माझ्यासोबत"
+    },
+    'bengali': {
+        'verse': [
+            "{theme} আমার হৃদয়ে",
+            "তুমি সর্বদা স্মৃতিতে",
+            "{theme} তুমিই আমার জীবন",
+            "প্রতি মুহূর্তে নতুন আনন্দ"
+        ],
+        'chorus': [
+            "ও {theme}, তুমিই আমার প্রাণ",
+            "তোমাকে ছাড়া আমার কোনো স্থান নেই",
+            "{theme} এর সাথে ভালোবাসা",
+            "হৃদয়ের গান, জীবনের পথ"
+        ],
+        'bridge': "যখন অন্ধকার আসে\n{theme} তুমিই আমার আলো",
+        'outro': "{theme}... {theme}...\nচিরকাল আমার সাথে"
+    },
+    'punjabi': {
+        'verse': [
+            "{theme} ਮੇਰੇ ਦਿਲ ਵਿੱਚ",
+            "ਤੂੰ ਹਮੇਸ਼ਾ ਯਾਦਾਂ ਵਿੱਚ",
+            "{theme} ਤੂੰ ਹੀ ਮੇਰੀ ਜ਼ਿੰਦਗੀ",
+            "ਹਰ ਪਲ ਨਵੀਂ ਖੁਸ਼ੀ"
+        ],
+        'chorus': [
+            "ਓ {theme}, ਤੂੰ ਹੀ ਮੇਰੀ ਜਾਨ",
+            "ਤੇਰੇ ਬਿਨਾ ਨਹੀਂ ਕੋਈ ਥਾਂ",
+            "{theme} ਨਾਲ ਪਿਆਰ",
+            "ਦਿਲ ਦਾ ਗੀਤ, ਜੀਵਨ ਦਾ ਰਾਹ"
+        ],
+        'bridge': "ਜਦੋਂ ਹਨੇਰਾ ਆਵੇ\n{theme} ਤੂੰ ਹੀ ਮੇਰੀ ਰੋਸ਼ਨੀ",
+        'outro': "{theme}... {theme}...\nਹਮੇਸ਼ਾ ਮੇਰੇ ਨਾਲ"
+    },
+    'gujarati': {
+        'verse': [
+            "{theme} મારા હૃદયમાં",
+            "તું હંમેશા યાદમાં",
+            "{theme} તું જ મારું જીવન",
+            "દરેક ક્ષણે નવો આનંદ"
+        ],
+        'chorus': [
+            "ઓ {theme}, તું જ મારો પ્રાણ",
+            "તારા વિના મને સ્થાન નથી",
+            "{theme} સાથે પ્રેમ",
+            "હૃદયનું ગીત, જીવનનો માર્ગ"
+        ],
+        'bridge': "જ્યારે અંધકાર આવે\n{theme} તું જ મારો પ્રકાશ",
+        'outro': "{theme}... {theme}...\nસદા મારી સાથે"
+    }
+}
+
+DEFAULT_LANGUAGE = 'hindi'
+
+# English verses by mood and chorus by genre
+VERSE_TEMPLATES = {
+    'happy': [
+        "When I think about {theme}, my heart starts to glow",
+        "Every moment with {theme}, letting feelings flow",
+        "Dancing through the day, {theme} lights my way",
+        "Nothing can compare to this joy I display"
+    ],
+    'sad': [
+        "Memories of {theme} fade like morning dew",
+        "Lost in thoughts of {theme}, feeling so blue",
+        "Searching for the light, through the darkest night",
+        "Hoping {theme} will make things right"
+    ],
+    'energetic': [
+        "Let's go, {theme} is calling out my name",
+        "Feel the beat, {theme} sets my soul aflame",
+        "No stopping now, we're breaking all the chains",
+        "Living for {theme}, running through the veins"
+    ],
+    'calm': [
+        "Peaceful moments with {theme} by my side",
+        "Gentle whispers where {theme} resides",
+        "In the stillness, {theme} helps me find",
+        "A quiet place within my mind"
+    ]
+}
+
+CHORUS_TEMPLATES = {
+    'pop': [
+        "Oh {theme}, you're everything I need",
+        "{theme}, you're the one who sets me free",
+        "Together we can fly so high",
+        "With {theme}, reaching for the sky"
+    ],
+    'rock': [
+        "{theme}! Breaking through the night!",
+        "{theme}! We're ready for the fight!",
+        "Nothing's gonna hold us back!",
+        "With {theme}, we're on the attack!"
+    ],
+    'jazz': [
+        "{theme} in the moonlight, soft and slow",
+        "Swaying to the rhythm, letting feelings show",
+        "In this jazzy paradise we've found",
+        "With {theme}, love knows no bound"
+    ],
+    'hip-hop': [
+        "Yeah, {theme} on my mind all day",
+        "Living life my own unique way",
+        "{theme} got me feeling so fly",
+        "Reaching for the stars up in the sky"
+    ]
+}
+
+DEFAULT_MOOD = 'happy'
+DEFAULT_GENRE = 'pop'
+
+REGIONAL_LAYOUT = """[Verse 1]
+{verse[0]}
+{verse[1]}
+{verse[2]}
+{verse[3]}
+
+[Chorus]
+{chorus[0]}
+{chorus[1]}
+{chorus[2]}
+{chorus[3]}
+
+[Verse 2]
+{verse[0]}
+{verse[2]}
+{verse[1]}
+{verse[3]}
+
+[Chorus]
+{chorus[0]}
+{chorus[1]}
+{chorus[2]}
+{chorus[3]}
+
+[Bridge]
+{bridge}
+
+[Final Chorus]
+{chorus[0]}
+{chorus[1]}
+{chorus[2]}
+{chorus[3]}
+
+[Outro]
+{outro}
+"""
+
+ENGLISH_LAYOUT = """[Verse 1]
+{verse[0]}
+{verse[1]}
+{verse[2]}
+{verse[3]}
+
+[Chorus]
+{chorus[0]}
+{chorus[1]}
+{chorus[2]}
+{chorus[3]}
+
+[Verse 2]
+The rhythm of {theme} pulses through my soul
+With every beat, {theme} makes me whole
+Can you feel the magic in the air?
+{theme}'s presence everywhere
+
+[Chorus]
+{chorus[0]}
+{chorus[1]}
+{chorus[2]}
+{chorus[3]}
+
+[Bridge]
+When the world feels cold and gray
+{theme} shows me the way
+Through the highs and through the lows
+{theme}'s the melody that flows
+
+[Final Chorus]
+{chorus[0]}
+{chorus[1]}
+{chorus[2]}
+{chorus[3]}
+
+[Outro]
+{theme}... {theme}...
+Forever in my heart, {theme}
+"""
+
+
+def _compile(lyrics):
+    """Pieces of rendered lyrics around their theme placeholders"""
+    return tuple(lyrics.split(THEME))
+
+
+# Compiled lyrics by template key: the language for the regional languages,
+# ('english', mood, genre) for English
+COMPILED_TEMPLATES = {
+    language: _compile(REGIONAL_LAYOUT.format(**template))
+    for language, template in REGIONAL_TEMPLATES.items()
+}
+COMPILED_TEMPLATES.update({
+    ('english', mood, genre): _compile(ENGLISH_LAYOUT.format(verse=verse, chorus=chorus, theme=THEME))
+    for mood, verse in VERSE_TEMPLATES.items()
+    for genre, chorus in CHORUS_TEMPLATES.items()
+})
+
+
+def template_key(genre, mood, language='english'):
+    """
+    Key of the compiled template lyrics are generated from
+
+    Unknown languages fall back to Hindi, and unknown English moods and
+    genres to happy and pop. Regional templates ignore genre and mood.
+    """
+    if language != 'english':
+        return language if language in REGIONAL_TEMPLATES else DEFAULT_LANGUAGE
+    return (
+        'english',
+        mood if mood in VERSE_TEMPLATES else DEFAULT_MOOD,
+        genre if genre in CHORUS_TEMPLATES else DEFAULT_GENRE
+    )
+
+
+@lru_cache(maxsize=LYRICS_CACHE_SIZE)
+def _render(theme, key):
+    return theme.join(COMPILED_TEMPLATES[key])
+
+
+def render_lyrics(theme, genre, mood, language='english'):
+    """
+    Lyrics about a theme from the template of a genre, mood and language
+
+    Args:
+        theme: What the song is about
+        genre: English chorus style (pop, rock, jazz, hip-hop)
+        mood: English verse style (happy, sad, energetic, calm)
+        language: 'english' or a regional language (hindi, tamil, ...)
+
+    Returns:
+        Lyrics text with verse, chorus, bridge and outro sections
+    """
+    return _render(str(theme), template_key(genre, mood, language))
@@ -0,0 +1,214 @@
+"""
+In-process metrics, exposed by the /metrics route in Prometheus text format
+
+Hot paths wrap their stages (title lookup, scoring, sorting, DataFrame
+slicing, weather HTTP, JSON encoding, ...) in stage(), which records the
+elapsed time in a fixed-bucket histogram. Caches report hits and misses
+with cache_lookup(), and model builds are timed with build_timer().
+
+Metrics are off unless METRICS_ENABLED=1 is set. When off, every helper
+returns immediately without timing anything. Each server worker process
+keeps its own registry.
+"""
+import os
+import threading
+import time
+from bisect import bisect_left
+from contextlib import nullcontext
+
+ENABLED = os.environ.get('METRICS_ENABLED', '').lower() in ('1', 'true', 'yes')
+
+PREFIX = 'dynamic_tune'
+
+# Histogram bucket upper bounds in seconds (+Inf is implicit)
+BUCKETS = (0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025,
+           0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+_NULL = nullcontext()
+
+
+class Histogram:
+    """
+    Per-bucket counts of observed durations
+    """
+
+    __slots__ = ('counts', 'total', 'count')
+
+    def __init__(self):
+        self.counts = [0] * (len(BUCKETS) + 1)
+        self.total = 0.0
+        self.count = 0
+
+    def observe(self, seconds):
+        self.counts[bisect_left(BUCKETS, seconds)] += 1
+        self.total += seconds
+        self.count += 1
+
+
+class Registry:
+    """
+    Stage and request histograms, cache counters and build durations
+    """
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.stages = {}
+        self.requests = {}
+        self.cache = {}
+        self.builds = {}
+
+    def observe(self, histograms, key, seconds):
+        with self.lock:
+            histogram = histograms.get(key)
+            if histogram is None:
+                histogram = histograms[key] = Histogram()
+            histogram.observe(seconds)
+
+    def count_cache(self, cache, hit):
+        with self.lock:
+            hits, misses = self.cache.get(cache, (0, 0))
+            self.cache[cache] = (hits + 1, misses) if hit else (hits, misses + 1)
+
+    def record_build(self, model, seconds):
+        with self.lock:
+            self.builds[model] = seconds
+
+    def clear(self):
+        with self.lock:
+            self.stages.clear()
+            self.requests.clear()
+            self.cache.clear()
+            self.builds.clear()
+
+
+registry = Registry()
+
+
+class _Timer:
+    """Context manager passing its elapsed time to a callback"""
+
+    __slots__ = ('record', 'key', 'start')
+
+    def __init__(self, record, key):
+        self.record = record
+        self.key = key
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc_info):
+        self.record(self.key, time.perf_counter() - self.start)
+        return False
+
+
+def _observe_stage(stage_name, seconds):
+    registry.observe(registry.stages, stage_name, seconds)
+
+
+def stage(name):
+    """
+    Time a block of code as one stage of request handling
+
+    Usage:
+        with metrics.stage('scoring'):
+            scores = ...
+    """
+    if not ENABLED:
+        return _NULL
+    return _Timer(_observe_stage, name)
+
+
+def observe_request(route, seconds):
+    """Record the total handling time of a request"""
+    if ENABLED:
+        registry.observe(registry.requests, route, seconds)
+
+
+def cache_lookup(cache, hit):
+    """Count a hit or miss of a named cache"""
+    if ENABLED:
+        registry.count_cache(cache, hit)
+
+
+def build_timer(model):
+    """Time a model build (the last duration per model is reported)"""
+    if not ENABLED:
+        return _NULL
+    return _Timer(registry.record_build, model)
+
+
+def _label(value):
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def _copy(histogram):
+    copy = Histogram()
+    copy.counts = list(histogram.counts)
+    copy.total = histogram.total
+    copy.count = histogram.count
+    return copy
+
+
+def _histogram_lines(name, label, histograms):
+    lines = []
+    for key, histogram in sorted(histograms.items()):
+        labels = f'{label}="{_label(key)}"'
+        cumulative = 0
+        for bound, count in zip(BUCKETS, histogram.counts):
+            cumulative += count
+            lines.append(f'{name}_bucket{{{labels},le="{bound}"}} {cumulative}')
+        lines.append(f'{name}_bucket{{{labels},le="+Inf"}} {histogram.count}')
+        lines.append(f'{name}_sum{{{labels}}} {histogram.total!r}')
+        lines.append(f'{name}_count{{{labels}}} {histogram.count}')
+    return lines
+
+
+def render():
+    """
+    All metrics in the Prometheus text exposition format
+
+    Returns:
+        str ending with a newline
+    """
+    with registry.lock:
+        stages = {key: _copy(histogram) for key, histogram in registry.stages.items()}
+        requests = {key: _copy(histogram) for key, histogram in registry.requests.items()}
+        cache = dict(registry.cache)
+        builds = dict(registry.builds)
+
+    lines = [
+        f'# HELP {PREFIX}_stage_duration_seconds Time spent in each request handling stage',
+        f'# TYPE {PREFIX}_stage_duration_seconds histogram'
+    ]
+    lines += _histogram_lines(f'{PREFIX}_stage_duration_seconds', 'stage', stages)
+
+    lines += [
+        f'# HELP {PREFIX}_request_duration_seconds Total request handling time per route',
+        f'# TYPE {PREFIX}_request_duration_seconds histogram'
+    ]
+    lines += _histogram_lines(f'{PREFIX}_request_duration_seconds', 'route', requests)
+
+    lines += [
+        f'# HELP {PREFIX}_cache_requests_total Cache lookups by result',
+        f'# TYPE {PREFIX}_cache_requests_total counter'
+    ]
+    for name, (hits, misses) in sorted(cache.items()):
+        lines.append(f'{PREFIX}_cache_requests_total{{cache="{_label(name)}",result="hit"}} {hits}')
+        lines.append(f'{PREFIX}_cache_requests_total{{cache="{_label(name)}",result="miss"}} {misses}')
+
+    lines += [
+        f'# HELP {PREFIX}_cache_hit_ratio Share of cache lookups that were hits',
+        f'# TYPE {PREFIX}_cache_hit_ratio gauge'
+    ]
+    for name, (hits, misses) in sorted(cache.items()):
+        lines.append(f'{PREFIX}_cache_hit_ratio{{cache="{_label(name)}"}} {hits / (hits + misses)!r}')
+
+    lines += [
+        f'# HELP {PREFIX}_model_build_duration_seconds Duration of the last build of each model',
+        f'# TYPE {PREFIX}_model_build_duration_seconds gauge'
+    ]
+    for model, seconds in sorted(builds.items()):
+        lines.append(f'{PREFIX}_model_build_duration_seconds{{model="{_label(model)}"}} {seconds!r}')
+
+    return '\n'.join(lines) + '\n'
@@ -0,0 +1,75 @@
+"""
+Persistence of built recommendation models
+
+A model artifact holds the fitted recommender (preprocessed catalog, TF-IDF
+vectorizer and matrix, optional latent embeddings) together with the
+options it was built with and the modification time of its source CSV, so
+a restart can skip the build when nothing has changed.
+"""
+import os
+import joblib
+
+ARTIFACT_VERSION = 6
+
+
+def artifact_path(model_dir, dataset_name):
+    """Path of the artifact file for a dataset"""
+    return os.path.join(model_dir, f"{dataset_name}.joblib")
+
+
+def save_model(recommender, path, options=None, source_path=None):
+    """
+    Save a built recommender to disk
+
+    Args:
+        recommender: Fitted recommender instance
+        path: Artifact file path
+        options: Options the recommender was built with
+        source_path: CSV the catalog was loaded from
+    """
+    os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+    artifact = {
+        'version': ARTIFACT_VERSION,
+        'class': type(recommender).__name__,
+        'options': options or {},
+        'source_mtime': os.path.getmtime(source_path) if source_path else None,
+        'recommender': recommender
+    }
+    # Write to a temporary file first so a crash never leaves a torn artifact
+    tmp_path = path + '.tmp'
+    joblib.dump(artifact, tmp_path)
+    os.replace(tmp_path, path)
+
+
+def load_model(path, expected_class, options=None, source_path=None):
+    """
+    Load a recommender artifact if it is still valid
+
+    Args:
+        path: Artifact file path
+        expected_class: Recommender class the artifact must contain
+        options: Options the caller wants the model built with
+        source_path: CSV the catalog is loaded from
+
+    Returns:
+        The recommender, or None if the artifact is missing or stale
+    """
+    if not os.path.exists(path):
+        return None
+
+    try:
+        artifact = joblib.load(path)
+    except Exception as e:
+        print(f"⚠ Ignoring unreadable model artifact {path}: {e}")
+        return None
+
+    if artifact.get('version') != ARTIFACT_VERSION:
+        return None
+    if artifact.get('class') != expected_class.__name__:
+        return None
+    if artifact.get('options') != (options or {}):
+        return None
+    if source_path and artifact.get('source_mtime') != os.path.getmtime(source_path):
+        return None
+
+    return artifact['recommender']
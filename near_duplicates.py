@@ -0,0 +1,293 @@
+"""
+Near-duplicate detection for song catalogs (MinHash + LSH)
+
+Exact (title, artist) de-duplication keeps remasters, live versions and
+"(feat. X)" variants of a song, and they then crowd each other's
+recommendations. find_near_duplicates() groups such rows in near-linear
+time:
+
+1. Titles and artists are normalized: lowercased, version qualifiers
+   ("(Live)", "- 2011 Remaster", "feat. X", ...) and punctuation removed.
+2. Each song becomes a set of character 5-gram shingles of its normalized
+   title and the start of its lyrics, hashed with NumPy over the whole
+   catalog at once.
+3. A MinHash signature of NUM_PERM hashes estimates the Jaccard similarity
+   of two shingle sets; LSH buckets the songs by BANDS slices of their
+   signature, so only songs sharing a bucket are ever compared.
+4. Candidate pairs are verified (same normalized artist and title numbers,
+   estimated Jaccard >= threshold) and merged into clusters with
+   connected components.
+
+collapse_near_duplicates() keeps one canonical row per cluster and returns
+the other titles as aliases, so lookups of a dropped variant still
+resolve to its canonical song.
+"""
+import numpy as np
+import pandas as pd
+from scipy.sparse import coo_matrix
+from scipy.sparse.csgraph import connected_components
+
+# Estimated Jaccard similarity at or above which two songs are duplicates
+NEAR_DUPLICATE_THRESHOLD = 0.8
+
+# MinHash signature length and LSH banding (NUM_PERM = BANDS x rows per band)
+NUM_PERM = 64
+BANDS = 16
+
+# Characters per shingle, and lyrics characters shingled per song
+SHINGLE_SIZE = 5
+LYRICS_CHARS = 200
+
+# Songs hashed per block: keeps a block's shingles in the CPU cache while
+# every hash function runs over them
+BLOCK_ROWS = 2048
+
+# Candidate pairs verified per block
+VERIFY_PAIRS = 65536
+
+_VERSION_WORDS = (r'live|remaster(?:ed)?|version|edit|mix|mono|stereo|demo|acoustic|'
+                  r'radio|explicit|bonus|deluxe|instrumental|karaoke|unplugged|session')
+_FEATURING = r'(?:feat\.?|ft\.?|featuring)'
+
+# Version qualifiers removed from lowercased titles:
+# "(Live at Wembley)", "[2011 Remaster]", "(feat. X)", "Song - Remastered 2011", "Song feat. X"
+_TITLE_QUALIFIERS = (rf'[\(\[][^\)\]]*\b(?:{_VERSION_WORDS}|{_FEATURING})[^\)\]]*[\)\]]'
+                     rf'|\s-\s.*\b(?:{_VERSION_WORDS})\b.*$'
+                     rf'|\s{_FEATURING}\s.*$')
+_ARTIST_QUALIFIERS = rf'[\(\[]?\s*\b{_FEATURING}\s.*$'
+
+# Runs of punctuation and whitespace, collapsed to one space
+_SEPARATORS = r'(?:\W|_)+'
+
+_HASH_MULTIPLIER = np.uint64(0x100000001B3)
+
+# ASCII punctuation and whitespace, folded into spaces when shingling
+_FOLDED_ASCII = np.array([0 < c < 128 and not chr(c).isalnum() and c != 1 for c in range(128)])
+_PAD = '\x01'
+
+
+
+def _normalize(values, *patterns):
+    """
+    Lowercase texts and replace each pattern, then every run of
+    punctuation and whitespace, with a space
+
+    Repeated values (e.g. artists) are normalized once.
+    """
+    codes, uniques = pd.factorize(values.astype(str), use_na_sentinel=False)
+    text = pd.Series(uniques).str.lower()
+    for pattern in patterns + (_SEPARATORS,):
+        text = text.str.replace(pattern, ' ', regex=True)
+    return pd.Series(text.str.strip().to_numpy(dtype=object)[codes], index=values.index)
+
+
+def normalize_titles(titles):
+    """
+    Titles without version qualifiers and punctuation
+
+    Titles that are nothing but a qualifier keep their lowercased form.
+    """
+    normalized = _normalize(titles, _TITLE_QUALIFIERS)
+    fallback = titles.astype(str).str.lower().str.strip()
+    return normalized.where(normalized != '', fallback)
+
+
+def normalize_artists(artists):
+    """Artists without featured artists and punctuation"""
+    return _normalize(artists, _ARTIST_QUALIFIERS)
+
+
+def _string_hashes(values):
+    """64-bit hash of each string (pandas' vectorized object hashing)"""
+    return pd.util.hash_array(values.to_numpy(dtype=object)).astype(np.uint64)
+
+
+def _shingle_hashes(texts):
+    """
+    Hashes of the character shingles of several texts
+
+    Runs of ASCII punctuation and whitespace count as one space, so the
+    texts need no regex clean-up beforehand.
+
+    Returns:
+        (hashes, starts, empty): uint64 shingle hashes grouped by text, the
+        offset of each text's first shingle, and a mask of the texts too
+        short to have any
+    """
+    texts = texts.str.pad(SHINGLE_SIZE, side='right', fillchar=_PAD)
+    codepoints = np.frombuffer('\x00'.join(texts).encode('utf-32-le'), dtype=np.uint32)
+
+    folded = np.zeros(len(codepoints), dtype=bool)
+    ascii_chars = codepoints < 128
+    folded[ascii_chars] = _FOLDED_ASCII[codepoints[ascii_chars]]
+    codepoints = np.where(folded, 32, codepoints).astype(np.uint64)
+    codepoints = codepoints[~(folded & np.r_[False, folded[:-1]])]
+
+    n_windows = len(codepoints) - SHINGLE_SIZE + 1
+    hashes = np.zeros(n_windows, dtype=np.uint64)
+    boundary = np.zeros(n_windows, dtype=bool)
+    with np.errstate(over='ignore'):
+        for offset in range(SHINGLE_SIZE):
+            window = codepoints[offset:offset + n_windows]
+            hashes = (hashes ^ window) * _HASH_MULTIPLIER
+            boundary |= window == 0
+
+    # Windows crossing a text boundary belong to no text
+    text_of_window = np.cumsum(codepoints[:n_windows] == 0)[~boundary]
+    starts = np.searchsorted(text_of_window, np.arange(len(texts)))
+    empty = np.bincount(text_of_window, minlength=len(texts)) == 0
+    return hashes[~boundary], starts, empty
+
+
+def minhash_signatures(texts, num_perm=NUM_PERM, seed=0):
+    """
+    MinHash signatures of the character shingle sets of texts
+
+    Args:
+        texts: Series of normalized texts
+        num_perm: Hash functions per signature
+        seed: Seed of the hash functions
+
+    Returns:
+        (len(texts), num_perm) uint32 array
+    """
+    rng = np.random.default_rng(seed)
+    # Multiply-shift hashing of 32-bit keys: (a * x + b) >> 32 with odd a
+    multipliers = rng.integers(1, 2 ** 63, size=num_perm, dtype=np.uint64) | np.uint64(1)
+    increments = rng.integers(0, 2 ** 63, size=num_perm, dtype=np.uint64)
+
+    signatures = np.empty((len(texts), num_perm), dtype=np.uint32)
+    for block in range(0, len(texts), BLOCK_ROWS):
+        hashes, starts, empty = _shingle_hashes(texts.iloc[block:block + BLOCK_ROWS])
+        rows = block + np.arange(len(starts))
+        keys = hashes >> np.uint64(32)
+        permuted = np.empty_like(keys)
+        for i in range(num_perm):
+            np.multiply(keys, multipliers[i], out=permuted)
+            np.add(permuted, increments[i], out=permuted)
+            np.right_shift(permuted, np.uint64(32), out=permuted)
+            signatures[rows[~empty], i] = np.minimum.reduceat(permuted, starts[~empty])
+        # Texts without shingles get a signature matching no other text
+        signatures[rows[empty]] = rows[empty, None]
+    return signatures
+
+
+def _candidate_pairs(signatures, groups, bands):
+    """
+    Pairs of rows sharing an LSH bucket in at least one band
+
+    Rows are only bucketed with rows of the same group. Each bucket
+    contributes (first row, other row) pairs, so a large bucket costs
+    linear rather than quadratic work.
+    """
+    n_rows, num_perm = signatures.shape
+    rows_per_band = num_perm // bands
+    pairs = []
+    with np.errstate(over='ignore'):
+        for band in range(bands):
+            keys = groups.copy()
+            for column in range(band * rows_per_band, (band + 1) * rows_per_band):
+                keys = (keys ^ signatures[:, column]) * _HASH_MULTIPLIER
+
+            order = np.argsort(keys, kind='stable')
+            sorted_keys = keys[order]
+            new_bucket = np.r_[True, sorted_keys[1:] != sorted_keys[:-1]]
+            bucket_first = order[np.flatnonzero(new_bucket)]
+            first = bucket_first[np.cumsum(new_bucket) - 1]
+            shared = ~new_bucket
+            pairs.append(first[shared].astype(np.int64) * n_rows + order[shared])
+
+    pairs = np.unique(np.concatenate(pairs))
+    return pairs // n_rows, pairs % n_rows
+
+
+def find_near_duplicates(titles, artists, lyrics=None, priority=None,
+                         threshold=NEAR_DUPLICATE_THRESHOLD, num_perm=NUM_PERM, bands=BANDS):
+    """
+    Canonical row of every song in a catalog
+
+    Args:
+        titles: Series of song titles
+        artists: Series of artists (songs only match songs of the same artist)
+        lyrics: Optional Series of lyrics; the first LYRICS_CHARS are shingled
+        priority: Optional array; the highest-priority row of a cluster
+            becomes canonical (default: the first row)
+        threshold: Minimum estimated Jaccard similarity of duplicates
+        num_perm: MinHash signature length
+        bands: LSH bands (must divide num_perm)
+
+    Returns:
+        1-D int array, for each row the row id of its canonical row
+        (itself when the song has no duplicate)
+    """
+    n_rows = len(titles)
+    if n_rows < 2:
+        return np.arange(n_rows)
+
+    title_keys = normalize_titles(titles)
+    texts = title_keys
+    if lyrics is not None:
+        lyric_starts = lyrics.astype(str).str.slice(0, LYRICS_CHARS).str.lower()
+        texts = title_keys + ' ' + lyric_starts
+
+    # Songs are compared only within the same artist and title numbers,
+    # so "Part 1" and "Part 2" never merge
+    numbers = title_keys.str.findall(r'\d+').str.join(' ')
+    groups = _string_hashes(normalize_artists(artists) + '\x00' + numbers)
+
+    signatures = minhash_signatures(texts.reset_index(drop=True), num_perm)
+    first, other = _candidate_pairs(signatures, groups, bands)
+
+    # Verify: same group and enough agreeing MinHash values
+    agreement = np.zeros(len(first))
+    for start in range(0, len(first), VERIFY_PAIRS):
+        block = slice(start, start + VERIFY_PAIRS)
+        agreement[block] = (signatures[first[block]] == signatures[other[block]]).mean(axis=1)
+    keep = (agreement >= threshold) & (groups[first] == groups[other])
+    first, other = first[keep], other[keep]
+
+    graph = coo_matrix((np.ones(len(first), dtype=np.int8), (first, other)), shape=(n_rows, n_rows))
+    _, labels = connected_components(graph, directed=False)
+
+    # Canonical row: highest priority, then lowest row id
+    rows = np.arange(n_rows)
+    rank = np.zeros(n_rows) if priority is None else -np.asarray(priority, dtype=np.float64)
+    order = np.lexsort((rows, rank, labels))
+    is_first = np.r_[True, labels[order][1:] != labels[order][:-1]]
+    canonical_of_label = np.empty(labels.max() + 1, dtype=np.int64)
+    canonical_of_label[labels[order][is_first]] = order[is_first]
+    return canonical_of_label[labels]
+
+
+def collapse_near_duplicates(df, title_column, artist_column, text_column=None,
+                             priority_column=None, threshold=NEAR_DUPLICATE_THRESHOLD):
+    """
+    Keep one row per cluster of near-duplicate songs
+
+    Args:
+        df: Catalog DataFrame
+        title_column: Column of song titles
+        artist_column: Column of artists
+        text_column: Optional column of lyrics
+        priority_column: Optional column ranking the canonical candidates
+            (e.g. popularity)
+        threshold: Minimum estimated Jaccard similarity of duplicates
+
+    Returns:
+        (catalog, aliases): the catalog without the duplicates (index reset)
+        and a DataFrame of the dropped rows' title and artist with the
+        'song_id' of their canonical row in the new catalog
+    """
+    lyrics = df[text_column] if text_column and text_column in df.columns else None
+    priority = None
+    if priority_column and priority_column in df.columns:
+        priority = df[priority_column].fillna(-np.inf).to_numpy(dtype=np.float64)
+
+    canonical = find_near_duplicates(df[title_column], df[artist_column], lyrics, priority,
+                                     threshold=threshold)
+    kept = canonical == np.arange(len(df))
+    new_ids = np.cumsum(kept) - 1
+
+    aliases = df.loc[~kept, [title_column, artist_column]].reset_index(drop=True)
+    aliases['song_id'] = new_ids[canonical[~kept]]
+    return df[kept].reset_index(drop=True), aliases
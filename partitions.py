@@ -0,0 +1,88 @@
+"""
+Per-key partitions of a catalog
+
+The Indian Languages recommender keeps its catalog sorted by language, so
+every language occupies one contiguous row range. A language-scoped query
+then works on slices of the TF-IDF matrix, embeddings and feature arrays
+(views, no copies) instead of scanning or fancy-indexing the whole
+catalog.
+"""
+import numpy as np
+import scipy.sparse as sp
+
+
+def partition_order(keys):
+    """
+    Stable row order that groups equal (lowercased) keys together
+
+    Args:
+        keys: Series of partition keys
+
+    Returns:
+        1-D int array of row positions
+    """
+    normalized = keys.astype(str).str.strip().str.lower().to_numpy()
+    return np.argsort(normalized, kind='stable')
+
+
+class CatalogPartitions:
+    """
+    Contiguous row ranges of a catalog sorted by a key column
+    """
+
+    def __init__(self, keys):
+        """
+        Find the row range of every key
+
+        Args:
+            keys: Series of partition keys, already grouped (see partition_order)
+        """
+        normalized = keys.astype(str).str.strip().str.lower().to_numpy()
+        boundaries = np.flatnonzero(normalized[1:] != normalized[:-1]) + 1
+        starts = np.concatenate([[0], boundaries]) if len(normalized) else np.empty(0, dtype=int)
+        ends = np.append(starts[1:], len(normalized))
+
+        self.ranges = {
+            normalized[start]: (int(start), int(end)) for start, end in zip(starts, ends)
+        }
+        if len(self.ranges) != len(starts):
+            raise ValueError("Catalog rows are not grouped by partition key")
+
+    def __contains__(self, key):
+        return str(key).strip().lower() in self.ranges
+
+    def __len__(self):
+        return len(self.ranges)
+
+    def keys(self):
+        """Partition keys (lowercased) in row order"""
+        return list(self.ranges)
+
+    def slice(self, key):
+        """Row slice of a partition, or None if the key is unknown"""
+        bounds = self.ranges.get(str(key).strip().lower())
+        return None if bounds is None else slice(*bounds)
+
+    def sizes(self):
+        """Number of rows per partition"""
+        return {key: end - start for key, (start, end) in self.ranges.items()}
+
+
+def csr_rows(matrix, rows):
+    """
+    Contiguous rows of a CSR matrix without copying its data
+
+    Args:
+        matrix: scipy CSR matrix
+        rows: slice with step 1
+
+    Returns:
+        CSR matrix sharing data and indices with the original
+    """
+    start, stop, _ = rows.indices(matrix.shape[0])
+    indptr = matrix.indptr[start:stop + 1]
+    low, high = indptr[0], indptr[-1]
+    return sp.csr_matrix(
+        (matrix.data[low:high], matrix.indices[low:high], indptr - low),
+        shape=(stop - start, matrix.shape[1])
+    )
@@ -0,0 +1,87 @@
+"""
+Vectorized preprocessing shared by the recommenders
+
+Every helper works on whole columns (pandas string methods and NumPy masks)
+instead of per-row df.apply calls, which keeps catalog loading fast on
+large CSVs.
+"""
+import re
+import numpy as np
+import pandas as pd
+
+# Coarse audio tags added to the text features:
+# (column, high threshold, high tag, low threshold, low tag)
+AUDIO_TAG_RULES = [
+    ('danceability', 0.7, 'high_dance', 0.3, 'low_dance'),
+    ('energy', 0.7, 'high_energy', 0.3, 'low_energy'),
+    ('acousticness', 0.5, 'acoustic', None, None),
+    ('Valence', 0.7, 'happy', 0.3, 'sad')
+]
+
+
+def fill_text_columns(df, defaults):
+    """
+    Fill missing values of text columns in place
+
+    Args:
+        df: DataFrame to clean
+        defaults: Mapping of column name to fill value; missing columns are skipped
+    """
+    for column, default in defaults.items():
+        if column in df.columns:
+            df[column] = df[column].fillna(default)
+
+
+def fill_numeric_median(df, columns):
+    """Fill missing values of numeric columns with the column median, in place"""
+    for column in columns:
+        if column in df.columns:
+            df[column] = df[column].fillna(df[column].median())
+
+
+def has_audio_tag_columns(df, rules=AUDIO_TAG_RULES):
+    """Whether the DataFrame has every column the audio tag rules need"""
+    return all(rule[0] in df.columns for rule in rules)
+
+
+def audio_feature_tags(df, rules=AUDIO_TAG_RULES):
+    """
+    Convert audio features to descriptive tags for all rows at once
+
+    Args:
+        df: DataFrame with the audio feature columns named in rules
+        rules: Tag rules, see AUDIO_TAG_RULES
+
+    Returns:
+        Series of tag text, each tag prefixed with a space
+        (e.g. ' high_dance acoustic'), empty for rows without tags
+    """
+    tags = np.full(len(df), '', dtype=object)
+
+    for column, high, high_tag, low, low_tag in rules:
+        values = df[column].to_numpy()
+        conditions = [values > high]
+        choices = [' ' + high_tag]
+        if low is not None:
+            conditions.append(values < low)
+            choices.append(' ' + low_tag)
+        tags = tags + np.select(conditions, choices, default='').astype(object)
+
+    return pd.Series(tags, index=df.index)
+
+
+def contains_any(series, keywords):
+    """
+    Mask of rows whose lowercased text contains any of the keywords
+
+    Args:
+        series: Text column
+        keywords: Substrings to look for (matched literally)
+
+    Returns:
+        Boolean Series, False for missing values
+    """
+    if not keywords:
+        return pd.Series(False, index=series.index)
+    pattern = '|'.join(re.escape(str(keyword).lower()) for keyword in keywords)
+    return series.astype('string').str.lower().str.contains(pattern, na=False).astype(bool)
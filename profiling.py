@@ -0,0 +1,294 @@
+"""
+On-demand profiling of single requests
+
+With PROFILING_ENABLED=1 and a PROFILING_TOKEN set, a request carrying
+the token in an X-Profile header or a ?profile= query parameter is run
+under a profiler. The report is stored
+in PROFILE_DIR and its id is returned in the X-Profile-Id response header;
+GET /profiles/<id> serves it.
+
+Two modes:
+    cprofile (default): deterministic cProfile; the report lists the top
+        functions by cumulative and by own time, and a .prof file is kept
+        for pstats or snakeviz
+    sample: a background thread samples the request thread's stack every
+        PROFILE_SAMPLE_INTERVAL seconds; the report lists the hottest
+        functions and a collapsed-stack .folded file is written for
+        flamegraph.pl / speedscope (GET /profiles/<id>?format=folded).
+        cProfile records no full stacks, so its profiles have no
+        collapsed-stack file
+
+The sampler does not touch the interpreter's thread switch interval
+(sys.setswitchinterval is process wide and would change the scheduling
+of every other request), so while the profiled request holds the GIL
+samples are taken at most every switch interval (5 ms by default).
+
+Profiling stays disabled without a PROFILING_TOKEN, since anyone could
+otherwise start profiles and read every stored report. GET /profiles/<id>
+requires the same token, and the token is removed from the query string
+stored in the report. Profiling is rate limited (PROFILING_RATE_LIMIT
+profiles per minute per process, one at a time); requests over the limit
+are served normally with an X-Profile-Skipped header.
+"""
+import cProfile
+import hmac
+import json
+import os
+import pstats
+import sys
+import threading
+import time
+import uuid
+from collections import Counter
+from urllib.parse import parse_qs, parse_qsl, urlencode
+
+PROFILING_TOKEN = os.environ.get('PROFILING_TOKEN')
+ENABLED = os.environ.get('PROFILING_ENABLED', '').lower() in ('1', 'true', 'yes')
+if ENABLED and not PROFILING_TOKEN:
+    print("⚠ PROFILING_ENABLED is set without a PROFILING_TOKEN; profiling stays disabled")
+    ENABLED = False
+PROFILING_RATE_LIMIT = float(os.environ.get('PROFILING_RATE_LIMIT', 6))
+PROFILE_DIR = os.environ.get('PROFILE_DIR', 'profiles')
+PROFILE_SAMPLE_INTERVAL = float(os.environ.get('PROFILE_SAMPLE_INTERVAL', 0.001))
+
+# Functions listed in a report, and reports kept on disk
+PROFILE_TOP_FUNCTIONS = 25
+PROFILE_KEEP = 50
+
+MODES = ('cprofile', 'sample')
+
+# Requests for stored reports are never profiled themselves
+PROFILES_PATH = '/profiles/'
+
+
+def authorized(value):
+    """Whether a profile header or parameter value matches PROFILING_TOKEN"""
+    if not value or not PROFILING_TOKEN:
+        return False
+    # compare_digest only takes ASCII str, so compare the encoded bytes
+    return hmac.compare_digest(value.encode('utf-8', 'surrogatepass'),
+                               PROFILING_TOKEN.encode('utf-8', 'surrogatepass'))
+
+
+def _public_query(query_string):
+    """Query string without the profile parameter (which may carry the token)"""
+    params = parse_qsl(query_string or '', keep_blank_values=True)
+    return urlencode([(name, value) for name, value in params if name != 'profile'])
+
+
+class RateLimiter:
+    """
+    Token bucket allowing `rate` acquisitions per minute, one at a time
+    """
+
+    def __init__(self, rate):
+        self.rate = rate / 60.0
+        self.capacity = max(rate, 1.0)
+        self.tokens = self.capacity
+        self.updated = time.monotonic()
+        self.lock = threading.Lock()
+        self.busy = False
+
+    def acquire(self):
+        """Take a token (False if none is left or a profile is running)"""
+        with self.lock:
+            now = time.monotonic()
+            self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+            self.updated = now
+            if self.busy or self.tokens < 1:
+                return False
+            self.tokens -= 1
+            self.busy = True
+            return True
+
+    def release(self):
+        with self.lock:
+            self.busy = False
+
+
+def _frame_label(code):
+    return f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})"
+
+
+class StackSampler:
+    """
+    Sample one thread's call stack on a background thread
+
+    Samples are taken every `interval` seconds, or every thread switch
+    interval while the sampled thread holds the GIL, whichever is longer.
+    """
+
+    def __init__(self, thread_id, interval=PROFILE_SAMPLE_INTERVAL):
+        self.thread_id = thread_id
+        self.interval = interval
+        self.stacks = Counter()
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name='profile-sampler', daemon=True)
+
+    def start(self):
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        self._thread.join()
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            frame = sys._current_frames().get(self.thread_id)
+            stack = []
+            while frame is not None:
+                stack.append(_frame_label(frame.f_code))
+                frame = frame.f_back
+            if stack:
+                self.stacks[';'.join(reversed(stack))] += 1
+
+    def collapsed(self):
+        """Collapsed stacks, one 'frame;frame;... count' line each"""
+        return ''.join(f"{stack} {count}\n" for stack, count in self.stacks.most_common())
+
+    def top_functions(self, limit=PROFILE_TOP_FUNCTIONS):
+        """Hottest functions by own (leaf) and total samples"""
+        own = Counter()
+        total = Counter()
+        for stack, count in self.stacks.items():
+            frames = stack.split(';')
+            own[frames[-1]] += count
+            for frame in set(frames):
+                total[frame] += count
+        n_samples = sum(self.stacks.values()) or 1
+        return [
+            {
+                'function': function,
+                'own_samples': own[function],
+                'total_samples': total[function],
+                'total_share': round(total[function] / n_samples, 4)
+            }
+            for function, _ in own.most_common(limit)
+        ]
+
+
+def _cprofile_top_functions(stats, own=False, limit=PROFILE_TOP_FUNCTIONS):
+    """Functions with the most cumulative (or own) time"""
+    column = 2 if own else 3
+    rows = sorted(stats.items(), key=lambda item: item[1][column], reverse=True)[:limit]
+    return [
+        {
+            'function': f"{name} ({os.path.basename(filename)}:{line})",
+            'calls': calls,
+            'own_seconds': round(own, 6),
+            'cumulative_seconds': round(cumulative, 6)
+        }
+        for (filename, line, name), (_, calls, own, cumulative, _) in rows
+    ]
+
+
+def _prune(directory, keep=PROFILE_KEEP):
+    """Delete the oldest reports beyond `keep`"""
+    reports = sorted(
+        (entry for entry in os.scandir(directory) if entry.name.endswith('.json')),
+        key=lambda entry: entry.stat().st_mtime
+    )
+    for entry in reports[:max(0, len(reports) - keep)]:
+        profile_id = entry.name[:-len('.json')]
+        for suffix in ('.json', '.prof', '.folded'):
+            try:
+                os.remove(os.path.join(directory, profile_id + suffix))
+            except FileNotFoundError:
+                pass
+
+
+def load_report(profile_id, folded=False):
+    """
+    A stored report (dict) or collapsed-stack file (str), None if unknown
+    """
+    if not profile_id.replace('-', '').isalnum():
+        return None
+    path = os.path.join(PROFILE_DIR, profile_id + ('.folded' if folded else '.json'))
+    if not os.path.exists(path):
+        return None
+    with open(path) as f:
+        return f.read() if folded else json.load(f)
+
+
+class ProfilingMiddleware:
+    """
+    WSGI middleware profiling the requests that ask for it
+    """
+
+    def __init__(self, wsgi_app, rate_limit=PROFILING_RATE_LIMIT):
+        self.wsgi_app = wsgi_app
+        self.limiter = RateLimiter(rate_limit)
+
+    def _requested_mode(self, environ):
+        """Profiling mode asked for by the request (None if not asked)"""
+        value = environ.get('HTTP_X_PROFILE')
+        mode = environ.get('HTTP_X_PROFILE_MODE')
+        if value is None:
+            query = parse_qs(environ.get('QUERY_STRING', ''))
+            value = query.get('profile', [None])[0]
+            mode = mode or query.get('profile_mode', [None])[0]
+        if not authorized(value):
+            return None
+        return mode if mode in MODES else 'cprofile'
+
+    def __call__(self, environ, start_response):
+        mode = None
+        if not environ.get('PATH_INFO', '').startswith(PROFILES_PATH):
+            mode = self._requested_mode(environ)
+        if mode is None:
+            return self.wsgi_app(environ, start_response)
+
+        if not self.limiter.acquire():
+            def start_skipped(status, headers, exc_info=None):
+                return start_response(status, headers + [('X-Profile-Skipped', 'rate-limited')], exc_info)
+            return self.wsgi_app(environ, start_skipped)
+
+        try:
+            profile_id = f"{time.strftime('%Y%m%d-%H%M%S')}-{uuid.uuid4().hex[:8]}"
+
+            def start_profiled(status, headers, exc_info=None):
+                return start_response(status, headers + [('X-Profile-Id', profile_id)], exc_info)
+
+            start = time.perf_counter()
+            if mode == 'sample':
+                sampler = StackSampler(threading.get_ident())
+                sampler.start()
+                try:
+                    body = self.wsgi_app(environ, start_profiled)
+                finally:
+                    sampler.stop()
+            else:
+                profiler = cProfile.Profile()
+                profiler.enable()
+                try:
+                    body = self.wsgi_app(environ, start_profiled)
+                finally:
+                    profiler.disable()
+            elapsed = time.perf_counter() - start
+
+            report = {
+                'id': profile_id,
+                'mode': mode,
+                'method': environ.get('REQUEST_METHOD'),
+                'path': environ.get('PATH_INFO'),
+                'query': _public_query(environ.get('QUERY_STRING')),
+                'duration_seconds': round(elapsed, 6)
+            }
+            os.makedirs(PROFILE_DIR, exist_ok=True)
+            base = os.path.join(PROFILE_DIR, profile_id)
+            if mode == 'sample':
+                report['samples'] = sum(sampler.stacks.values())
+                report['top_functions'] = sampler.top_functions()
+                with open(base + '.folded', 'w') as f:
+                    f.write(sampler.collapsed())
+            else:
+                stats = pstats.Stats(profiler).stats
+                report['top_functions'] = _cprofile_top_functions(stats)
+                report['top_own_time'] = _cprofile_top_functions(stats, own=True)
+                profiler.dump_stats(base + '.prof')
+            with open(base + '.json', 'w') as f:
+                json.dump(report, f, indent=2)
+            _prune(PROFILE_DIR)
+            return body
+        finally:
+            self.limiter.release()
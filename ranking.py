@@ -0,0 +1,40 @@
+"""
+Top-k selection over similarity score arrays
+"""
+import numpy as np
+
+import metrics
+
+
+def top_k(scores, k, exclude=None):
+    """
+    Indices of the k highest scores, best first
+
+    Uses argpartition so only the selected candidates are sorted; ties are
+    broken by row index to keep results deterministic.
+
+    Args:
+        scores: 1-D array of scores, one per row
+        k: Number of indices to return
+        exclude: Row index to leave out (e.g. the seed song)
+
+    Returns:
+        1-D int array of row indices
+    """
+    with metrics.stage('sorting'):
+        n_rows = len(scores)
+        n_candidates = min(k + (exclude is not None), n_rows)
+        if n_candidates <= 0:
+            return np.empty(0, dtype=np.intp)
+
+        if n_candidates < n_rows:
+            candidates = np.argpartition(-scores, n_candidates - 1)[:n_candidates]
+        else:
+            candidates = np.arange(n_rows)
+
+        order = np.lexsort((candidates, -scores[candidates]))
+        candidates = candidates[order]
+
+        if exclude is not None:
+            candidates = candidates[candidates != exclude]
+        return candidates[:k]
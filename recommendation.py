@@ -1,126 +1,162 @@
 import pandas as pd
 import numpy as np
-from sklearn.feature_extraction.text import TfidfVectorizer
 from sklearn.metrics.pairwise import cosine_similarity
 from sklearn.preprocessing import MinMaxScaler
+from catalog_stats import CatalogStats
+from field_vectorizer import FieldWeightedVectorizer
+import metrics
+from preprocessing import fill_text_columns
+from reranking import RERANK_POOL, rerank_rows, wants_rerank
+from sampling import request_rng, sample_rows
+from structured_log import get_logger
+from title_index import TitleIndex
 import warnings
 warnings.filterwarnings('ignore')
 
+logger = get_logger(__name__)
+
 class MusicRecommender:
     """
     Content-based music recommendation system using TF-IDF and cosine similarity
     """
     
-    def __init__(self, df):
+    TITLE_COLUMN = 'song'
+    ARTIST_COLUMN = 'artist'
+    
+    # TF-IDF settings for each text field, used when the column exists
+    TEXT_FIELDS = {
+        'lyrics': {'max_features': 5000, 'stop_words': 'english', 'ngram_range': (1, 2)},
+        'genre': {},
+        'mood': {},
+        'artist': {'ngram_range': (1, 2)}
+    }
+    
+    # Relative weight of each field in the similarity score (genre weighted up)
+    FIELD_WEIGHTS = {'lyrics': 2.0, 'genre': 2.0, 'mood': 1.0, 'artist': 1.0}
+    
+    def __init__(self, df, field_weights=None):
         """
         Initialize the recommender with a music dataset
         
         Args:
             df: Pandas DataFrame containing music data with columns like 
                 'song', 'artist', 'genre', 'lyrics', 'mood', etc.
+            field_weights: Override FIELD_WEIGHTS for some fields
         """
         self.df = df.copy()
+        self.field_weights = {**self.FIELD_WEIGHTS, **(field_weights or {})}
+        self.tfidf_matrix = None
         self.similarity_matrix = None
         self.tfidf_vectorizer = None
+        self.stats = None
+        self.title_lookup = None
         self._preprocess_data()
         self._build_recommendation_model()
     
     def _preprocess_data(self):
         """Preprocess the music data"""
-        # Create a combined feature text from available columns
-        feature_columns = []
-        
-        if 'lyrics' in self.df.columns:
-            self.df['lyrics'] = self.df['lyrics'].fillna('')
-            feature_columns.append('lyrics')
-        
-        if 'genre' in self.df.columns:
-            self.df['genre'] = self.df['genre'].fillna('unknown')
-            # Repeat genre to give it more weight
-            feature_columns.append('genre')
-            self.df['genre_weight'] = self.df['genre'] + ' ' + self.df['genre'] + ' ' + self.df['genre']
-            feature_columns.append('genre_weight')
-        
-        if 'mood' in self.df.columns:
-            self.df['mood'] = self.df['mood'].fillna('neutral')
-            feature_columns.append('mood')
-        
-        if 'artist' in self.df.columns:
-            self.df['artist'] = self.df['artist'].fillna('unknown')
-            feature_columns.append('artist')
-        
-        # Combine all features into one text field
-        if feature_columns:
-            self.df['combined_features'] = self.df[feature_columns].apply(
-                lambda x: ' '.join(x.astype(str)), axis=1
-            )
-        else:
-            # Fallback if no feature columns found
-            self.df['combined_features'] = self.df['song'].astype(str)
-        
-        # Clean up the text
-        self.df['combined_features'] = self.df['combined_features'].str.lower()
+        # Fill missing values in the text feature columns
+        fill_text_columns(self.df, {
+            'lyrics': '', 'genre': 'unknown', 'mood': 'neutral', 'artist': 'unknown'
+        })
     
     def _build_recommendation_model(self):
         """Build the TF-IDF model and compute similarity matrix"""
-        # Create TF-IDF vectorizer
-        self.tfidf_vectorizer = TfidfVectorizer(
-            max_features=5000,
-            stop_words='english',
-            ngram_range=(1, 2)
-        )
+        # One TF-IDF vectorizer per available field, weighted on stacking
+        text_fields = {
+            field: params for field, params in self.TEXT_FIELDS.items()
+            if field in self.df.columns
+        }
+        if not text_fields:
+            # Fallback if no feature columns found
+            text_fields = {'song': {}}
         
-        # Fit and transform the combined features
-        tfidf_matrix = self.tfidf_vectorizer.fit_transform(self.df['combined_features'])
+        self.tfidf_vectorizer = FieldWeightedVectorizer(text_fields, {
+            field: weight for field, weight in self.field_weights.items()
+            if field in text_fields
+        })
+        self.tfidf_matrix = self.tfidf_vectorizer.fit_transform({
+            field: self.df[field].astype(str) for field in text_fields
+        })
         
         # Compute cosine similarity matrix
-        self.similarity_matrix = cosine_similarity(tfidf_matrix, tfidf_matrix)
+        self.similarity_matrix = cosine_similarity(self.tfidf_matrix, self.tfidf_matrix)
+        
+        self.stats = CatalogStats(self.df, count_columns=['genre', 'mood', 'artist'])
+        self.title_lookup = TitleIndex(self.df[self.TITLE_COLUMN])
         
         print(f"✓ Recommendation model built successfully!")
         print(f"  - Dataset size: {len(self.df)} songs")
-        print(f"  - Feature matrix shape: {tfidf_matrix.shape}")
+        print(f"  - Feature matrix shape: {self.tfidf_matrix.shape}")
+    
+    def set_field_weights(self, **weights):
+        """
+        Re-weight the text fields without re-tokenizing the catalog
+        
+        Args:
+            **weights: New relative weight per field ('lyrics', 'genre', 'mood', 'artist')
+        """
+        self.tfidf_matrix = self.tfidf_vectorizer.set_weights(**weights)
+        self.field_weights.update(self.tfidf_vectorizer.weights)
+        self.similarity_matrix = cosine_similarity(self.tfidf_matrix, self.tfidf_matrix)
+    
+    def _pairwise_similarity(self, rows):
+        """Similarity between a few songs (len(rows) x len(rows))"""
+        return self.similarity_matrix[np.ix_(rows, rows)]
     
-    def get_recommendations(self, song_name, n_recommendations=10):
+    def get_recommendations(self, song_name, n_recommendations=10, diversity=0.0, max_per_artist=None,
+                            song_id=None):
         """
         Get music recommendations based on a given song
         
         Args:
             song_name: Name of the song to base recommendations on
             n_recommendations: Number of recommendations to return
+            diversity: MMR trade-off between relevance and variety (0 to 1)
+            max_per_artist: Maximum recommendations per artist (None for no cap)
+            song_id: Row id of the song, to pick one of several matching titles
             
         Returns:
             DataFrame with recommended songs
         """
         try:
-            # Find the song in the dataset
-            song_indices = self.df[self.df['song'].str.lower() == song_name.lower()].index
+            # Find the song: exact title first, then the closest partial or misspelled one
+            song_idx = self.title_lookup.resolve(song_name, song_id)
             
-            if len(song_indices) == 0:
-                # Try partial match
-                song_indices = self.df[self.df['song'].str.lower().str.contains(song_name.lower(), na=False)].index
-                if len(song_indices) == 0:
-                    print(f"Song '{song_name}' not found in database")
-                    return None
-            
-            song_idx = song_indices[0]
+            if song_idx is None:
+                logger.debug("Song not found", extra={'query': song_name})
+                return None
             
             # Get similarity scores for this song
-            similarity_scores = list(enumerate(self.similarity_matrix[song_idx]))
+            with metrics.stage('scoring'):
+                similarity_scores = list(enumerate(self.similarity_matrix[song_idx]))
             
             # Sort by similarity score
-            similarity_scores = sorted(similarity_scores, key=lambda x: x[1], reverse=True)
+            with metrics.stage('sorting'):
+                similarity_scores = sorted(similarity_scores, key=lambda x: x[1], reverse=True)
             
             # Get top N recommendations (excluding the song itself)
-            top_indices = [i[0] for i in similarity_scores[1:n_recommendations+1]]
+            rerank = wants_rerank(diversity, max_per_artist)
+            n_candidates = max(RERANK_POOL, n_recommendations) if rerank else n_recommendations
+            top = similarity_scores[1:n_candidates+1]
+            top_indices = np.array([i[0] for i in top], dtype=np.intp)
+            top_scores = np.array([i[1] for i in top], dtype=np.float64)
+            
+            if rerank:
+                # Re-rank the over-fetched candidates for variety
+                top_indices, top_scores = rerank_rows(
+                    self, top_indices, top_scores, n_recommendations, diversity, max_per_artist
+                )
             
             # Return recommended songs
-            recommendations = self.df.iloc[top_indices].copy()
-            recommendations['similarity_score'] = [similarity_scores[i+1][1] for i in range(len(top_indices))]
+            with metrics.stage('slicing'):
+                recommendations = self.df.iloc[top_indices].copy()
+                recommendations['similarity_score'] = top_scores
             
             return recommendations
             
-        except Exception as e:
-            print(f"Error getting recommendations: {e}")
+        except Exception:
+            logger.exception("Error getting recommendations")
             return None
     
     def get_songs_by_mood(self, mood, n_songs=10):
@@ -165,6 +201,7 @@ class MusicRecommender:
         
         return genre_songs.head(n_songs)
     
-    def get_random_songs(self, n_songs=10):
-        """Get random songs from the dataset"""
-        return self.df.sample(n=min(n_songs, len(self.df)))
+    def get_random_songs(self, n_songs=10, seed=None):
+        """Get random songs from the dataset (seed makes the pick reproducible)"""
+        rows = sample_rows(len(self.df), n_songs, request_rng(seed))
+        return self.df.iloc[rows]
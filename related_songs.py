@@ -0,0 +1,226 @@
+"""
+Precomputed "related songs" table for the most requested seed songs
+
+A small set of popular songs receives most /recommend traffic. This module
+computes their top-k neighbours offline and stores them in a compact .npz
+file (int32 row ids, float32 scores) that the app loads at boot. The
+recommenders answer those seeds straight from the table and fall back to
+live scoring for every other song.
+
+Usage:
+    python related_songs.py --dataset spotify --top 2000 -k 50
+    python related_songs.py --dataset spotify --log seeds.log --top 2000
+"""
+import argparse
+import json
+import os
+import zlib
+from collections import Counter
+
+import numpy as np
+
+import metrics
+from ranking import top_k
+
+
+class RelatedSongsTable:
+    """
+    Top-k neighbours of a fixed set of seed songs
+    """
+
+    def __init__(self, seed_ids, neighbors, scores, fingerprint=None, options=None):
+        """
+        Initialize the table
+
+        Args:
+            seed_ids: Catalog row ids of the seed songs
+            neighbors: (n_seeds, k) row ids of each seed's neighbours, best first
+            scores: (n_seeds, k) similarity scores matching neighbors
+            fingerprint: Catalog fingerprint the table was built against
+            options: Options the recommender was built with
+        """
+        order = np.argsort(seed_ids)
+        self.seed_ids = np.asarray(seed_ids, dtype=np.int32)[order]
+        self.neighbors = np.asarray(neighbors, dtype=np.int32)[order]
+        self.scores = np.asarray(scores, dtype=np.float32)[order]
+        self.fingerprint = fingerprint
+        self.options = options or {}
+
+    @property
+    def k(self):
+        """Number of neighbours stored per seed"""
+        return self.neighbors.shape[1]
+
+    def __len__(self):
+        return len(self.seed_ids)
+
+    def lookup(self, song_idx, n):
+        """
+        Neighbours of a seed song, if the table can answer the request
+
+        Args:
+            song_idx: Catalog row id of the seed
+            n: Number of neighbours wanted
+
+        Returns:
+            (row ids, scores) tuple, or None if the song is not a seed
+            or more neighbours are requested than stored
+        """
+        pos = np.searchsorted(self.seed_ids, song_idx)
+        if n > self.k or pos == len(self.seed_ids) or self.seed_ids[pos] != song_idx:
+            metrics.cache_lookup('related_songs', False)
+            return None
+        metrics.cache_lookup('related_songs', True)
+        return self.neighbors[pos, :n], self.scores[pos, :n]
+
+    def save(self, path):
+        """Write the table to a compressed .npz file"""
+        os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+        np.savez_compressed(
+            path,
+            seed_ids=self.seed_ids,
+            neighbors=self.neighbors,
+            scores=self.scores,
+            fingerprint=np.int64(self.fingerprint or 0),
+            options=np.array(json.dumps(self.options, sort_keys=True))
+        )
+
+    @classmethod
+    def load(cls, path):
+        """Read a table written by save()"""
+        with np.load(path) as data:
+            # Tables written before options were stored match no options
+            options = json.loads(str(data['options'])) if 'options' in data else None
+            return cls(
+                data['seed_ids'], data['neighbors'], data['scores'],
+                fingerprint=int(data['fingerprint']), options=options
+            )
+
+
+def catalog_fingerprint(recommender):
+    """
+    Checksum of the catalog's titles and artists in row order
+
+    Row ids in a table are only valid for the exact catalog they were
+    computed on; the fingerprint detects a changed or reordered CSV.
+    """
+    df = recommender.df
+    titles = df[recommender.TITLE_COLUMN].astype(str)
+    artists = df[recommender.ARTIST_COLUMN].astype(str)
+    return zlib.crc32('\n'.join(titles + '\t' + artists).encode('utf-8'))
+
+
+def popular_seeds(recommender, n_seeds):
+    """Row ids of the n most popular songs (requires a 'popularity' column)"""
+    popularity = recommender.df['popularity'].to_numpy(dtype=np.float64)
+    return top_k(popularity, n_seeds)
+
+
+def seeds_from_log(recommender, log_path, n_seeds):
+    """
+    Row ids of the most requested songs in a request log
+
+    Args:
+        recommender: Recommender whose catalog the names refer to
+        log_path: Text file with one requested song name per line
+        n_seeds: Number of seeds to return
+    """
+    with open(log_path, encoding='utf-8') as f:
+        counts = Counter(line.strip().lower() for line in f if line.strip())
+
+    titles = recommender.df[recommender.TITLE_COLUMN].astype(str).str.lower()
+    first_row = {}
+    for row_id, title in enumerate(titles):
+        first_row.setdefault(title, row_id)
+
+    seeds = [first_row[name] for name, _ in counts.most_common() if name in first_row]
+    return np.array(seeds[:n_seeds], dtype=np.int32)
+
+
+def build_related_table(recommender, seed_ids, k=50, options=None):
+    """
+    Compute the top-k neighbours of each seed with the recommender's scorer
+
+    Args:
+        recommender: Built recommender exposing _similarity_scores(row_id)
+        seed_ids: Row ids to precompute
+        k: Neighbours to keep per seed
+        options: Options the recommender was built with
+
+    Returns:
+        RelatedSongsTable
+    """
+    k = min(k, len(recommender.df) - 1)
+    neighbors = np.zeros((len(seed_ids), k), dtype=np.int32)
+    scores = np.zeros((len(seed_ids), k), dtype=np.float32)
+
+    for i, seed in enumerate(seed_ids):
+        similarity_scores = recommender._similarity_scores(seed)
+        top_indices = top_k(similarity_scores, k, exclude=seed)
+        neighbors[i] = top_indices
+        scores[i] = similarity_scores[top_indices]
+
+    return RelatedSongsTable(seed_ids, neighbors, scores, catalog_fingerprint(recommender), options)
+
+
+def load_related_table(recommender, path, options=None):
+    """
+    Load a table for a recommender if it exists and matches its catalog
+    and options
+
+    Args:
+        recommender: Recommender the table will answer for
+        path: Path of the .npz table
+        options: Options the recommender was built with
+
+    Returns:
+        RelatedSongsTable, or None if missing or built for another catalog
+        or with other scoring options
+    """
+    if not os.path.exists(path):
+        return None
+
+    table = RelatedSongsTable.load(path)
+    if table.fingerprint != catalog_fingerprint(recommender):
+        print(f"⚠ Ignoring stale related songs table {path}")
+        return None
+    if table.options != (options or {}):
+        print(f"⚠ Ignoring related songs table {path} built with other options "
+              f"({table.options} != {options or {}})")
+        return None
+    return table
+
+
+def main():
+    from app import DATASETS, RECOMMENDER_OPTIONS, load_recommender, related_table_path
+
+    parser = argparse.ArgumentParser(description="Precompute related songs for popular seeds")
+    parser.add_argument('--dataset', choices=list(DATASETS), required=True)
+    parser.add_argument('--top', type=int, default=1000, help="number of seed songs")
+    parser.add_argument('-k', type=int, default=50, help="neighbours per seed")
+    parser.add_argument('--log', help="request log with one song name per line "
+                                      "(default: rank by popularity)")
+    parser.add_argument('--out', help="output .npz path")
+    args = parser.parse_args()
+
+    recommender_class, csv_path = DATASETS[args.dataset]
+    recommender = load_recommender(args.dataset, recommender_class, csv_path)
+
+    if args.log:
+        seed_ids = seeds_from_log(recommender, args.log, args.top)
+    elif 'popularity' in recommender.df.columns:
+        seed_ids = popular_seeds(recommender, args.top)
+    else:
+        parser.error(f"{args.dataset} has no popularity column; pass --log")
+
+    print(f"🔄 Computing top-{args.k} neighbours for {len(seed_ids):,} seed songs...")
+    table = build_related_table(recommender, seed_ids, args.k,
+                                RECOMMENDER_OPTIONS.get(args.dataset, {}))
+
+    out_path = args.out or related_table_path(args.dataset)
+    table.save(out_path)
+    print(f"✓ Saved related songs table to {out_path} ({os.path.getsize(out_path) / 1024:.0f} KB)")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,118 @@
+"""
+Diversity-aware re-ranking of recommendation candidates
+
+The recommenders over-fetch a small candidate pool (RERANK_POOL songs by
+similarity) and re-rank it here with maximal marginal relevance (MMR) and
+an optional cap on songs per artist. Only the candidate-vs-candidate
+similarity matrix is needed, so the cost depends on the pool size, not on
+the catalog size.
+"""
+import numpy as np
+import pandas as pd
+
+import metrics
+
+# Candidates fetched before re-ranking
+RERANK_POOL = 200
+
+
+def wants_rerank(diversity=0.0, max_per_artist=None):
+    """True when any re-ranking option is active"""
+    return diversity > 0 or max_per_artist is not None
+
+
+def validate_options(diversity=0.0, max_per_artist=None):
+    """
+    Check re-ranking options coming from a request
+
+    Raises:
+        ValueError: If an option is out of range
+    """
+    if not 0 <= diversity <= 1:
+        raise ValueError("diversity must be between 0 and 1")
+    if max_per_artist is not None and max_per_artist < 1:
+        raise ValueError("max_per_artist must be at least 1")
+
+
+def rerank(relevance, similarity, k, diversity=0.0, artists=None, max_per_artist=None):
+    """
+    Pick k candidates balancing relevance against redundancy
+
+    Each step selects the candidate maximizing
+    (1 - diversity) * relevance - diversity * (max similarity to the picks so far),
+    skipping artists that already have max_per_artist picks.
+
+    Args:
+        relevance: (m,) similarity of each candidate to the seed song
+        similarity: (m, m) similarity between the candidates
+        k: Number of candidates to pick
+        diversity: Trade-off in [0, 1]; 0 keeps the relevance order
+        artists: (m,) artist of each candidate, needed for max_per_artist
+        max_per_artist: Maximum picks per artist (None for no cap)
+
+    Returns:
+        1-D int array of candidate positions, in pick order (fewer than k
+        if the artist cap leaves too few candidates)
+    """
+    relevance = np.asarray(relevance, dtype=np.float64)
+    n_candidates = len(relevance)
+    k = min(k, n_candidates)
+
+    available = np.ones(n_candidates, dtype=bool)
+    redundancy = np.zeros(n_candidates)
+    if max_per_artist is not None:
+        artist_codes = pd.factorize(np.asarray(artists, dtype=object))[0]
+        artist_picks = np.zeros(artist_codes.max(initial=-1) + 1, dtype=np.int64)
+
+    picks = []
+    for _ in range(k):
+        if not available.any():
+            break
+
+        if diversity > 0:
+            gain = (1 - diversity) * relevance - diversity * redundancy
+        else:
+            gain = relevance
+        pick = int(np.argmax(np.where(available, gain, -np.inf)))
+
+        picks.append(pick)
+        available[pick] = False
+        if diversity > 0:
+            np.maximum(redundancy, similarity[:, pick], out=redundancy)
+
+        if max_per_artist is not None:
+            code = artist_codes[pick]
+            artist_picks[code] += 1
+            if artist_picks[code] >= max_per_artist:
+                available &= artist_codes != code
+
+    return np.array(picks, dtype=np.intp)
+
+
+def rerank_rows(recommender, rows, scores, k, diversity=0.0, max_per_artist=None, **similarity_options):
+    """
+    Re-rank a recommender's candidate rows
+
+    Args:
+        recommender: Recommender providing _pairwise_similarity(rows, ...) and ARTIST_COLUMN
+        rows: Candidate row ids, best first
+        scores: Similarity of each candidate to the seed song
+        k: Number of rows to keep
+        diversity: MMR trade-off in [0, 1]
+        max_per_artist: Maximum songs per artist (None for no cap)
+        **similarity_options: Passed on to _pairwise_similarity
+
+    Returns:
+        (row ids, scores) of the selected songs, in pick order
+    """
+    with metrics.stage('rerank'):
+        similarity = None
+        if diversity > 0:
+            similarity = recommender._pairwise_similarity(rows, **similarity_options)
+
+        artists = None
+        if max_per_artist is not None:
+            artists = recommender.df[recommender.ARTIST_COLUMN].to_numpy()[rows]
+
+        picks = rerank(scores, similarity, k, diversity, artists, max_per_artist)
+        return rows[picks], scores[picks]
@@ -0,0 +1,159 @@
+"""
+Random sampling of catalog rows
+
+Samples are drawn as arrays of row positions, without copying or hashing
+DataFrame rows, so only the final k rows are ever materialized. Every
+request gets its own numpy Generator; pass a seed to make a result
+reproducible. Weighted draws (e.g. by popularity) use a precomputed
+alias table, which costs O(1) per draw.
+"""
+import numpy as np
+
+# Weighted draws are made in batches; after this many rounds with too many
+# repeats the remaining rows are picked with Generator.choice instead
+MAX_DRAW_ROUNDS = 4
+
+
+def request_rng(seed=None):
+    """
+    Random generator for a single request
+
+    Args:
+        seed: Optional seed, fresh OS entropy when None
+
+    Returns:
+        numpy.random.Generator
+    """
+    return np.random.default_rng(seed)
+
+
+class AliasTable:
+    """
+    Vose alias table for weighted sampling in constant time per draw
+    """
+
+    def __init__(self, weights):
+        """
+        Build the table
+
+        Args:
+            weights: 1-D array of non-negative weights, one per item
+        """
+        weights = np.asarray(weights, dtype=np.float64)
+        weights = np.where(np.isfinite(weights) & (weights > 0), weights, 0.0)
+        n_items = len(weights)
+        total = weights.sum()
+        if n_items == 0 or total <= 0:
+            # Nothing to prefer, fall back to uniform weights
+            weights = np.ones(max(n_items, 1))
+            total = weights.sum()
+
+        self.probabilities = weights / total
+        self.accept = np.ones(len(weights))
+        self.alias = np.arange(len(weights))
+
+        scaled = self.probabilities * len(weights)
+        small = list(np.flatnonzero(scaled < 1.0))
+        large = list(np.flatnonzero(scaled >= 1.0))
+        while small and large:
+            less, more = small.pop(), large.pop()
+            self.accept[less] = scaled[less]
+            self.alias[less] = more
+            scaled[more] = scaled[more] + scaled[less] - 1.0
+            if scaled[more] < 1.0:
+                small.append(more)
+            else:
+                large.append(more)
+
+    def __len__(self):
+        return len(self.probabilities)
+
+    def draw(self, rng, size):
+        """
+        Draw item positions with replacement
+
+        Args:
+            rng: numpy Generator
+            size: Number of draws
+
+        Returns:
+            1-D int array of item positions
+        """
+        slots = rng.integers(0, len(self.accept), size=size)
+        keep = rng.random(size) < self.accept[slots]
+        return np.where(keep, slots, self.alias[slots])
+
+
+def sample_rows(population, k, rng, alias=None):
+    """
+    Draw up to k distinct rows
+
+    Args:
+        population: Number of rows, or a 1-D array of candidate row ids
+        k: Number of rows to draw
+        rng: numpy Generator
+        alias: Optional AliasTable over the population positions for
+            weighted sampling; it may cover more items than the population
+            (draws past the end are discarded)
+
+    Returns:
+        1-D int array of row ids, in draw order
+    """
+    candidates = None if np.isscalar(population) else np.asarray(population)
+    n_rows = int(population) if candidates is None else len(candidates)
+    k = min(k, n_rows)
+    if k <= 0:
+        return np.empty(0, dtype=np.intp)
+
+    if alias is None:
+        positions = rng.choice(n_rows, size=k, replace=False)
+    else:
+        positions = _weighted_positions(n_rows, k, rng, alias)
+
+    return positions if candidates is None else candidates[positions]
+
+
+def _weighted_positions(n_rows, k, rng, alias):
+    positions = np.empty(0, dtype=np.intp)
+    for _ in range(MAX_DRAW_ROUNDS):
+        draws = alias.draw(rng, 2 * (k - len(positions)) + 8)
+        draws = np.concatenate([positions, draws[draws < n_rows]])
+        _, first = np.unique(draws, return_index=True)
+        positions = draws[np.sort(first)][:k]
+        if len(positions) == k:
+            return positions
+
+    # Heavy repeats (k close to the number of weighted rows): finish exactly
+    weights = alias.probabilities[:n_rows].copy()
+    weights[positions] = 0.0
+    remaining = k - len(positions)
+    available = np.count_nonzero(weights)
+    if available < remaining:
+        # Not enough weighted rows left, top up with the zero-weight ones
+        weights = np.where(weights > 0, weights, weights[weights > 0].min(initial=1.0) * 1e-6)
+        weights[positions] = 0.0
+    extra = rng.choice(n_rows, size=remaining, replace=False, p=weights / weights.sum())
+    return np.concatenate([positions, extra])
+
+
+def fill_sample(pool, k, n_rows, rng):
+    """
+    Sample k rows from a preferred pool, topping up from the whole catalog
+
+    Args:
+        pool: 1-D array of preferred row ids
+        k: Number of rows wanted
+        n_rows: Catalog size
+        rng: numpy Generator
+
+    Returns:
+        1-D int array of min(k, n_rows) distinct row ids, pool rows first
+    """
+    pool = np.asarray(pool)
+    if len(pool) >= k:
+        return sample_rows(pool, k, rng)
+
+    rest = np.ones(n_rows, dtype=bool)
+    rest[pool] = False
+    extra = sample_rows(np.flatnonzero(rest), k - len(pool), rng)
+    return np.concatenate([rng.permutation(pool), extra])
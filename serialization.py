@@ -0,0 +1,121 @@
+"""
+Fast JSON responses for catalog-backed routes
+
+Recommendation payloads are built column-wise from NumPy arrays instead of
+DataFrame.to_dict('records'), which also guarantees plain Python scalars
+(and null instead of NaN) in the output. Encoding uses orjson when it is
+installed, and large bodies are compressed with Brotli or gzip depending
+on the client's Accept-Encoding.
+"""
+import gzip
+import json
+
+import numpy as np
+from flask import Response, request
+
+import metrics
+
+try:
+    import orjson
+except ImportError:  # optional, falls back to the standard json module
+    orjson = None
+
+try:
+    import brotli
+except ImportError:  # optional, gzip is used instead
+    brotli = None
+
+# Bodies smaller than this are sent uncompressed
+COMPRESS_MIN_BYTES = 1024
+
+
+def frame_records(df, columns=None):
+    """
+    Convert a DataFrame to a list of row dicts
+
+    Args:
+        df: DataFrame to convert
+        columns: Columns to include (default: all, in frame order)
+
+    Returns:
+        List of dicts holding native Python values, None for missing values
+    """
+    columns = list(df.columns if columns is None else columns)
+    values = [_column_values(df[column]) for column in columns]
+    return [dict(zip(columns, row)) for row in zip(*values)]
+
+
+def _column_values(series):
+    array = series.to_numpy()
+    if array.dtype.kind in 'iub':
+        return array.tolist()
+
+    if array.dtype.kind == 'f':
+        missing = np.isnan(array)
+    else:
+        missing = series.isna().to_numpy()
+
+    # tolist() turns NumPy scalars into Python ints/floats/strings
+    values = array.tolist()
+    for i in np.flatnonzero(missing):
+        values[i] = None
+    return values
+
+
+def _json_default(value):
+    if isinstance(value, np.generic):
+        return value.item()
+    if isinstance(value, np.ndarray):
+        return value.tolist()
+    raise TypeError(f"Object of type {type(value).__name__} is not JSON serializable")
+
+
+def dumps(payload):
+    """Encode a payload to UTF-8 JSON bytes"""
+    with metrics.stage('json_encoding'):
+        if orjson is not None:
+            return orjson.dumps(payload, option=orjson.OPT_SERIALIZE_NUMPY)
+        return json.dumps(
+            payload, ensure_ascii=False, separators=(',', ':'), default=_json_default
+        ).encode('utf-8')
+
+
+def compress(body, accept_encoding):
+    """
+    Compress a body for the client if it is worth it
+
+    Args:
+        body: Encoded response body
+        accept_encoding: The request's Accept-Encoding header object
+
+    Returns:
+        (body, content encoding or None)
+    """
+    if len(body) < COMPRESS_MIN_BYTES:
+        return body, None
+    if brotli is not None and 'br' in accept_encoding:
+        return brotli.compress(body, quality=4), 'br'
+    if 'gzip' in accept_encoding:
+        return gzip.compress(body, compresslevel=5), 'gzip'
+    return body, None
+
+
+def json_response(payload, status=200):
+    """
+    Build a (possibly compressed) JSON response
+
+    Args:
+        payload: JSON-serializable object
+        status: HTTP status code
+
+    Returns:
+        Flask Response
+    """
+    body = dumps(payload)
+    with metrics.stage('compression'):
+        body, encoding = compress(body, request.accept_encodings)
+    response = Response(body, status=status, mimetype='application/json')
+    response.vary.add('Accept-Encoding')
+    if encoding:
+        response.headers['Content-Encoding'] = encoding
+    return response
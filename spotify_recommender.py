@@ -1,130 +1,247 @@
 import pandas as pd
 import numpy as np
-from sklearn.feature_extraction.text import TfidfVectorizer
 from sklearn.metrics.pairwise import cosine_similarity
+from catalog_stats import CatalogStats
+from field_vectorizer import FieldWeightedVectorizer
+from latent_index import LatentIndex
+import metrics
+from near_duplicates import NEAR_DUPLICATE_THRESHOLD, collapse_near_duplicates
+from preprocessing import fill_text_columns
+from ranking import top_k
+from reranking import RERANK_POOL, rerank_rows, wants_rerank
+from sampling import request_rng, sample_rows
+from structured_log import get_logger
+from title_index import TitleIndex
+import time
 import warnings
 warnings.filterwarnings('ignore')
 
+logger = get_logger(__name__)
+
 class SpotifyMusicRecommender:
     """
     Content-based music recommendation system using TF-IDF and cosine similarity
     Optimized for Spotify Million Song Dataset
     """
     
-    def __init__(self, df):
+    TITLE_COLUMN = 'song'
+    ARTIST_COLUMN = 'artist'
+    
+    # TF-IDF settings for each text field
+    TEXT_FIELDS = {
+        'artist': {'ngram_range': (1, 2), 'max_features': 5000},
+        'song': {'stop_words': 'english', 'max_features': 5000},
+        'text': {
+            'max_features': 5000,  # Reduced for faster computation
+            'stop_words': 'english',
+            'ngram_range': (1, 2),
+            'min_df': 3,  # Ignore terms that appear in less than 3 documents
+            'max_df': 0.7  # Ignore terms that appear in more than 70% of documents
+        }
+    }
+    
+    # Relative weight of each field in the similarity score (artist weighted up)
+    FIELD_WEIGHTS = {'artist': 3.0, 'song': 1.0, 'text': 4.0}
+    
+    def __init__(self, df, latent_dims=None, field_weights=None,
+                 near_duplicate_threshold=NEAR_DUPLICATE_THRESHOLD, hashed_lyrics=False):
         """
         Initialize the recommender with Spotify music dataset
         
         Args:
             df: Pandas DataFrame containing music data with columns:
                 'song', 'artist', 'text' (lyrics), 'link'
+            latent_dims: If set (64-256), score with dense LSA embeddings
+                instead of the sparse TF-IDF rows
+            field_weights: Override FIELD_WEIGHTS for some fields
+            near_duplicate_threshold: Collapse songs of the same artist whose
+                title and lyrics are at least this similar (None to keep them)
+            hashed_lyrics: Vectorize the lyrics with a memory-bounded hashed
+                feature space instead of a full term dictionary
         """
         self.df = df.copy()
+        self.latent_dims = latent_dims
+        self.field_weights = {**self.FIELD_WEIGHTS, **(field_weights or {})}
+        self.near_duplicate_threshold = near_duplicate_threshold
+        self.hashed_lyrics = hashed_lyrics
+        self.aliases = None
         self.tfidf_matrix = None
         self.similarity_matrix = None
         self.tfidf_vectorizer = None
+        self.latent_index = None
+        self.related_table = None
+        self.stats = None
+        self.title_lookup = None
         self._preprocess_data()
         self._build_recommendation_model()
     
     def _preprocess_data(self):
         """Preprocess the Spotify music data"""
         # Clean and prepare data
-        self.df['song'] = self.df['song'].fillna('Unknown')
-        self.df['artist'] = self.df['artist'].fillna('Unknown')
-        self.df['text'] = self.df['text'].fillna('')
-        
-        # Create combined features with weighted importance
-        # Artist (repeated 3x for more weight) + Song + Lyrics
-        self.df['combined_features'] = (
-            self.df['artist'].astype(str) + ' ' +
-            self.df['artist'].astype(str) + ' ' +
-            self.df['artist'].astype(str) + ' ' +
-            self.df['song'].astype(str) + ' ' +
-            self.df['text'].astype(str)
-        )
-        
-        # Clean up the text
-        self.df['combined_features'] = self.df['combined_features'].str.lower()
+        fill_text_columns(self.df, {'song': 'Unknown', 'artist': 'Unknown', 'text': ''})
         
         # Remove duplicates based on song and artist
         self.df = self.df.drop_duplicates(subset=['song', 'artist'], keep='first')
         self.df = self.df.reset_index(drop=True)
+        
+        # Collapse remasters, live versions and "feat." variants; their
+        # titles stay resolvable as aliases of the canonical song
+        if self.near_duplicate_threshold:
+            start = time.perf_counter()
+            self.df, self.aliases = collapse_near_duplicates(
+                self.df, 'song', 'artist', text_column='text',
+                threshold=self.near_duplicate_threshold
+            )
+            print(f"✓ Collapsed {len(self.aliases):,} near-duplicate songs "
+                  f"in {time.perf_counter() - start:.1f}s")
     
     def _build_recommendation_model(self):
         """Build the TF-IDF model (similarity computed on-demand)"""
-        # Create TF-IDF vectorizer with optimized parameters for fast loading
-        self.tfidf_vectorizer = TfidfVectorizer(
-            max_features=5000,  # Reduced for faster computation
-            stop_words='english',
-            ngram_range=(1, 2),
-            min_df=3,  # Ignore terms that appear in less than 3 documents
-            max_df=0.7  # Ignore terms that appear in more than 70% of documents
+        # One TF-IDF vectorizer per field (artist, song, lyrics), weighted on stacking
+        self.tfidf_vectorizer = FieldWeightedVectorizer(
+            self.TEXT_FIELDS, self.field_weights,
+            hashed_fields=['text'] if self.hashed_lyrics else ()
         )
         
-        # Fit and transform the combined features
         print(f"🔄 Building TF-IDF matrix for {len(self.df):,} songs...")
-        self.tfidf_matrix = self.tfidf_vectorizer.fit_transform(self.df['combined_features'])
+        self.tfidf_matrix = self.tfidf_vectorizer.fit_transform({
+            field: self.df[field].astype(str) for field in self.TEXT_FIELDS
+        })
         
         # Don't pre-compute full similarity matrix for large datasets
         # Instead, compute similarities on-demand
         self.similarity_matrix = None
         
+        if self.latent_dims:
+            print(f"🔄 Fitting {self.latent_dims}-dim latent embeddings...")
+            self.latent_index = LatentIndex(self.latent_dims).fit(self.tfidf_matrix)
+        
+        self.stats = CatalogStats(self.df, count_columns=['artist'])
+        self.title_lookup = TitleIndex(self.df[self.TITLE_COLUMN], self._title_aliases())
+        
         print(f"✓ Recommendation model built successfully!")
         print(f"  - Dataset size: {len(self.df):,} songs")
         print(f"  - Feature matrix shape: {self.tfidf_matrix.shape}")
-        print(f"  - Unique artists: {self.df['artist'].nunique():,}")
-        print(f"  - Using on-demand similarity computation for efficiency")
+        print(f"  - Unique artists: {len(self.stats.counts['artist']):,}")
+        if self.latent_index is not None:
+            print(f"  - Using {self.latent_index.dims}-dim latent embeddings for scoring")
+        else:
+            print(f"  - Using on-demand similarity computation for efficiency")
+    
+    def _title_aliases(self):
+        """Titles of the collapsed near-duplicates, indexed by canonical song id"""
+        if self.aliases is None:
+            return None
+        return self.aliases.set_index('song_id')[self.TITLE_COLUMN]
+    
+    def set_field_weights(self, **weights):
+        """
+        Re-weight the text fields without re-tokenizing the catalog
+        
+        Args:
+            **weights: New relative weight per field ('artist', 'song', 'text')
+        """
+        self.tfidf_matrix = self.tfidf_vectorizer.set_weights(**weights)
+        self.field_weights = dict(self.tfidf_vectorizer.weights)
+        
+        # The latent projection depends on the weighted matrix
+        if self.latent_index is not None:
+            self.latent_index = LatentIndex(self.latent_dims).fit(self.tfidf_matrix)
+        
+        # Precomputed neighbours were scored with the old weights
+        self.related_table = None
+    
+    def _similarity_scores(self, song_idx):
+        """Similarity of one song against the whole catalog"""
+        if self.latent_index is not None:
+            return self.latent_index.similarity_scores(song_idx)
+        
+        song_vector = self.tfidf_matrix[song_idx]
+        return cosine_similarity(song_vector, self.tfidf_matrix).flatten()
+    
+    def _batch_similarity_scores(self, song_ids):
+        """Similarity of several songs against the whole catalog (len(song_ids) x n_songs)"""
+        if self.latent_index is not None:
+            embeddings = self.latent_index.embeddings
+            return embeddings[song_ids] @ embeddings.T
+        
+        return cosine_similarity(self.tfidf_matrix[song_ids], self.tfidf_matrix)
+    
+    def _pairwise_similarity(self, rows):
+        """Similarity between a few songs (len(rows) x len(rows))"""
+        if self.latent_index is not None:
+            vectors = self.latent_index.embeddings[rows]
+            return vectors @ vectors.T
+        
+        return cosine_similarity(self.tfidf_matrix[rows])
     
-    def get_recommendations(self, song_name, n_recommendations=10):
+    def _top_similar(self, song_idx, n):
+        """
+        Row ids and scores of the n songs most similar to a song
+        
+        Popular seeds are served from the precomputed related songs table;
+        every other song is scored live.
+        """
+        if self.related_table is not None:
+            related = self.related_table.lookup(song_idx, n)
+            if related is not None:
+                return related
+        
+        with metrics.stage('scoring'):
+            similarity_scores = self._similarity_scores(song_idx)
+        top_indices = top_k(similarity_scores, n, exclude=song_idx)
+        return top_indices, similarity_scores[top_indices]
+    
+    def get_recommendations(self, song_name, n_recommendations=10, diversity=0.0, max_per_artist=None,
+                            song_id=None):
         """
         Get music recommendations based on a given song
         
         Args:
             song_name: Name of the song to base recommendations on
             n_recommendations: Number of recommendations to return
+            diversity: MMR trade-off between relevance and variety (0 to 1)
+            max_per_artist: Maximum recommendations per artist (None for no cap)
+            song_id: Row id of the song, to pick one of several matching titles
             
         Returns:
             DataFrame with recommended songs
         """
         try:
-            # Find the song in the dataset (exact match first)
-            song_indices = self.df[self.df['song'].str.lower() == song_name.lower()].index
-            
-            if len(song_indices) == 0:
-                # Try partial match
-                song_indices = self.df[self.df['song'].str.lower().str.contains(song_name.lower(), na=False)].index
-                
-                if len(song_indices) == 0:
-                    return None
-            
-            # Get the first matching song index
-            song_idx = song_indices[0]
-            
-            # Compute similarity for this song only (on-demand)
-            song_vector = self.tfidf_matrix[song_idx]
-            similarity_scores = cosine_similarity(song_vector, self.tfidf_matrix).flatten()
+            # Find the song: exact title first, then the closest partial or misspelled one
+            song_idx = self.title_lookup.resolve(song_name, song_id)
             
-            # Get indices of most similar songs
-            similar_indices = similarity_scores.argsort()[::-1]
+            if song_idx is None:
+                logger.debug("Song not found", extra={'query': song_name})
+                return None
             
             # Get top N similar songs (excluding the input song itself)
-            top_indices = [i for i in similar_indices if i != song_idx][:n_recommendations]
+            if wants_rerank(diversity, max_per_artist):
+                # Over-fetch candidates and re-rank them for variety
+                top_indices, top_scores = self._top_similar(
+                    song_idx, max(RERANK_POOL, n_recommendations)
+                )
+                top_indices, top_scores = rerank_rows(
+                    self, top_indices, top_scores, n_recommendations, diversity, max_per_artist
+                )
+            else:
+                top_indices, top_scores = self._top_similar(song_idx, n_recommendations)
             
             # Return recommended songs
-            recommendations = self.df.iloc[top_indices][['song', 'artist', 'link']].copy()
-            recommendations['similarity_score'] = similarity_scores[top_indices]
+            with metrics.stage('slicing'):
+                recommendations = self.df.iloc[top_indices][['song', 'artist', 'link']].copy()
+                recommendations['similarity_score'] = top_scores
             
             return recommendations
             
-        except Exception as e:
-            print(f"Error getting recommendations: {e}")
-            import traceback
-            traceback.print_exc()
+        except Exception:
+            logger.exception("Error getting recommendations")
             return None
     
-    def get_random_songs(self, n=50):
-        """Get random songs from the dataset"""
-        return self.df[['song', 'artist']].sample(n=min(n, len(self.df)))
+    def get_random_songs(self, n=50, seed=None):
+        """Get random songs from the dataset (seed makes the pick reproducible)"""
+        rows = sample_rows(len(self.df), n, request_rng(seed))
+        return self.df.iloc[rows][['song', 'artist']]
     
     def search_songs(self, query, limit=50):
         """
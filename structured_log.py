@@ -0,0 +1,240 @@
+"""
+Structured, non-blocking logging for request paths
+
+Request handlers log through loggers from get_logger() instead of
+print(). A record is put on an in-memory queue and the calling thread
+moves on. A single background listener thread formats the records (JSON
+lines by default) and writes them out, so request threads never block on
+the log pipe or on the lock of a stdout write.
+
+Debug records are per-request detail (seed song, weather ranges, ...).
+They are kept only for the requests picked by start_request(), a
+LOG_DEBUG_SAMPLE_RATE fraction of the traffic. Records at LOG_LEVEL and above
+are always kept.
+
+Settings (environment):
+    LOG_LEVEL: Minimum level of unsampled records (default INFO)
+    LOG_DEBUG_SAMPLE_RATE: Share of requests whose debug records are kept (default 0.01)
+    LOG_FORMAT: 'json' (default) or 'text'
+    LOG_QUEUE_SIZE: Records buffered before new ones are dropped (default 10000)
+"""
+import atexit
+import contextvars
+import json
+import logging
+import logging.handlers
+import os
+import queue
+import random
+import sys
+import threading
+import time
+import uuid
+
+ROOT_LOGGER = 'dynamic_tune'
+
+LOG_LEVEL = os.environ.get('LOG_LEVEL', 'INFO').upper()
+LOG_DEBUG_SAMPLE_RATE = float(os.environ.get('LOG_DEBUG_SAMPLE_RATE', 0.01))
+LOG_FORMAT = os.environ.get('LOG_FORMAT', 'json')
+LOG_QUEUE_SIZE = int(os.environ.get('LOG_QUEUE_SIZE', 10000))
+
+_min_level = logging.getLevelName(LOG_LEVEL)
+if not isinstance(_min_level, int):
+    _min_level = logging.INFO
+
+_request_id = contextvars.ContextVar('request_id', default=None)
+_debug_sampled = contextvars.ContextVar('debug_sampled', default=False)
+
+# Attributes every LogRecord has; anything else was passed in extra=
+_RECORD_ATTRIBUTES = set(vars(logging.makeLogRecord({}))) | {'message', 'asctime', 'taskName'}
+
+
+def start_request(request_id=None):
+    """
+    Mark the start of a request in the current context
+
+    Tags later records with a request id and decides whether this
+    request's debug records are kept.
+
+    Returns:
+        The request id
+    """
+    request_id = request_id or uuid.uuid4().hex[:16]
+    _request_id.set(request_id)
+    _debug_sampled.set(random.random() < LOG_DEBUG_SAMPLE_RATE)
+    return request_id
+
+
+def _fields(record):
+    """Structured fields passed with extra="""
+    return {
+        key: value for key, value in vars(record).items()
+        if key not in _RECORD_ATTRIBUTES and key != 'request_id'
+    }
+
+
+class JsonFormatter(logging.Formatter):
+    """One JSON object per record"""
+
+    def format(self, record):
+        entry = {
+            'time': time.strftime('%Y-%m-%dT%H:%M:%S', time.gmtime(record.created))
+                    + f'.{int(record.msecs):03d}Z',
+            'level': record.levelname,
+            'logger': record.name,
+            'message': record.getMessage()
+        }
+        if getattr(record, 'request_id', None):
+            entry['request_id'] = record.request_id
+        entry.update(_fields(record))
+        if record.exc_info:
+            entry['exception'] = self.formatException(record.exc_info)
+        return json.dumps(entry, ensure_ascii=False, default=str)
+
+
+class TextFormatter(logging.Formatter):
+    """Readable single-line records with key=value fields"""
+
+    def __init__(self):
+        super().__init__('%(asctime)s %(levelname)-7s %(name)s: %(message)s')
+
+    def format(self, record):
+        line = super().format(record)
+        fields = ' '.join(f'{key}={value}' for key, value in _fields(record).items())
+        return f'{line} {fields}' if fields else line
+
+
+class _ContextFilter(logging.Filter):
+    """
+    Add the request id, and drop records below LOG_LEVEL unless the
+    request is sampled
+
+    Runs in the calling thread, where the request context is visible.
+    """
+
+    def filter(self, record):
+        if record.levelno < _min_level and not _debug_sampled.get():
+            return False
+        record.request_id = _request_id.get()
+        return True
+
+
+class RequestLogger(logging.LoggerAdapter):
+    """
+    Logger that skips records of unsampled requests before creating them
+
+    Checking the sampling decision up front keeps a debug call on an
+    unsampled request as cheap as a disabled log level.
+    """
+
+    def isEnabledFor(self, level):
+        if level < _min_level and not _debug_sampled.get():
+            return False
+        return self.logger.isEnabledFor(level)
+
+    def process(self, msg, kwargs):
+        # Keep the caller's extra= fields
+        return msg, kwargs
+
+
+class _DroppingQueueHandler(logging.handlers.QueueHandler):
+    """
+    Queue handler that never blocks and never formats in the caller
+
+    Records are handed to the listener as they are (the queue is
+    in-process, so nothing needs pickling). When the queue is full,
+    records are dropped and counted.
+    """
+
+    def __init__(self, log_queue):
+        super().__init__(log_queue)
+        self.dropped = 0
+
+    def prepare(self, record):
+        return record
+
+    def enqueue(self, record):
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            self.dropped += 1
+
+
+_handler = None
+_listener = None
+_stream = None
+_lock = threading.Lock()
+
+
+def configure(stream=None):
+    """
+    Attach the queue handler and start the listener thread (once per process)
+
+    Args:
+        stream: Where the listener writes (default stdout)
+    """
+    global _handler, _listener, _stream
+    with _lock:
+        if _listener is not None:
+            return
+        _stream = stream or _stream or sys.stdout
+        output = logging.StreamHandler(_stream)
+        output.setFormatter(JsonFormatter() if LOG_FORMAT == 'json' else TextFormatter())
+
+        log_queue = queue.Queue(maxsize=LOG_QUEUE_SIZE)
+        _handler = _DroppingQueueHandler(log_queue)
+        _handler.addFilter(_ContextFilter())
+
+        logger = logging.getLogger(ROOT_LOGGER)
+        logger.addHandler(_handler)
+        logger.propagate = False
+        # Records below LOG_LEVEL are only created when some can be kept
+        logger.setLevel(logging.DEBUG if LOG_DEBUG_SAMPLE_RATE > 0 else _min_level)
+
+        _listener = logging.handlers.QueueListener(log_queue, output)
+        _listener.start()
+
+
+def shutdown():
+    """Flush queued records and stop the listener thread"""
+    global _listener
+    with _lock:
+        if _listener is not None:
+            _listener.stop()
+            _listener = None
+            logging.getLogger(ROOT_LOGGER).removeHandler(_handler)
+
+
+def dropped_records():
+    """Records dropped because the queue was full"""
+    return _handler.dropped if _handler is not None else 0
+
+
+def _restart_after_fork():
+    # The listener thread does not survive a fork (pre-forking servers)
+    global _listener, _lock
+    _lock = threading.Lock()
+    if _listener is not None:
+        logging.getLogger(ROOT_LOGGER).removeHandler(_handler)
+        _listener = None
+        configure()
+
+
+def get_logger(name):
+    """
+    Logger for a module, writing through the shared queue
+
+    Args:
+        name: Module name (usually __name__)
+
+    Returns:
+        RequestLogger
+    """
+    configure()
+    return RequestLogger(logging.getLogger(f'{ROOT_LOGGER}.{name}'), {})
+
+
+if hasattr(os, 'register_at_fork'):
+    os.register_at_fork(after_in_child=_restart_after_fork)
+
+atexit.register(shutdown)
@@ -0,0 +1,250 @@
+"""
+Typo-tolerant song title lookup
+
+TitleIndex finds the titles closest to a (possibly misspelled or partial)
+query without scanning the catalog:
+
+1. Candidates come from a character trigram index: titles sharing enough
+   trigrams with the query (q-gram lemma for the allowed edit distance).
+2. Candidates are verified with a bounded edit distance that lets the
+   query match anywhere inside the title, computed for all candidates at
+   once with NumPy.
+
+Matches rank by that distance, then by the distance to the whole title,
+so exact titles come first, then the closest partial or misspelled ones.
+Both the index and the verification work on arrays, which keeps lookups
+in the millisecond range on million-song catalogs.
+"""
+import numpy as np
+import pandas as pd
+
+import metrics
+
+# Candidates verified per query (the ones sharing the most trigrams)
+MAX_CANDIDATES = 256
+
+# Title characters considered during verification
+MAX_TITLE_CHARS = 64
+
+_SHIFT = 21  # Unicode code points fit in 21 bits
+
+
+def normalize_title(title):
+    """Lowercase a title and collapse its whitespace"""
+    return ' '.join(str(title).lower().split())
+
+
+def max_edits(query):
+    """Edit distance allowed for a normalized query"""
+    if len(query) <= 3:
+        return 0
+    if len(query) <= 6:
+        return 1
+    if len(query) <= 12:
+        return 2
+    return 3
+
+
+def _codepoints(text):
+    return np.frombuffer(text.encode('utf-32-le'), dtype=np.uint32).astype(np.int64)
+
+
+def _trigram_codes(codepoints):
+    return (codepoints[:-2] << (2 * _SHIFT)) | (codepoints[1:-1] << _SHIFT) | codepoints[2:]
+
+
+class TitleIndex:
+    """
+    Trigram index over normalized song titles
+    """
+
+    def __init__(self, titles, aliases=None):
+        """
+        Index a catalog's titles
+
+        Args:
+            titles: Series of titles; row positions are the song ids
+            aliases: Optional Series of other titles of the songs (e.g. the
+                near-duplicates dropped from the catalog), indexed by song id
+        """
+        self.n_rows = len(titles)
+        # Index entries are the titles followed by the aliases; entry_rows
+        # maps an entry to its song id (None when there are no aliases)
+        self.entry_rows = None
+        if aliases is not None and len(aliases):
+            titles = pd.concat([titles, aliases], ignore_index=True)
+            self.entry_rows = np.concatenate([
+                np.arange(self.n_rows), aliases.index.to_numpy(dtype=np.int64)
+            ])
+
+        normalized = titles.astype(str).str.lower().str.split().str.join(' ')
+        self.titles = normalized.to_numpy(dtype=object)
+        self.n_entries = len(self.titles)
+
+        # Sorted titles for exact and prefix lookups
+        self.sorted_rows = np.argsort(self.titles, kind='stable')
+        self.sorted_titles = self.titles[self.sorted_rows]
+
+        self._build_trigrams()
+
+    def _build_trigrams(self):
+        """Posting lists (row ids per trigram) of every title at once"""
+        if self.n_entries == 0:
+            self.trigrams = np.empty(0, dtype=np.int64)
+            self.offsets = np.zeros(1, dtype=np.int64)
+            self.postings = np.empty(0, dtype=np.int32)
+            return
+
+        # All titles as one code point array, separated by NUL
+        codepoints = _codepoints('\x00'.join(self.titles))
+        lengths = np.fromiter((len(title) for title in self.titles), dtype=np.int64, count=self.n_entries)
+        row_of = np.repeat(np.arange(self.n_entries, dtype=np.int32), lengths + 1)[:len(codepoints)]
+
+        codes = _trigram_codes(codepoints)
+        separator = codepoints == 0
+        valid = ~(separator[:-2] | separator[1:-1] | separator[2:])
+        codes, rows = codes[valid], row_of[:-2][valid]
+
+        # One posting per (trigram, title)
+        order = np.lexsort((rows, codes))
+        codes, rows = codes[order], rows[order]
+        distinct = np.ones(len(codes), dtype=bool)
+        distinct[1:] = (codes[1:] != codes[:-1]) | (rows[1:] != rows[:-1])
+        codes, rows = codes[distinct], rows[distinct]
+
+        starts = np.flatnonzero(np.r_[True, codes[1:] != codes[:-1]])
+        self.trigrams = codes[starts]
+        self.offsets = np.append(starts, len(codes))
+        self.postings = rows
+
+    def _song_rows(self, entries, limit=None):
+        """Song ids of index entries, each song once, in entry order"""
+        if self.entry_rows is None:
+            return entries[:limit]
+        rows = self.entry_rows[entries]
+        _, first = np.unique(rows, return_index=True)
+        return rows[np.sort(first)][:limit]
+
+    def _exact_entries(self, query):
+        low = np.searchsorted(self.sorted_titles, query, side='left')
+        high = np.searchsorted(self.sorted_titles, query, side='right')
+        return np.sort(self.sorted_rows[low:high])
+
+    def exact(self, query):
+        """Row ids whose normalized title (or an alias of it) equals the query"""
+        return np.sort(self._song_rows(self._exact_entries(normalize_title(query))))
+
+    def _prefix_rows(self, query):
+        low = np.searchsorted(self.sorted_titles, query, side='left')
+        high = np.searchsorted(self.sorted_titles, query + '\U0010ffff', side='left')
+        return np.sort(self.sorted_rows[low:high])
+
+    def _candidates(self, query, edits):
+        """Rows sharing enough trigrams with the query, most shared first"""
+        codes = np.unique(_trigram_codes(_codepoints(query)))
+        positions = np.searchsorted(self.trigrams, codes)
+        found = positions < len(self.trigrams)
+        found[found] = self.trigrams[positions[found]] == codes[found]
+        positions = positions[found]
+        if len(positions) == 0:
+            return np.empty(0, dtype=np.int64)
+
+        postings = np.concatenate([
+            self.postings[self.offsets[p]:self.offsets[p + 1]] for p in positions
+        ])
+        shared = np.bincount(postings, minlength=self.n_entries)
+
+        # q-gram lemma: every edit destroys at most three query trigrams
+        threshold = max(1, len(codes) - 3 * edits)
+        rows = np.flatnonzero(shared >= threshold)
+        if len(rows) <= MAX_CANDIDATES:
+            return rows
+
+        # Keep the rows sharing the most trigrams, ties in row order
+        counts = shared[rows]
+        cutoff = np.partition(counts, len(counts) - MAX_CANDIDATES)[len(counts) - MAX_CANDIDATES]
+        above = rows[counts > cutoff]
+        at_cutoff = rows[counts == cutoff][:MAX_CANDIDATES - len(above)]
+        return np.concatenate([above, at_cutoff])
+
+    def _distances(self, query, rows):
+        """
+        Edit distances of the query to the best matching part of each
+        title and to the whole title, for all candidate rows at once
+        """
+        titles = [title[:MAX_TITLE_CHARS] for title in self.titles[rows]]
+        lengths = np.array([len(title) for title in titles])
+        width = int(lengths.max(initial=0))
+
+        # Candidate titles as a code point matrix, padded with -1
+        matrix = np.full((len(titles), width), -1, dtype=np.int64)
+        for i, title in enumerate(titles):
+            matrix[i, :len(title)] = _codepoints(title)
+
+        columns = np.arange(width + 1)
+        partial = np.zeros((len(titles), width + 1), dtype=np.int64)  # match may start anywhere
+        whole = np.broadcast_to(columns, partial.shape).copy()
+        for i, char in enumerate(_codepoints(query), start=1):
+            mismatch = (matrix != char).astype(np.int64)
+            for table in (partial, whole):
+                step = np.empty_like(table)
+                step[:, 0] = i
+                step[:, 1:] = np.minimum(table[:, :-1] + mismatch, table[:, 1:] + 1)
+                # Insertions: D[i][j] = min over l <= j of step[l] + (j - l)
+                table[:] = np.minimum.accumulate(step - columns, axis=1) + columns
+
+        partial = np.where(columns <= lengths[:, None], partial, np.iinfo(np.int64).max)
+        return partial.min(axis=1), whole[np.arange(len(titles)), lengths]
+
+    def search(self, query, limit=10, max_distance=None):
+        """
+        Best matching songs for a title query
+
+        Args:
+            query: Title as typed by the user
+            limit: Maximum number of matches
+            max_distance: Edit distance allowed (default depends on query length)
+
+        Returns:
+            1-D int array of row ids, best match first
+        """
+        with metrics.stage('title_lookup'):
+            return self._search(query, limit, max_distance)
+
+    def _search(self, query, limit, max_distance):
+        query = normalize_title(query)[:MAX_TITLE_CHARS]
+        if not query or self.n_entries == 0:
+            return np.empty(0, dtype=np.int64)
+        edits = max_edits(query) if max_distance is None else max_distance
+
+        if len(query) < 3:
+            # Too short for trigrams: exact titles, then titles starting with it
+            prefix = self._prefix_rows(query)
+            exact = prefix[self.titles[prefix] == query]
+            return self._song_rows(np.concatenate([exact, prefix[self.titles[prefix] != query]]), limit)
+
+        rows = np.union1d(self._candidates(query, edits), self._exact_entries(query))
+        if len(rows) == 0:
+            return rows
+
+        partial, whole = self._distances(query, rows)
+        keep = partial <= edits
+        rows, partial, whole = rows[keep], partial[keep], whole[keep]
+        order = np.lexsort((rows, whole, partial))
+        return self._song_rows(rows[order], limit)
+
+    def resolve(self, query=None, row=None):
+        """
+        The song a request refers to
+
+        Args:
+            query: Title as typed by the user
+            row: Song id picked from earlier suggestions (takes precedence)
+
+        Returns:
+            Row id of the song, or None if there is no such song
+        """
+        if row is not None:
+            return int(row) if 0 <= row < self.n_rows else None
+        matches = self.search(query or '', limit=1)
+        return int(matches[0]) if len(matches) else None
@@ -0,0 +1,129 @@
+"""
+OpenWeatherMap client shared by the weather recommenders
+
+Provides the blocking fetch used by the Flask app and a non-blocking
+variant (httpx) for the ASGI serving mode in asgi.py.
+"""
+import os
+import requests
+
+import metrics
+from structured_log import get_logger
+
+logger = get_logger(__name__)
+
+# Current weather endpoint; override to point at a local stub for load tests
+WEATHER_API_URL = os.environ.get(
+    'OPENWEATHER_URL', 'https://api.openweathermap.org/data/2.5/weather'
+)
+WEATHER_TIMEOUT = 10
+
+
+def weather_params(latitude, longitude, api_key):
+    """Query parameters for a current-weather request"""
+    return {
+        'lat': latitude,
+        'lon': longitude,
+        'appid': api_key,
+        'units': 'metric'
+    }
+
+
+def parse_weather(data):
+    """
+    Convert an OpenWeatherMap response body to our weather info dict
+
+    Args:
+        data: Decoded JSON response
+
+    Returns:
+        Dictionary with weather information
+    """
+    # Get city and country information
+    city_name = data.get('name', 'Unknown Location')
+    country_code = data.get('sys', {}).get('country', '')
+
+    # Create full location name
+    if country_code:
+        full_location = f"{city_name}, {country_code}"
+    else:
+        full_location = city_name
+
+    return {
+        'condition': data['weather'][0]['main'],
+        'description': data['weather'][0]['description'],
+        'temperature': data['main']['temp'],
+        'feels_like': data['main']['feels_like'],
+        'humidity': data['main']['humidity'],
+        'city': full_location,
+        'icon': data['weather'][0]['icon']
+    }
+
+
+def demo_weather():
+    """Return demo weather data for testing"""
+    return {
+        'condition': 'Clear',
+        'description': 'clear sky',
+        'temperature': 25,
+        'feels_like': 24,
+        'humidity': 60,
+        'city': 'Demo City (API Key Required)',
+        'icon': '01d'
+    }
+
+
+def fetch_weather(latitude, longitude, api_key):
+    """
+    Fetch current weather, blocking the calling thread
+
+    Returns:
+        Weather info dict (demo weather if the API call fails)
+    """
+    try:
+        with metrics.stage('weather_http'):
+            response = requests.get(
+                WEATHER_API_URL, params=weather_params(latitude, longitude, api_key),
+                timeout=WEATHER_TIMEOUT
+            )
+
+        if response.status_code == 200:
+            return parse_weather(response.json())
+
+        logger.warning("Weather API error", extra={'status': response.status_code})
+        return demo_weather()
+
+    except Exception as e:
+        logger.warning("Error fetching weather", extra={'error': type(e).__name__})
+        return demo_weather()
+
+
+async def fetch_weather_async(client, latitude, longitude, api_key):
+    """
+    Fetch current weather without blocking the event loop
+
+    Args:
+        client: Shared httpx.AsyncClient
+        latitude: Location latitude
+        longitude: Location longitude
+        api_key: OpenWeatherMap API key
+
+    Returns:
+        Weather info dict (demo weather if the API call fails)
+    """
+    try:
+        with metrics.stage('weather_http'):
+            response = await client.get(
+                WEATHER_API_URL, params=weather_params(latitude, longitude, api_key),
+                timeout=WEATHER_TIMEOUT
+            )
+
+        if response.status_code == 200:
+            return parse_weather(response.json())
+
+        logger.warning("Weather API error", extra={'status': response.status_code})
+        return demo_weather()
+
+    except Exception as e:
+        logger.warning("Error fetching weather", extra={'error': type(e).__name__})
+        return demo_weather()
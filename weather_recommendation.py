@@ -1,7 +1,14 @@
 import requests
+import numpy as np
 import pandas as pd
 from datetime import datetime
 from recommendation import MusicRecommender
+from preprocessing import contains_any
+from sampling import fill_sample, request_rng
+from structured_log import get_logger
+from weather_client import demo_weather, fetch_weather
+
+logger = get_logger(__name__)
 
 class WeatherMusicRecommender:
     """
@@ -56,6 +63,8 @@ class WeatherMusicRecommender:
             'Mist': ['ambient', 'electronic', 'chill', 'lo-fi'],
             'Fog': ['ambient', 'electronic', 'chill', 'lo-fi']
         }
+        
+        self.build_weather_pools()
     
     def get_weather_data(self, latitude, longitude):
         """
@@ -68,60 +77,46 @@ class WeatherMusicRecommender:
         Returns:
             Dictionary with weather information
         """
-        try:
-            url = f"https://api.openweathermap.org/data/2.5/weather"
-            params = {
-                'lat': latitude,
-                'lon': longitude,
-                'appid': self.api_key,
-                'units': 'metric'
-            }
-            
-            response = requests.get(url, params=params, timeout=10)
-            
-            if response.status_code == 200:
-                data = response.json()
-                
-                # Get city and country information
-                city_name = data.get('name', 'Unknown Location')
-                country_code = data.get('sys', {}).get('country', '')
-                
-                # Create full location name
-                if country_code:
-                    full_location = f"{city_name}, {country_code}"
-                else:
-                    full_location = city_name
-                
-                weather_info = {
-                    'condition': data['weather'][0]['main'],
-                    'description': data['weather'][0]['description'],
-                    'temperature': data['main']['temp'],
-                    'feels_like': data['main']['feels_like'],
-                    'humidity': data['main']['humidity'],
-                    'city': full_location,
-                    'icon': data['weather'][0]['icon']
-                }
-                
-                return weather_info
-            else:
-                print(f"Weather API Error: {response.status_code}")
-                return self._get_demo_weather()
-                
-        except Exception as e:
-            print(f"Error fetching weather: {e}")
-            return self._get_demo_weather()
+        return fetch_weather(latitude, longitude, self.api_key)
     
     def _get_demo_weather(self):
         """Return demo weather data for testing"""
-        return {
-            'condition': 'Clear',
-            'description': 'clear sky',
-            'temperature': 25,
-            'feels_like': 24,
-            'humidity': 60,
-            'city': 'Demo City (API Key Required)',
-            'icon': '01d'
-        }
+        return demo_weather()
+    
+    def _get_temp_category(self, temperature):
+        """Categorize temperature"""
+        if temperature < 0:
+            return 'very_cold'
+        elif temperature < 15:
+            return 'cold'
+        elif temperature < 25:
+            return 'mild'
+        elif temperature < 35:
+            return 'warm'
+        else:
+            return 'hot'
+    
+    def build_weather_pools(self):
+        """
+        Precompute the candidate songs for every weather condition and temperature category
+        
+        Conditions missing from weather_mood_map share the pool under key None.
+        Called on construction, so the pools are rebuilt whenever the app
+        reloads the dataset. Call it again after replacing self.df.
+        """
+        self.weather_pools = {}
+        candidates = {}
+        for condition in list(self.weather_mood_map) + [None]:
+            base_mood = self.weather_mood_map.get(condition, 'neutral')
+            preferred_genres = self.weather_genre_map.get(condition, ['pop', 'indie'])
+            for temp_category, temp_mood in self.temp_mood_map.items():
+                mood = f"{base_mood} {temp_mood}"
+                
+                # Many cells share a mood and genre list
+                key = (mood, tuple(preferred_genres))
+                if key not in candidates:
+                    candidates[key] = self._candidate_rows(mood, preferred_genres)
+                self.weather_pools[(condition, temp_category)] = candidates[key]
     
     def _determine_mood_from_weather(self, weather_info):
         """
@@ -138,17 +133,8 @@ class WeatherMusicRecommender:
         base_mood = self.weather_mood_map.get(condition, 'neutral')
         
         # Adjust based on temperature
-        temp = weather_info['temperature']
-        if temp < 0:
-            temp_mood = 'cozy'
-        elif temp < 15:
-            temp_mood = 'calm'
-        elif temp < 25:
-            temp_mood = 'relaxed'
-        elif temp < 35:
-            temp_mood = 'happy'
-        else:
-            temp_mood = 'energetic'
+        temp_category = self._get_temp_category(weather_info['temperature'])
+        temp_mood = self.temp_mood_map[temp_category]
         
         # Combine moods (you can make this more sophisticated)
         return f"{base_mood} {temp_mood}"
@@ -165,10 +151,23 @@ class WeatherMusicRecommender:
         Returns:
             Dictionary with weather info and recommended songs
         """
-        try:
-            # Get weather data
-            weather_info = self.get_weather_data(latitude, longitude)
+        # Get weather data
+        weather_info = self.get_weather_data(latitude, longitude)
+        return self.recommend_for_weather(weather_info, n_recommendations)
+    
+    def recommend_for_weather(self, weather_info, n_recommendations=15, seed=None):
+        """
+        Get music recommendations for already fetched weather data
+        
+        Args:
+            weather_info: Dictionary with weather information
+            n_recommendations: Number of songs to recommend
+            seed: Optional random seed for a reproducible pick
             
+        Returns:
+            Dictionary with weather info and recommended songs
+        """
+        try:
             # Determine mood from weather
             mood = self._determine_mood_from_weather(weather_info)
             
@@ -176,8 +175,11 @@ class WeatherMusicRecommender:
             condition = weather_info['condition']
             preferred_genres = self.weather_genre_map.get(condition, ['pop', 'indie'])
             
-            # Filter songs by mood and genre
-            recommendations = self._filter_songs_by_weather(mood, preferred_genres, n_recommendations)
+            # Candidates were filtered by mood and genre in build_weather_pools
+            pool_condition = condition if condition in self.weather_mood_map else None
+            temp_category = self._get_temp_category(weather_info['temperature'])
+            pool = self.weather_pools[(pool_condition, temp_category)]
+            recommendations = self._sample_pool(pool, n_recommendations, request_rng(seed))
             
             result = {
                 'weather': weather_info,
@@ -188,54 +190,55 @@ class WeatherMusicRecommender:
             
             return result
             
-        except Exception as e:
-            print(f"Error getting weather-based recommendations: {e}")
+        except Exception:
+            logger.exception("Error getting weather-based recommendations")
             return None
     
-    def _filter_songs_by_weather(self, mood, preferred_genres, n_songs=15):
+    def _candidate_rows(self, mood, preferred_genres):
         """
         Filter songs based on mood and preferred genres
         
         Args:
             mood: The determined mood
             preferred_genres: List of preferred genres
-            n_songs: Number of songs to return
             
         Returns:
-            DataFrame with recommended songs
+            Array of matching row positions in self.df
         """
-        filtered_songs = self.df.copy()
+        matches = np.ones(len(self.df), dtype=bool)
         
         # Filter by mood if mood column exists
-        if 'mood' in filtered_songs.columns:
+        if 'mood' in self.df.columns:
             mood_keywords = mood.lower().split()
-            mood_mask = filtered_songs['mood'].str.lower().apply(
-                lambda x: any(keyword in str(x).lower() for keyword in mood_keywords) if pd.notna(x) else False
-            )
-            mood_songs = filtered_songs[mood_mask]
+            mood_mask = contains_any(self.df['mood'], mood_keywords).to_numpy()
             
-            if len(mood_songs) > 0:
-                filtered_songs = mood_songs
+            if mood_mask.any():
+                matches = mood_mask
         
         # Filter by genre if genre column exists
-        if 'genre' in filtered_songs.columns and len(preferred_genres) > 0:
-            genre_mask = filtered_songs['genre'].str.lower().apply(
-                lambda x: any(genre in str(x).lower() for genre in preferred_genres) if pd.notna(x) else False
-            )
-            genre_songs = filtered_songs[genre_mask]
+        if 'genre' in self.df.columns and len(preferred_genres) > 0:
+            genre_mask = matches & contains_any(self.df['genre'], preferred_genres).to_numpy()
             
-            if len(genre_songs) > 0:
-                filtered_songs = genre_songs
+            if genre_mask.any():
+                matches = genre_mask
         
-        # If we have enough songs, return them
-        if len(filtered_songs) >= n_songs:
-            return filtered_songs.sample(n=min(n_songs, len(filtered_songs)))
-        else:
-            # If not enough, add random songs to reach n_songs
-            remaining = n_songs - len(filtered_songs)
-            additional_songs = self.df.sample(n=min(remaining, len(self.df)))
-            result = pd.concat([filtered_songs, additional_songs]).drop_duplicates()
-            return result.head(n_songs)
+        return np.flatnonzero(matches)
+    
+    def _sample_pool(self, pool, n_songs, rng):
+        """
+        Pick songs from a precomputed candidate pool
+        
+        Args:
+            pool: Array of candidate row positions
+            n_songs: Number of songs to return
+            rng: numpy Generator for this request
+            
+        Returns:
+            DataFrame with recommended songs
+        """
+        # If the pool is too small, distinct random songs make up the rest
+        rows = fill_sample(pool, n_songs, len(self.df), rng)
+        return self.df.iloc[rows]
     
     def get_location_from_ip(self):
         """